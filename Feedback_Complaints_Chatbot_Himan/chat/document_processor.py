@@ -3,15 +3,19 @@ from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from shared.model_registry import registry
+
+# Shared by the chat processor and the suggestions generator; the
+# sentence-transformers model is loaded on first use
+registry.register('chatbot.embeddings',
+                  lambda: HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2"))
 
 
 class DocumentProcessor:
     def __init__(self, knowledge_base_path, vector_store_path):
         self.knowledge_base_path = knowledge_base_path
         self.vector_store_path = vector_store_path
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2"
-        )
+        self.embeddings = registry.get('chatbot.embeddings')
 
     import os
     from langchain_community.document_loaders import DirectoryLoader, TextLoader
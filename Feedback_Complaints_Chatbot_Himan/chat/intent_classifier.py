@@ -1,11 +1,9 @@
-import tensorflow as tf
 import numpy as np
 import pickle
 import os
+import threading
 from Feedback_Complaints_Chatbot_Himan.config import Config
-
-load_model = tf.keras.models.load_model
-pad_sequences = tf.keras.utils.pad_sequences
+from shared.inference import MicroBatcher, compiled_call
 
 
 class IntentClassifier:
@@ -19,10 +17,21 @@ class IntentClassifier:
         self.labels = self._load_labels()
 
         self.max_sequence_length = 10
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+
+    def _get_batcher(self):
+        # Concurrent chat messages share model calls
+        with self._batcher_lock:
+            if self._batcher is None:
+                self._batcher = MicroBatcher(compiled_call(self.model), name='chatbot.intent')
+        return self._batcher
 
     def _load_model(self):
         try:
-            model = load_model(self.model_path)
+            # TensorFlow is only imported once the classifier is first needed
+            import tensorflow as tf
+            model = tf.keras.models.load_model(self.model_path)
             print(f"Intent classification model loaded from {self.model_path}")
             return model
         except Exception as e:
@@ -55,10 +64,11 @@ class IntentClassifier:
             return "unknown", 0.0
 
         try:
+            import tensorflow as tf
             sequences = self.tokenizer.texts_to_sequences([text])
-            padded_sequences = pad_sequences(sequences, maxlen=self.max_sequence_length)
+            padded_sequences = tf.keras.utils.pad_sequences(sequences, maxlen=self.max_sequence_length)
 
-            prediction = self.model.predict(padded_sequences)[0]
+            prediction = self._get_batcher().submit(np.asarray(padded_sequences))[0]
             predicted_class_index = np.argmax(prediction)
             confidence_score = prediction[predicted_class_index]
 
@@ -67,4 +77,4 @@ class IntentClassifier:
             return predicted_intent, float(confidence_score)
         except Exception as e:
             print(f"Error predicting intent: {e}")
-            return "unknown", 0.0
\ No newline at end of file
+            return "unknown", 0.0
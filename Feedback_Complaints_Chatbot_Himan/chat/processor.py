@@ -1,6 +1,6 @@
 from .document_processor import DocumentProcessor
 from .llm_handler import LLMHandler
-from .intent_classifier import IntentClassifier
+from shared.model_registry import registry
 from .intent_database import UserIntent
 from shared import db
 from langchain.prompts import PromptTemplate
@@ -20,7 +20,10 @@ class ChatProcessor:
         self.llm_handler = LLMHandler()
         self.vector_store = self.initialize_vector_store()
         self.qa_chain = self.setup_qa_chain()
-        self.intent_classifier = IntentClassifier()
+
+    @property
+    def intent_classifier(self):
+        return registry.get('chatbot.intent_classifier')
 
     def initialize_vector_store(self):
         vector_store = self.doc_processor.load_vector_store()
@@ -1,12 +1,16 @@
 from flask import Flask, render_template, request, jsonify, session
 import uuid
 from Feedback_Complaints_Chatbot_Himan.chat.processor import ChatProcessor
+from Feedback_Complaints_Chatbot_Himan.chat.intent_classifier import IntentClassifier
 from Feedback_Complaints_Chatbot_Himan.chat.intent_database import db, UserIntent
 from Feedback_Complaints_Chatbot_Himan.chat.suggestions_generator import SuggestionsGenerator
 from Feedback_Complaints_Chatbot_Himan import chatbot_bp
+from shared.model_registry import registry
 
-chat_processor = ChatProcessor()
-suggestions_generator = SuggestionsGenerator()
+# Built on the first chat message (or by the model warm-up), not at import
+registry.register('chatbot.processor', ChatProcessor)
+registry.register('chatbot.intent_classifier', IntentClassifier)
+registry.register('chatbot.suggestions', SuggestionsGenerator)
 
 
 @chatbot_bp.route('/chatbot-dashboard')
@@ -34,6 +38,7 @@ def process_chat():
     }
 
     try:
+        chat_processor = registry.get('chatbot.processor')
         if action:
             if action == 'schedule':
                 result['response'] = chat_processor.process_message(
@@ -52,7 +57,7 @@ def process_chat():
         else:
             return jsonify({'error': 'No message or action provided'}), 400
 
-        result['suggestions'] = suggestions_generator.generate_suggestions(
+        result['suggestions'] = registry.get('chatbot.suggestions').generate_suggestions(
             user_message if user_message else action,
             result['response']
         )
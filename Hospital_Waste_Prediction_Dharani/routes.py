@@ -4,10 +4,14 @@ import pandas as pd
 import joblib
 from  Hospital_Waste_Prediction_Dharani import hospital_bp
 from datetime import datetime
+from shared.model_registry import registry
 
 
-model = joblib.load("Hospital_Waste_Prediction_Dharani/ml_model/best_XGB_model.pkl")
-le = joblib.load("Hospital_Waste_Prediction_Dharani/ml_model/label encoder.pkl")
+# Loaded by the model registry on first use
+registry.register('hospital.xgb_model', lambda: joblib.load("Hospital_Waste_Prediction_Dharani/ml_model/best_XGB_model.pkl"),
+                  fork_safe=True)
+registry.register('hospital.label_encoder', lambda: joblib.load("Hospital_Waste_Prediction_Dharani/ml_model/label encoder.pkl"),
+                  fork_safe=True)
 
 def categorize_rain(precipitation):
 
@@ -28,7 +32,7 @@ def preprocess_input(data):
         data['Day of the week'] = date_obj.weekday()
         data['Month'] = date_obj.month
         data['Day'] = date_obj.day
-        data['cat_rain'] = le.transform([data['cat_rain']])[0]
+        data['cat_rain'] = registry.get('hospital.label_encoder').transform([data['cat_rain']])[0]
 
         return [[data['Day of the week'], data['Month'], data['Day'], data['cat_rain'], data['daily_patients']]]
     except Exception as e:
@@ -42,7 +46,7 @@ def predict_waste():
         if isinstance(processed_data, str):
             return jsonify({"error": processed_data}), 400
 
-        prediction = float(model.predict(processed_data)[0])
+        prediction = float(registry.get('hospital.xgb_model').predict(processed_data)[0])
         return jsonify({'predicted_waste_weight': prediction})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,182 @@
+import json
+import numpy as np
+import pandas as pd
+from HouseHold_Waste_Prediction_Chirath.streams import STREAMS, amount_column
+
+# Per-route lag and rolling features of the latest dump record, kept up to
+# date as dump records are entered so a prediction reads one row per route
+# instead of re-aggregating the route's whole history.
+#
+# Records written around the entry pages (imports, manual edits) are caught
+# by triggers on the history tables, which bump the stream's history version
+# in RouteFeaturesHistory on every insert, update and delete. The stored
+# features carry the version they were built from, so a prediction compares
+# one row instead of scanning the history, and the stream is rebuilt when the
+# two differ. A history table without the triggers (new, or replaced e.g. by
+# pandas to_sql) gets them and is rebuilt as well.
+
+WINDOWS = (7, 14, 30)
+FEATURES = ['Lag_1', 'Lag_7'] + [f'rolling_{stat}_{window}' for window in WINDOWS
+                                 for stat in ('mean', 'min', 'max')]
+# Records kept per route: enough for the longest window
+KEEP = max(WINDOWS)
+
+
+def ensure_table(conn):
+    columns = ', '.join(f'[{name}] REAL' for name in FEATURES)
+    conn.execute(f"""CREATE TABLE IF NOT EXISTS RouteFeatures (
+        [Stream] TEXT NOT NULL,
+        [Route] TEXT NOT NULL,
+        [Last Dump Date] TIMESTAMP,
+        [Recent] TEXT NOT NULL,
+        {columns},
+        PRIMARY KEY ([Stream], [Route]))""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS RouteFeaturesHistory (
+        [Stream] TEXT PRIMARY KEY,
+        [Version] INTEGER NOT NULL DEFAULT 0,
+        [Built Version] INTEGER NOT NULL DEFAULT 0)""")
+
+
+def _trigger_names(stream):
+    return {event: f'RouteFeatures_{stream}_{event.lower()}' for event in ('INSERT', 'UPDATE', 'DELETE')}
+
+
+def ensure_stream(conn, stream):
+    """
+    Create the tables and the stream's history triggers. When the triggers
+    were missing the history may have changed unseen, so the stream's
+    features are dropped; returns whether that happened.
+    """
+    ensure_table(conn)
+    names = _trigger_names(stream)
+    found = conn.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                         f"AND name IN ({', '.join('?' * len(names))})", list(names.values())).fetchone()[0]
+    if found == len(names):
+        return False
+    conn.execute("INSERT OR IGNORE INTO RouteFeaturesHistory ([Stream]) VALUES (?)", (stream,))
+    for event, name in names.items():
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS [{name}] AFTER {event} ON {STREAMS[stream]['history_table']}
+            BEGIN
+                UPDATE RouteFeaturesHistory SET [Version] = [Version] + 1 WHERE [Stream] = '{stream}';
+            END""")
+    invalidate(conn, stream)
+    return True
+
+
+def versions(conn, stream):
+    """``(history version, version the stored features were built from)``."""
+    return tuple(conn.execute("SELECT [Version], [Built Version] FROM RouteFeaturesHistory WHERE [Stream] = ?",
+                              (stream,)).fetchone())
+
+
+def _mark_built(conn, stream):
+    conn.execute("UPDATE RouteFeaturesHistory SET [Built Version] = [Version] WHERE [Stream] = ?", (stream,))
+
+
+def invalidate(conn, stream):
+    """Drop the stream's stored features; each route is rebuilt from its history when next predicted."""
+    conn.execute("DELETE FROM RouteFeatures WHERE [Stream] = ?", (stream,))
+    _mark_built(conn, stream)
+
+
+def compute_features(amounts):
+    """Features of the last record from the route's latest amounts (oldest first)."""
+    amounts = pd.Series(amounts, dtype='float64')
+    features = {
+        'Lag_1': amounts.iloc[-1] if len(amounts) else np.nan,
+        'Lag_7': amounts.iloc[-7] if len(amounts) >= 7 else np.nan,
+    }
+    # A rolling window (min_periods=1) at the last record is the last n records
+    for window in WINDOWS:
+        last = amounts.tail(window)
+        features[f'rolling_mean_{window}'] = last.mean()
+        features[f'rolling_min_{window}'] = last.min()
+        features[f'rolling_max_{window}'] = last.max()
+    return features
+
+
+def _nullable(value):
+    return None if value is None or value != value else float(value)
+
+
+def _store(conn, stream, route, last_date, amounts):
+    features = compute_features(amounts)
+    names = ['Stream', 'Route', 'Last Dump Date', 'Recent'] + FEATURES
+    values = [stream, route, last_date, json.dumps([_nullable(a) for a in amounts])]
+    values += [_nullable(features[name]) for name in FEATURES]
+    conn.execute(f"INSERT OR REPLACE INTO RouteFeatures ({', '.join(f'[{n}]' for n in names)}) "
+                 f"VALUES ({', '.join('?' * len(names))})", values)
+
+
+def rebuild_routes(conn, stream, routes):
+    """Recompute the stored features of ``routes`` from their full history."""
+    table, amount = STREAMS[stream]['history_table'], amount_column(stream)
+    placeholders = ', '.join('?' * len(routes))
+    history = pd.read_sql_query(
+        f"SELECT [Route], [Dump Date], [{amount}] FROM {table} WHERE [Route] IN ({placeholders}) "
+        f"ORDER BY rowid", conn, params=list(routes))
+    # Imported rows carry a time of day, rows from the entry pages only the date
+    history['Dump Date'] = pd.to_datetime(history['Dump Date'], format='ISO8601')
+    history = history.sort_values(by=['Route', 'Dump Date'], kind='stable')
+
+    ensure_table(conn)
+    by_route = dict(tuple(history.groupby('Route')))
+    for route in routes:
+        records = by_route.get(route)
+        if records is None:
+            # Stored empty so the history is not searched again on every prediction
+            _store(conn, stream, route, None, [])
+            continue
+        records = records.tail(KEEP)
+        _store(conn, stream, route, str(records['Dump Date'].iloc[-1]), records[amount].tolist())
+
+
+def record_dump(conn, stream, route, dump_date, amount):
+    """
+    Update a route's features for a newly inserted dump record (in the
+    caller's transaction). A record older than the route's latest one is
+    merged by rebuilding the route from its history.
+    """
+    ensure_stream(conn, stream)
+    version, built = versions(conn, stream)
+    if built + 1 != version:
+        # The history also changed some other way since the features were stored
+        invalidate(conn, stream)
+        return
+    _mark_built(conn, stream)
+    row = conn.execute("SELECT [Last Dump Date], [Recent] FROM RouteFeatures WHERE [Stream] = ? AND [Route] = ?",
+                       (stream, route)).fetchone()
+    dump_date = pd.to_datetime(dump_date)
+    if row is None or (row[0] is not None and pd.to_datetime(row[0]) > dump_date):
+        rebuild_routes(conn, stream, [route])
+        return
+    amounts = (json.loads(row[1]) + [float(amount)])[-KEEP:]
+    _store(conn, stream, route, str(dump_date), amounts)
+
+
+def route_features(conn, stream, routes):
+    """
+    Stored features of ``routes`` as a DataFrame indexed by route, with the
+    stream's column names (e.g. ``MSW_Lag_1``). Routes not in the store yet
+    are filled from their history first; routes without history get NaN.
+    """
+    changed = ensure_stream(conn, stream)
+    version, built = versions(conn, stream)
+    if version != built:
+        invalidate(conn, stream)
+        changed = True
+    if changed:
+        conn.commit()
+    routes = list(routes)
+    placeholders = ', '.join('?' * len(routes))
+    query = (f"SELECT [Route], {', '.join(f'[{n}]' for n in FEATURES)} FROM RouteFeatures "
+             f"WHERE [Stream] = ? AND [Route] IN ({placeholders})")
+    stored = pd.read_sql_query(query, conn, params=[stream] + routes)
+    missing = [r for r in routes if r not in set(stored['Route'])]
+    if missing:
+        rebuild_routes(conn, stream, missing)
+        conn.commit()
+        stored = pd.read_sql_query(query, conn, params=[stream] + routes)
+    features = stored.set_index('Route').reindex(routes).astype('float64')
+    features.columns = [f'{stream}_{name}' for name in FEATURES]
+    return features
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import joblib
+from HouseHold_Waste_Prediction_Chirath.feature_store import route_features
+from HouseHold_Waste_Prediction_Chirath.streams import ML_MODEL_DIR, STREAMS
+from shared.inference import MicroBatcher, compiled_call
+from shared.model_registry import registry
+
+
+def load_keras_model(path):
+    from keras.models import load_model
+    return load_model(path, compile=False)
+
+
+class ForecastPipeline:
+    """
+    Next-dump prediction for one waste stream (an entry of ``STREAMS``):
+    feature extraction, route encoding, scaling and inference, for any
+    number of routes in one model call.
+    """
+
+    def __init__(self, stream, config):
+        self.stream = stream
+        self.avgweek_table = config['avgweek_table']
+        self.routeweek_table = config['routeweek_table']
+        # Loaded by the model registry on first use
+        prefix = f'household.{stream.lower()}'
+        registry.register(f'{prefix}.model', lambda: load_keras_model(os.path.join(ML_MODEL_DIR, config['model'])))
+        registry.register(f'{prefix}.scaler', lambda: joblib.load(os.path.join(ML_MODEL_DIR, config['scaler'])),
+                          fork_safe=True)
+        registry.register(f'{prefix}.label_encoder',
+                          lambda: joblib.load(os.path.join(ML_MODEL_DIR, config['label_encoder'])), fork_safe=True)
+        # Concurrent predictions of the stream share model calls
+        registry.register(f'{prefix}.batcher', lambda: MicroBatcher(compiled_call(self.model), name=prefix))
+        self.registry_prefix = prefix
+
+    @property
+    def model(self):
+        return registry.get(f'{self.registry_prefix}.model')
+
+    @property
+    def scaler(self):
+        return registry.get(f'{self.registry_prefix}.scaler')
+
+    @property
+    def label_encoder(self):
+        return registry.get(f'{self.registry_prefix}.label_encoder')
+
+    def features(self, conn, dump_date, collected):
+        """
+        Model inputs of every route in ``collected`` ({route: collection day
+        0/1}), in the column order the model was trained with.
+        """
+        unknown = [r for r in collected if r not in set(self.label_encoder.classes_)]
+        if unknown:
+            raise ValueError(f"Unknown routes: {', '.join(unknown)}")
+
+        prefix, lower = self.stream, self.stream.lower()
+        routes = list(collected)
+        date = pd.to_datetime(dump_date)
+        week_number = date.week
+
+        avg_week = pd.read_sql_query(
+            f"SELECT [{prefix} Average Weekly Waste Percentage] FROM {self.avgweek_table} WHERE [Week Number] = ?",
+            conn, params=[int(week_number)])
+        route_week = pd.read_sql_query(
+            f"SELECT [Route], [{lower}_route_week] FROM {self.routeweek_table} WHERE [Week Number] = ?",
+            conn, params=[int(week_number)]).drop_duplicates('Route').set_index('Route')[f'{lower}_route_week']
+        missing = [r for r in routes if r not in route_week.index]
+        if avg_week.empty or missing:
+            raise ValueError(f"No weekly averages for week {week_number}"
+                             + (f" and routes {', '.join(missing)}" if missing else ""))
+
+        new_data = pd.DataFrame({
+            'Route': routes,
+            'Year': date.year,
+            'Month': date.month,
+            'Day of the Week': date.dayofweek,
+            'Week Number': week_number,
+            f'{prefix}_Collected': [float(collected[r]) for r in routes],
+            f'{prefix} Average Weekly Waste Percentage': avg_week.iloc[0, 0],
+            f'{lower}_route_week': route_week.reindex(routes).values,
+        })
+        # Lag and rolling features of every route's latest record
+        history = route_features(conn, prefix, routes)
+        return pd.concat([new_data, history.reset_index(drop=True)], axis=1)
+
+    def encode(self, new_data):
+        """``(route codes, scaled other features)``, the two model inputs."""
+        new_data = new_data.copy()
+        new_data['Route'] = self.label_encoder.transform(new_data['Route'])
+        new_data['Month_sin'] = np.sin(2 * np.pi * new_data['Month'] / 12)
+        new_data['Month_cos'] = np.cos(2 * np.pi * new_data['Month'] / 12)
+        new_data['Day_of_Week_sin'] = np.sin(2 * np.pi * new_data['Day of the Week'] / 7)
+        new_data['Day_of_Week_cos'] = np.cos(2 * np.pi * new_data['Day of the Week'] / 7)
+        new_data['Week_Number_sin'] = np.sin(2 * np.pi * new_data['Week Number'] / 52)
+        new_data['Week_Number_cos'] = np.cos(2 * np.pi * new_data['Week Number'] / 52)
+        X_new = new_data.drop(columns=['Month', 'Day of the Week', 'Week Number'])
+        X_new_route = X_new['Route'].values
+        X_new_other = self.scaler.transform(X_new.drop(columns=['Route']).values)
+        return X_new_route, X_new_other
+
+    def infer(self, X_new_route, X_new_other):
+        batcher = registry.get(f'{self.registry_prefix}.batcher')
+        return batcher.submit(np.asarray(X_new_route), np.asarray(X_new_other, dtype=np.float32)).flatten()
+
+    def predict(self, dump_date, collected):
+        """``{route: predicted kg}`` for one dump date (None where the model gives no number)."""
+        conn = sqlite3.connect('instance/database.db')
+        try:
+            new_data = self.features(conn, dump_date, collected)
+        finally:
+            conn.close()
+        predictions = self.infer(*self.encode(new_data))
+        return {route: None if np.isnan(p) else round(float(p), 2)
+                for route, p in zip(new_data['Route'], predictions)}
+
+
+# One pipeline per configured stream
+PIPELINES = {stream: ForecastPipeline(stream, config) for stream, config in STREAMS.items()}
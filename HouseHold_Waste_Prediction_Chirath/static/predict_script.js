@@ -75,23 +75,28 @@ document.getElementById('predictBtn').addEventListener('click', () => {
     alert('Please select a date.');
     return;
   }
-  // Use the last selected route for prediction
-  const latestRoute = selectedRoutes[selectedRoutes.length - 1];
+  // Predict every selected route in one request
+  const collected = {};
+  selectedRoutes.forEach(route => { collected[route] = mswCollected; });
 
-  fetch('/household/predict', {
+  fetch('/household/predict/batch', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({
-      route: latestRoute,
       dump_date: dumpDate,
-      msw_collected: mswCollected
+      routes: collected
     })
   })
   .then(response => response.json())
   .then(data => {
-    document.getElementById('predictionResult').innerText = `Predicted MSW: ${data.prediction} Kg`;
+    if (data.error) {
+      document.getElementById('predictionResult').innerText = data.error;
+      return;
+    }
+    const lines = Object.entries(data.predictions).map(([route, prediction]) => `${route}: ${prediction} Kg`);
+    document.getElementById('predictionResult').innerText = `Predicted MSW:\n${lines.join('\n')}`;
     // Clear the selectedRoutes
-    predictionsDict[latestRoute] = data.prediction;
+    Object.assign(predictionsDict, data.predictions);
     selectedRoutes = [];
   })
   .catch(error => {
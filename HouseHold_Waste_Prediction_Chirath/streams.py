@@ -0,0 +1,30 @@
+# Waste streams forecast by the household component. Every stream has its
+# dump history table, the weekly average tables exported from the notebooks
+# and the trained model files in ml_model/; the column names follow from the
+# stream name (e.g. "MSW Wastage Amount (Kg)", "msw_route_week"). Another
+# stream (e.g. recyclables) is added with one more entry here.
+
+ML_MODEL_DIR = 'HouseHold_Waste_Prediction_Chirath/ml_model'
+
+STREAMS = {
+    'MSW': {
+        'history_table': 'WasteData',
+        'avgweek_table': 'AvgWeek',
+        'routeweek_table': 'RouteWeek',
+        'model': 'MSW_model2.keras',
+        'scaler': 'scaler2.pkl',
+        'label_encoder': 'label_encoder2.pkl',
+    },
+    'SOW': {
+        'history_table': 'WasteDataSOW',
+        'avgweek_table': 'AvgWeekSOW',
+        'routeweek_table': 'RouteWeekSOW',
+        'model': 'SOW_model2.keras',
+        'scaler': 'sow_scaler2.pkl',
+        'label_encoder': 'sow_label_encoder2.pkl',
+    },
+}
+
+
+def amount_column(stream):
+    return f'{stream} Wastage Amount (Kg)'
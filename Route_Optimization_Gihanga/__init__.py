@@ -4,4 +4,4 @@ from flask_sqlalchemy import SQLAlchemy
 db = SQLAlchemy()
 route_optimization_bp = Blueprint('routeOptimization', __name__, template_folder='templates', static_folder='static')
 
-from Route_Optimization_Gihanga import routes
\ No newline at end of file
+from Route_Optimization_Gihanga import routes, commands
\ No newline at end of file
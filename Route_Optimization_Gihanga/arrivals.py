@@ -0,0 +1,188 @@
+import threading
+from datetime import datetime, timedelta
+import pytz
+
+from shared.models import db, DriverRoute, RouteGeometry, RouteStop
+from Route_Optimization_Gihanga.config import Config
+from Route_Optimization_Gihanga.planning import shift_start, store_route_geometry
+from Route_Optimization_Gihanga.tracking import latest_position
+from Route_Optimization_Gihanga.routing.eta import RouteTimeline, edge_travel_minutes
+from Route_Optimization_Gihanga.routing.geometry import route_path
+from Route_Optimization_Gihanga.routing.graph_store import get_spatial_index, get_contraction_hierarchy, get_shift_edge_minutes, get_speed_profile
+
+# Live ETAs for the stops of the stored routes. The timeline of a route is
+# built once per assignment; each new driver position is matched forward from
+# the previous match and all remaining ETAs are recomputed in one pass.
+
+_edge_minutes = {}
+_timelines = {}
+_progress = {}
+_etas = {}
+_lock = threading.Lock()
+
+
+def graph_edge_minutes(graph):
+    """Travel minutes per edge, per hour of the day once a speed profile has been learned."""
+    profile = get_speed_profile()
+    key = (graph.version, id(profile))
+    if key not in _edge_minutes:
+        _edge_minutes.clear()
+        _edge_minutes[key] = edge_travel_minutes(graph, Config.ROAD_TYPE_SPEEDS_KMH,
+                                                 Config.AVERAGE_SPEED_KMH, profile)
+    return _edge_minutes[key]
+
+
+def ist_hour(moment):
+    """Fractional hour of the day (IST) of a naive UTC datetime."""
+    local = moment.replace(tzinfo=pytz.utc).astimezone(pytz.timezone("Asia/Kolkata"))
+    return local.hour + local.minute / 60
+
+
+def route_timeline(driver_route, geometry):
+    """Timeline of a route in driving order and its ``(sequence, stop rows)`` in the same order."""
+    index = get_spatial_index()
+    edge_minutes = graph_edge_minutes(index.graph)
+    key = (geometry.etag, id(edge_minutes))
+    cached = _timelines.get(driver_route.id)
+    if cached and cached[0] == key:
+        return cached[1], cached[2]
+
+    route = driver_route.get_route()
+    path, positions = route_path(index, get_contraction_hierarchy(), route, get_shift_edge_minutes())
+
+    by_sequence = {}
+    for row in RouteStop.query.filter_by(route_id=driver_route.id).order_by(RouteStop.sequence):
+        if 0 < row.sequence < len(route) - 1:
+            by_sequence.setdefault(row.sequence, []).append(row)
+    sequences = sorted(by_sequence, key=lambda s: positions[s])
+
+    timeline = RouteTimeline.from_path(index.graph, path, [positions[s] for s in sequences],
+                                       Config.STOP_TIME_MINUTES, edge_minutes, Config.AVERAGE_SPEED_KMH)
+    stops = [(s, by_sequence[s]) for s in sequences]
+    _timelines[driver_route.id] = (key, timeline, stops)
+    return timeline, stops
+
+
+def route_etas(driver_route):
+    """
+    Remaining time to every stop of a route from the driver's latest
+    position, or from the shift start while the driver has not reported a
+    position for this assignment. None when the road graph is unavailable.
+    """
+    geometry = db.session.get(RouteGeometry, driver_route.id)
+    if not geometry:
+        geometry = store_route_geometry(driver_route)
+        db.session.commit()
+        if not geometry:
+            return None
+
+    position = latest_position(driver_route.driver_vehicle_no)
+    if position and position["recorded_at"] < driver_route.assigned_at.isoformat():
+        position = None  # from an earlier run
+
+    key = (geometry.etag, position["recorded_at"] if position else None)
+    cached = _etas.get(driver_route.id)
+    if position and cached and cached[0] == key:
+        return cached[1]
+
+    with _lock:
+        try:
+            timeline, stops = route_timeline(driver_route, geometry)
+        except Exception as e:
+            print(f"ETA timeline for {driver_route.driver_vehicle_no} unavailable: {e}")
+            return None
+        if position:
+            progress = _progress.get(driver_route.id)
+            start = progress[1] if progress and progress[0] == geometry.etag else 0
+            segment, fraction, offset_m = timeline.locate(position["lat"], position["lon"], start)
+            _progress[driver_route.id] = (geometry.etag, segment)
+            offset_km = offset_m / 1000 if offset_m > Config.ETA_OFF_ROUTE_M else 0.0
+            departure = datetime.fromisoformat(position["recorded_at"])
+        else:
+            segment, fraction, offset_km = 0, 0.0, 0.0
+            departure = max(shift_start(driver_route.assigned_at), datetime.utcnow())
+        minutes, km = timeline.remaining(segment, fraction, offset_km, Config.AVERAGE_SPEED_KMH,
+                                         hour=ist_hour(departure))
+
+    entries = []
+    for (sequence, rows), remaining, distance in zip(stops, minutes.tolist(), km.tolist()):
+        passed = remaining != remaining  # nan
+        entries.append({
+            "sequence": sequence,
+            "lat": rows[0].latitude,
+            "lon": rows[0].longitude,
+            "usernames": [r.username for r in rows if r.username],
+            "passed": passed,
+            "remaining_min": None if passed else round(remaining, 1),
+            "distance_km": None if passed else round(distance, 3),
+            "eta": None if passed else (departure + timedelta(minutes=remaining)).isoformat(),
+        })
+
+    if not position:
+        status = "not_started"
+    elif all(e["passed"] for e in entries):
+        status = "completed"
+    else:
+        status = "en_route"
+    result = {
+        "vehicle_no": driver_route.driver_vehicle_no,
+        "route_id": driver_route.id,
+        "status": status,
+        "position": position,
+        "off_route": bool(offset_km),
+        "computed_from": departure.isoformat(),
+        "stops": entries,
+    }
+    if position:
+        _etas[driver_route.id] = (key, result)
+    return result
+
+
+# Lookups used by /api/eta; each returns ``(body, status)``
+
+def vehicle_eta(vehicle_no):
+    driver_route = (DriverRoute.query
+                    .filter_by(driver_vehicle_no=vehicle_no)
+                    .order_by(DriverRoute.assigned_at.desc())
+                    .first())
+    if not driver_route:
+        return {"error": "No route assigned"}, 404
+    etas = route_etas(driver_route)
+    if etas is None:
+        return {"error": "Road network unavailable"}, 503
+    return etas, 200
+
+
+def citizen_eta(username):
+    """ETA of the stop serving a citizen on the most recently assigned route."""
+    stop = (RouteStop.query
+            .join(DriverRoute, RouteStop.route_id == DriverRoute.id)
+            .filter(RouteStop.username == username)
+            .order_by(DriverRoute.assigned_at.desc())
+            .first())
+    if not stop:
+        return {"error": "No pickup route assigned"}, 404
+    etas = route_etas(db.session.get(DriverRoute, stop.route_id))
+    if etas is None:
+        return {"error": "Road network unavailable"}, 503
+
+    stops_before = 0
+    matched = None
+    for entry in etas["stops"]:
+        if entry["sequence"] == stop.sequence:
+            matched = entry
+            break
+        if not entry["passed"]:
+            stops_before += 1
+    if matched is None:
+        # The stop is not on the route's timeline (e.g. it could not be placed on the road path)
+        return {"error": "Pickup stop not found on the assigned route"}, 409
+    return {
+        "vehicle_no": etas["vehicle_no"],
+        "status": etas["status"],
+        "position": etas["position"],
+        "off_route": etas["off_route"],
+        "computed_from": etas["computed_from"],
+        "stops_before": stops_before,
+        **{k: matched[k] for k in ("passed", "remaining_min", "distance_km", "eta")},
+    }, 200
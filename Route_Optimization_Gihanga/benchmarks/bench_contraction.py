@@ -0,0 +1,93 @@
+"""
+Contraction hierarchy vs. bidirectional Dijkstra on the cached road graph.
+
+    python -m Route_Optimization_Gihanga.benchmarks.bench_contraction --queries 1000
+
+Builds the hierarchy when none is stored for the current graph, then times
+random point-to-point queries and a stop-to-stop distance matrix with both
+methods and checks that the costs agree.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from Route_Optimization_Gihanga.config import Config
+from Route_Optimization_Gihanga.routing.contraction import ContractionHierarchy
+from Route_Optimization_Gihanga.routing.graph import RoadGraph
+from Route_Optimization_Gihanga.routing.distance_matrix import DistanceMatrix
+from Route_Optimization_Gihanga.routing.shortest_paths import bidirectional_dijkstra
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def load_or_build_ch(graph, path):
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        ch = ContractionHierarchy.load(path)
+        if ch.graph_version == graph.version:
+            return ch, 0.0
+    ch, elapsed = timed(ContractionHierarchy.build, graph)
+    ch.save(path)
+    return ch, elapsed
+
+
+def run(graph_path, ch_path, queries, stops, seed):
+    graph = RoadGraph.load(graph_path)
+    ch, build_seconds = load_or_build_ch(graph, ch_path)
+    rng = np.random.default_rng(seed)
+
+    pairs = rng.integers(0, graph.num_nodes, size=(queries, 2)).tolist()
+    ch.query(*pairs[0])  # warm the list conversions
+    graph.adjacency_lists()
+
+    ch_time = dijkstra_time = 0.0
+    mismatches = 0
+    for source, target in pairs:
+        (ch_cost, _), t1 = timed(ch.query, source, target)
+        (bd_cost, _), t2 = timed(bidirectional_dijkstra, graph, source, target)
+        ch_time += t1
+        dijkstra_time += t2
+        mismatches += abs(ch_cost - bd_cost) > 1e-9
+
+    stops = rng.choice(graph.num_nodes, size=min(stops, graph.num_nodes), replace=False).tolist()
+    ch_matrix, ch_matrix_time = timed(DistanceMatrix.build, graph, stops, ch)
+    dijkstra_matrix, dijkstra_matrix_time = timed(DistanceMatrix.build, graph, stops)
+    mismatches += int((np.abs(ch_matrix.cost - dijkstra_matrix.cost) > 1e-9).sum())
+
+    return {
+        "graph_version": graph.version,
+        "nodes": graph.num_nodes,
+        "edges": graph.num_edges,
+        "shortcuts": ch.num_shortcuts,
+        "ch_build_seconds": round(build_seconds, 3),
+        "point_to_point_ms": {
+            "contraction_hierarchy": round(ch_time / len(pairs) * 1000, 4),
+            "bidirectional_dijkstra": round(dijkstra_time / len(pairs) * 1000, 4),
+        },
+        f"matrix_{len(stops)}x{len(stops)}_seconds": {
+            "contraction_hierarchy": round(ch_matrix_time, 3),
+            "dijkstra_per_stop": round(dijkstra_matrix_time, 3),
+        },
+        "mismatches": mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--graph', default=Config.ROAD_GRAPH_PATH)
+    parser.add_argument('--ch', default=Config.CONTRACTION_HIERARCHY_PATH)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--stops', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(run(args.graph, args.ch, args.queries, args.stops, args.seed), indent=2))
+
+
+if __name__ == '__main__':
+    main()
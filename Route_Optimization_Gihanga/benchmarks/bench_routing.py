@@ -0,0 +1,250 @@
+"""
+End-to-end route engine benchmark on synthetic instances over the cached road graph.
+
+    python -m Route_Optimization_Gihanga.benchmarks.bench_routing --stops 200,1000,5000 \
+        --output bench.json [--baseline previous.json]
+
+Every instance is generated from ``--seed``: stops scattered around random
+neighbourhood centres on the graph (with GPS-like noise) and a lognormal kg
+demand per stop, with one truck per ``--stops-per-vehicle`` stops. Graph
+loading, snapping, the distance matrix, route construction and local search
+are timed separately, with the process's peak resident memory after each
+stage and the solution quality (distance, longest shift, unassigned stops).
+
+With ``--baseline`` the run is compared with an earlier report and exits
+with status 1 when a stage got slower or a solution worse than allowed. A
+baseline from another graph or with other settings is only warned about.
+
+The engine keeps dense stop-to-stop matrices (16 bytes per pair) and the
+savings construction sorts every stop pair (about 20 bytes more), so memory
+grows with the square of the stop count: about 3.4 GB at 10,000 stops. Sizes
+estimated above ``--max-memory-mb`` are skipped rather than run out of memory;
+tens of thousands of stops are beyond this engine.
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+from Route_Optimization_Gihanga.config import Config
+from Route_Optimization_Gihanga.routing.contraction import ContractionHierarchy
+from Route_Optimization_Gihanga.routing.distance_matrix import DistanceMatrix
+from Route_Optimization_Gihanga.routing.graph import RoadGraph
+from Route_Optimization_Gihanga.routing.optimizer import RouteOptimizer
+from Route_Optimization_Gihanga.routing.parallel import ParallelSolver
+from Route_Optimization_Gihanga.routing.spatial_index import SpatialIndex, METERS_PER_DEGREE
+from Route_Optimization_Gihanga.routing.tour import nearest_neighbour_tour
+from Route_Optimization_Gihanga.routing.vrp import FleetRules, construct_routes
+
+# Stages compared against the baseline; improvement runs for a fixed budget
+TIMED_STAGES = ('snap', 'matrix', 'construct')
+
+# Bytes per stop pair: cost and length matrices, plus the savings pair arrays
+MATRIX_BYTES_PER_PAIR = 16
+SAVINGS_BYTES_PER_PAIR = 20
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class Stages:
+    """Wall time and peak memory of the named stages of one run."""
+
+    def __init__(self):
+        self.report = {}
+
+    def run(self, name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.report[name] = {"seconds": round(time.perf_counter() - start, 4), "peak_rss_mb": peak_rss_mb()}
+        return result
+
+
+def synthetic_points(graph, num_stops, seed, neighbourhood_m=250.0, noise_m=15.0):
+    """
+    Reproducible waste points: 80% around ``num_stops / 50`` neighbourhood
+    centres (road nodes), the rest near uniformly chosen nodes, all with GPS
+    noise. Demand is lognormal around ``Config.DEFAULT_STOP_DEMAND_KG``.
+    """
+    rng = np.random.default_rng(seed)
+    centres = graph.coords[rng.integers(0, graph.num_nodes, size=max(num_stops // 50, 1))]
+    clustered = int(num_stops * 0.8)
+    spread = np.full(num_stops, noise_m)
+    spread[:clustered] = neighbourhood_m
+    base = np.concatenate([centres[rng.integers(0, len(centres), size=clustered)],
+                           graph.coords[rng.integers(0, graph.num_nodes, size=num_stops - clustered)]])
+    offset_m = rng.normal(size=(num_stops, 2)) * spread[:, None]
+    lat = base[:, 0] + offset_m[:, 0] / METERS_PER_DEGREE
+    lon = base[:, 1] + offset_m[:, 1] / (METERS_PER_DEGREE * np.cos(np.radians(base[:, 0])))
+    demand = rng.lognormal(math.log(Config.DEFAULT_STOP_DEMAND_KG), 0.5, size=num_stops)
+    return [{"lat": float(a), "lon": float(b), "demand_kg": round(float(d), 2)}
+            for a, b, d in zip(lat, lon, demand)]
+
+
+def load_ch(path, graph):
+    if not path or not os.path.exists(os.path.join(path, 'meta.json')):
+        return None
+    ch = ContractionHierarchy.load(path)
+    return ch if ch.graph_version == graph.version else None
+
+
+def estimated_memory_mb(num_stops, construction):
+    """Rough peak memory of the dense per-pair arrays of an instance."""
+    per_pair = MATRIX_BYTES_PER_PAIR + (SAVINGS_BYTES_PER_PAIR if construction == 'savings' else 0)
+    return (num_stops + 1) ** 2 * per_pair / 2 ** 20
+
+
+def run_instance(graph, index, ch, num_stops, args):
+    estimate = estimated_memory_mb(num_stops, args.construction)
+    if estimate > args.max_memory_mb:
+        print(f"Skipping {num_stops} stops: about {estimate:.0f} MB of dense matrices "
+              f"(--max-memory-mb {args.max_memory_mb})", file=sys.stderr)
+        return {"stops": num_stops, "skipped": f"estimated {estimate:.0f} MB"}
+
+    stages = Stages()
+    points = synthetic_points(graph, num_stops, args.seed + num_stops)
+    num_vehicles = max(1, math.ceil(num_stops / args.stops_per_vehicle))
+    vehicle_nos = [f"BENCH-{v}" for v in range(num_vehicles)]
+    optimizer = RouteOptimizer(index, ch, construction=args.construction, objective=args.objective,
+                               time_budget=args.time_budget,
+                               parallel=ParallelSolver(workers=args.workers, seed=args.seed))
+
+    point_nodes, _ = stages.run('snap', index.snap, [p['lat'] for p in points], [p['lon'] for p in points])
+    depot_node = optimizer.snap_depot()
+    stops_by_node, demand_by_node = optimizer.group_points(points, point_nodes.tolist())
+
+    matrix = stages.run('matrix', DistanceMatrix.build, graph, [depot_node] + list(stops_by_node), ch)
+    depot = matrix.position[depot_node]
+    stops = [matrix.position[node] for node in stops_by_node if node != depot_node]
+    demand = [demand_by_node.get(node, 0.0) if i != depot else 0.0 for i, node in enumerate(matrix.nodes)]
+    rules = FleetRules(matrix.length, demand, optimizer.vehicle_capacities(vehicle_nos), optimizer.max_shift,
+                       optimizer.average_speed, optimizer.stop_time, optimizer.objective)
+
+    routes, unassigned = stages.run('construct', construct_routes, matrix, depot, stops, rules,
+                                    graph.coords[matrix.nodes], optimizer.construction)
+    constructed = solution_quality(matrix, rules, routes, unassigned)
+
+    def improve():
+        tours = optimizer.parallel.improve_tours(matrix.cost, routes, optimizer.time_budget / 2)
+        return optimizer.parallel.improve_routes(matrix.cost, tours, rules, optimizer.time_budget / 2)
+
+    routes = stages.run('improve', improve)
+    single = nearest_neighbour_tour(matrix, depot, stops)
+
+    return {
+        "stops": num_stops,
+        "road_stops": len(stops),
+        "vehicles": num_vehicles,
+        "matrix_mb": round((matrix.cost.nbytes + matrix.length.nbytes) / 2 ** 20, 1),
+        "stages": stages.report,
+        "constructed": constructed,
+        "improved": solution_quality(matrix, rules, routes, unassigned),
+        "single_tour_km": round(matrix.tour_length(single), 3),
+    }
+
+
+def solution_quality(matrix, rules, routes, unassigned):
+    return {
+        "total_distance_km": round(sum(matrix.tour_length(r) for r in routes), 3),
+        "max_time_min": round(max((rules.route_duration(r) for r in routes), default=0.0), 1),
+        "unassigned": len(unassigned),
+    }
+
+
+def run(args):
+    stages = Stages()
+    graph = stages.run('load_graph', RoadGraph.load, args.graph)
+    index = stages.run('spatial_index', SpatialIndex, graph, Config.SNAP_CELL_SIZE_M)
+    ch = stages.run('load_ch', load_ch, args.ch, graph)
+    return {
+        "graph_version": graph.version,
+        "nodes": graph.num_nodes,
+        "edges": graph.num_edges,
+        "contraction_hierarchy": ch is not None,
+        "settings": {k: getattr(args, k) for k in ('seed', 'stops_per_vehicle', 'construction', 'objective',
+                                                     'time_budget', 'workers')},
+        "stages": stages.report,
+        "instances": [run_instance(graph, index, ch, n, args) for n in args.stops],
+    }
+
+
+def compare(report, baseline, time_tolerance, quality_tolerance):
+    """
+    ``(regressions, warnings)`` of ``report`` against ``baseline`` (instances
+    matched by stop count). A baseline of another graph or other settings is
+    not compared, only warned about.
+    """
+    if report.get("graph_version") != baseline.get("graph_version") or report["settings"] != baseline.get("settings"):
+        return [], ["baseline was run on another graph or with other settings; not compared"]
+    previous = {i["stops"]: i for i in baseline.get("instances", [])}
+    regressions = []
+    warnings = []
+    for instance in report["instances"]:
+        before = previous.get(instance["stops"])
+        if not before:
+            continue
+        if "skipped" in instance or "skipped" in before:
+            warnings.append(f"{instance['stops']} stops: skipped in this run or the baseline; not compared")
+            continue
+        for stage in TIMED_STAGES:
+            now, then = instance["stages"][stage]["seconds"], before["stages"][stage]["seconds"]
+            # Ignore noise on stages that take a few milliseconds
+            if now > then * (1 + time_tolerance) and now - then > 0.01:
+                regressions.append(f"{instance['stops']} stops: {stage} took {now:.3f}s (was {then:.3f}s)")
+        now, then = instance["improved"], before["improved"]
+        if now["unassigned"] > then["unassigned"]:
+            regressions.append(f"{instance['stops']} stops: {now['unassigned']} unassigned "
+                               f"(was {then['unassigned']})")
+        if now["total_distance_km"] > then["total_distance_km"] * (1 + quality_tolerance):
+            regressions.append(f"{instance['stops']} stops: {now['total_distance_km']} km "
+                               f"(was {then['total_distance_km']} km)")
+    return regressions, warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--graph', default=Config.ROAD_GRAPH_PATH)
+    parser.add_argument('--ch', default=Config.CONTRACTION_HIERARCHY_PATH)
+    parser.add_argument('--stops', type=lambda s: [int(n) for n in s.split(',')], default=[200, 1000, 2000],
+                        help="comma-separated instance sizes")
+    parser.add_argument('--stops-per-vehicle', type=int, default=150)
+    parser.add_argument('--construction', default=Config.VRP_CONSTRUCTION)
+    parser.add_argument('--objective', default=Config.ROUTING_OBJECTIVE)
+    parser.add_argument('--time-budget', type=float, default=Config.IMPROVEMENT_TIME_BUDGET_SECONDS)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="write the JSON report here as well")
+    parser.add_argument('--baseline', help="earlier report to check for regressions")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--quality-tolerance', type=float, default=0.02)
+    parser.add_argument('--max-memory-mb', type=float, default=4096,
+                        help="skip instances whose dense matrices would need more")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions, warnings = compare(report, json.load(f), args.time_tolerance, args.quality_tolerance)
+        for line in warnings:
+            print(f"WARNING {line}", file=sys.stderr)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
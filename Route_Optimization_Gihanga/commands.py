@@ -0,0 +1,131 @@
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+
+from Route_Optimization_Gihanga import route_optimization_bp
+from Route_Optimization_Gihanga.config import Config
+from Route_Optimization_Gihanga.jobs import fail_interrupted_jobs, run_daily_plan
+from Route_Optimization_Gihanga.pipeline import daily_plan_missed, next_daily_run
+from Route_Optimization_Gihanga.routing.graph_store import import_road_graph, build_contraction_hierarchy
+from Route_Optimization_Gihanga.planning import match_route_stops, pending_waste_points, route_stop_rows
+from Route_Optimization_Gihanga.tracking import learn_speed_profile, prune_positions
+from shared.models import db, DriverRoute, RouteStop
+
+
+# flask routeOptimization import-graph extract.json
+@route_optimization_bp.cli.command('import-graph')
+@click.argument('source', required=False)
+@click.option('--output', default=Config.ROAD_GRAPH_PATH, show_default=True,
+              help='Directory the pre-processed graph is written to.')
+def import_graph(source, output):
+    """Pre-process an Overpass JSON / OSM XML extract into the road graph cache.
+
+    Without SOURCE the extract is downloaded from Overpass.
+    """
+    graph = import_road_graph(source, output)
+    click.echo(f"Stored road graph {graph.version} ({graph.num_nodes} nodes, "
+               f"{graph.num_edges} edges) in {output}")
+
+
+# flask routeOptimization build-ch
+@route_optimization_bp.cli.command('build-ch')
+@click.option('--output', default=Config.CONTRACTION_HIERARCHY_PATH, show_default=True,
+              help='Directory the contraction hierarchy is written to.')
+def build_ch(output):
+    """Preprocess the cached road graph into a contraction hierarchy."""
+    ch, elapsed = build_contraction_hierarchy(
+        output, progress=lambda done, total: click.echo(f"  contracted {done}/{total} nodes"))
+    click.echo(f"Stored contraction hierarchy ({ch.num_shortcuts} shortcuts) in {output} "
+               f"after {elapsed:.1f} s")
+
+
+# flask routeOptimization backfill-route-stops
+@route_optimization_bp.cli.command('backfill-route-stops')
+def backfill_route_stops():
+    """Create route_stops rows for routes stored before the table existed."""
+    db.create_all()
+    points = pending_waste_points()
+    filled = 0
+    for driver_route in DriverRoute.query.all():
+        if RouteStop.query.filter_by(route_id=driver_route.id).first():
+            continue
+        route = driver_route.get_route()
+        stops = match_route_stops(route, points)
+        db.session.bulk_insert_mappings(RouteStop, route_stop_rows(driver_route, route, stops))
+        filled += 1
+    db.session.commit()
+    click.echo(f"Backfilled route stops for {filled} routes")
+
+
+# flask routeOptimization prune-positions
+@route_optimization_bp.cli.command('prune-positions')
+@click.option('--days', type=int, default=Config.POSITION_RETENTION_DAYS, show_default=True,
+              help='Days of GPS history to keep.')
+def prune_positions_command(days):
+    """Delete driver positions older than the retention period."""
+    deleted = prune_positions(days)
+    click.echo(f"Deleted {deleted} driver positions older than {days} days")
+
+
+# flask routeOptimization build-speed-profile
+@route_optimization_bp.cli.command('build-speed-profile')
+@click.option('--days', type=int, default=Config.POSITION_RETENTION_DAYS, show_default=True,
+              help='Days of GPS history to learn from.')
+@click.option('--output', default=Config.SPEED_PROFILE_PATH, show_default=True,
+              help='Directory the speed profile is written to.')
+def build_speed_profile(days, output):
+    """Learn per-road, per-hour truck speeds from the driver position history."""
+    profile, samples = learn_speed_profile(
+        days, output, progress=lambda day, fixes: click.echo(f"  {day}: {fixes} fixes"))
+    click.echo(f"Stored speed profile from {samples} matched fixes in {output} "
+               f"({profile.coverage:.1%} of edge-hours learned)")
+
+
+def _daily_plan(force=False):
+    job = run_daily_plan(current_app._get_current_object(), force)
+    if job is None:
+        click.echo("Today's routes are already planned (use --force to plan again)")
+    elif job.status == 'done':
+        result = job.get_result()
+        click.echo(f"Planned {result['points']} waste points for {len(result['drivers'])} drivers "
+                   f"({len(result['unassigned'])} unassigned, {result['warmed_routes']} routes warmed), "
+                   f"job {job.id}")
+    else:
+        click.echo(f"Daily plan failed: {job.error} (job {job.id})")
+    return job
+
+
+# flask routeOptimization plan-daily
+@route_optimization_bp.cli.command('plan-daily')
+@click.option('--force', is_flag=True, help="Plan again even if today's plan was already made.")
+def plan_daily(force):
+    """Snapshot the waste entries, plan and assign today's routes and warm their caches."""
+    db.create_all()
+    fail_interrupted_jobs()
+    _daily_plan(force)
+
+
+# flask routeOptimization scheduler
+@route_optimization_bp.cli.command('scheduler')
+def scheduler():
+    """Run the daily plan every day at DAILY_PLAN_HOUR_IST (IST); runs until interrupted.
+
+    A plan missed while the scheduler was down is made at start-up if the
+    shift has not started yet.
+    """
+    db.create_all()
+    fail_interrupted_jobs()
+    if daily_plan_missed():
+        _daily_plan()
+    while True:
+        at = next_daily_run()
+        click.echo(f"Next daily plan at {at.isoformat()} UTC")
+        time.sleep(max((at - datetime.utcnow()).total_seconds(), 0))
+        try:
+            _daily_plan()
+        except Exception as e:
+            # Keep the scheduler alive for tomorrow's run
+            db.session.rollback()
+            click.echo(f"Daily plan failed: {e}")
@@ -0,0 +1,109 @@
+import os
+
+
+class Config:
+    BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+    INSTANCE_DIR = os.path.join(os.path.dirname(BASE_DIR), 'instance')
+
+    # Pre-processed road graph written by `flask routeOptimization import-graph`
+    ROAD_GRAPH_PATH = os.getenv('ROAD_GRAPH_PATH', os.path.join(INSTANCE_DIR, 'road_graph'))
+    # Optional contraction hierarchy written by `flask routeOptimization build-ch`;
+    # used for the distance matrix whenever it matches the loaded graph
+    CONTRACTION_HIERARCHY_PATH = os.getenv('CONTRACTION_HIERARCHY_PATH', os.path.join(ROAD_GRAPH_PATH, 'ch'))
+    # Optional per-edge, per-hour truck speeds learned from the GPS history by
+    # `flask routeOptimization build-speed-profile`
+    SPEED_PROFILE_PATH = os.getenv('SPEED_PROFILE_PATH', os.path.join(ROAD_GRAPH_PATH, 'speed_profile'))
+    # Download the extract from Overpass when no cached graph exists yet
+    OVERPASS_FALLBACK = os.getenv('OVERPASS_FALLBACK', '1') == '1'
+
+    # Road network extract used by the server-side route engine
+    OVERPASS_API_URL = (
+        "https://overpass-api.de/api/interpreter?data=[out:json];"
+        "way[highway](6.80,79.84,6.87,79.89);out geom;"
+    )
+    OVERPASS_TIMEOUT_SECONDS = 60
+
+    ROAD_TYPE_WEIGHTS = {
+        'motorway': 1,
+        'primary': 1.2,
+        'secondary': 1.5,
+        'tertiary': 1.8,
+        'residential': 2,
+        'service': 2.5,
+        'path': 4,
+    }
+    DEFAULT_ROAD_WEIGHT = 2
+
+    # Depot (Municipal Council)
+    DEPOT_LAT = 6.8613
+    DEPOT_LON = 79.8643
+
+    # Grid cell size of the node/edge spatial index used for snapping
+    SNAP_CELL_SIZE_M = 100
+
+    AVERAGE_SPEED_KMH = 25
+    STOP_TIME_MINUTES = 2
+    # Truck speed per road type for live ETAs (AVERAGE_SPEED_KMH otherwise)
+    ROAD_TYPE_SPEEDS_KMH = {
+        'motorway': 50,
+        'primary': 35,
+        'secondary': 30,
+        'tertiary': 25,
+        'residential': 20,
+        'service': 15,
+        'path': 10,
+    }
+    # A driver further than this from the route is treated as off-route
+    ETA_OFF_ROUTE_M = 150
+    # Speed profile learning: fixes further than this from a road are not
+    # matched, gaps longer than this end a trace, bins with fewer samples are
+    # left to the road-type speed
+    SPEED_MATCH_DISTANCE_M = 25
+    SPEED_MAX_GAP_SECONDS = 60
+    SPEED_PROFILE_MIN_SAMPLES = 3
+
+    # Seconds of 2-opt / Or-opt / relocate / exchange after the greedy tours;
+    # the /api/optimize payload can override it with "time_budget"
+    IMPROVEMENT_TIME_BUDGET_SECONDS = float(os.getenv('IMPROVEMENT_TIME_BUDGET_SECONDS', '2'))
+    # Repair of the changed routes after late submissions/cancellations
+    REOPTIMIZE_TIME_BUDGET_SECONDS = float(os.getenv('REOPTIMIZE_TIME_BUDGET_SECONDS', '0.5'))
+
+    # 'vrp' builds capacity- and shift-aware routes for every driver, 'split'
+    # cuts one nearest-neighbour tour into equal slices (the old behaviour)
+    ROUTING_SOLVER = os.getenv('ROUTING_SOLVER', 'vrp')
+    # 'distance' (total) or 'makespan' (longest driver shift)
+    ROUTING_OBJECTIVE = os.getenv('ROUTING_OBJECTIVE', 'distance')
+    # 'savings' (Clarke-Wright), 'sweep' or 'cluster' (one balanced k-means
+    # zone per driver, seeded with the drivers' zones of the last assignment)
+    VRP_CONSTRUCTION = os.getenv('VRP_CONSTRUCTION', 'savings')
+    # Zones may carry this much more or less than their share of the demand
+    CLUSTER_BALANCE_SLACK = 0.1
+    VEHICLE_CAPACITY_KG = float(os.getenv('VEHICLE_CAPACITY_KG', '5000'))
+    MAX_SHIFT_MINUTES = float(os.getenv('MAX_SHIFT_MINUTES', '480'))
+    # Trucks leave the depot at this hour (IST) on the collection day
+    SHIFT_START_HOUR_IST = 9
+    # Used when a point has no demand_kg and no prediction is supplied
+    DEFAULT_STOP_DEMAND_KG = float(os.getenv('DEFAULT_STOP_DEMAND_KG', '10'))
+
+    # Worker processes for the local search (1 = run in the web process);
+    # restarts are multi-start searches, restart k seeded with OPTIMIZER_SEED + k
+    OPTIMIZER_WORKERS = int(os.getenv('OPTIMIZER_WORKERS', str(min(os.cpu_count() or 1, 4))))
+    OPTIMIZER_RESTARTS = int(os.getenv('OPTIMIZER_RESTARTS', '4'))
+    OPTIMIZER_SEED = int(os.getenv('OPTIMIZER_SEED', '0'))
+
+    # Threads per web process running background route-planning jobs
+    JOB_WORKERS = int(os.getenv('ROUTING_JOB_WORKERS', '2'))
+
+    # Live driver tracking: fixes per POST, days of history kept (whole days
+    # are dropped by partition_day)
+    MAX_POSITION_BATCH = 500
+    POSITION_RETENTION_DAYS = int(os.getenv('POSITION_RETENTION_DAYS', '7'))
+
+    # Waste entries newer than this are collected in the next run
+    WASTE_WINDOW_HOURS = 14
+    # The submission window closes at this hour (IST); the scheduler
+    # (flask routeOptimization scheduler) then plans and assigns the day's
+    # routes. Nobody waits for that run, so it can search longer.
+    DAILY_PLAN_HOUR_IST = 6
+    DAILY_PLAN_CONSTRUCTION = os.getenv('DAILY_PLAN_CONSTRUCTION', 'cluster')
+    DAILY_PLAN_TIME_BUDGET_SECONDS = float(os.getenv('DAILY_PLAN_TIME_BUDGET_SECONDS', '30'))
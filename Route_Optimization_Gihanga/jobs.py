@@ -0,0 +1,142 @@
+import os
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+
+from shared.models import db, RoutingJob
+from Route_Optimization_Gihanga.config import Config
+from Route_Optimization_Gihanga.pipeline import DAILY_JOB_KIND, daily_plan, daily_plan_done, plan_date
+from Route_Optimization_Gihanga.planning import pending_waste_points, plan_routes, update_routes
+
+# Job kind -> planning function taking (payload, progress)
+JOB_KINDS = {
+    'optimize': plan_routes,
+    'reoptimize': update_routes,
+    DAILY_JOB_KIND: daily_plan,
+}
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Thread pool running the jobs of this process. The heavy local search
+    already runs in the optimizer's process pool, so threads are enough here;
+    they only keep the Flask request threads free.
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=Config.JOB_WORKERS,
+                                               thread_name_prefix='routing-job')
+    return _executor
+
+
+def job_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_running(owner):
+    """
+    Whether the process that stored a job is still running. Only processes of
+    this host can be checked; on Windows os.kill cannot probe a process, so
+    those are assumed to be running too.
+    """
+    host, _, pid = (owner or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit() or os.name == 'nt':
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def fail_interrupted_jobs():
+    """
+    Fail the queued/running jobs of processes that stopped; they will never
+    finish. Jobs of running processes (other web workers, the scheduler) are
+    left alone. Called once when a web worker or CLI command starts.
+    """
+    stale = [job for job in RoutingJob.query.filter(RoutingJob.status.in_(('queued', 'running'))).all()
+             if not owner_running(job.owner)]
+    for job in stale:
+        job.status = 'failed'
+        job.error = "Interrupted by a server restart"
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return len(stale)
+
+
+def store_job(kind, params):
+    job = RoutingJob(id=uuid.uuid4().hex, kind=kind, status='queued', progress=0.0, owner=job_owner())
+    job.set_params(params)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def submit_job(kind, params):
+    """Store a queued job and hand it to the worker pool; returns the job row."""
+    executor = get_executor()
+    job = store_job(kind, params)
+    executor.submit(run_job, current_app._get_current_object(), job.id)
+    return job
+
+
+def run_job(app, job_id):
+    with app.app_context():
+        job = db.session.get(RoutingJob, job_id)
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        def progress(fraction, message):
+            job.progress = round(fraction, 3)
+            job.message = message
+            db.session.commit()
+
+        try:
+            result, status = JOB_KINDS[job.kind](job.get_params(), progress)
+        except Exception as e:
+            traceback.print_exc()
+            db.session.rollback()
+            result, status = {"error": str(e)}, 500
+
+        job = db.session.get(RoutingJob, job_id)
+        if status < 400:
+            job.status = 'done'
+            job.progress = 1.0
+            job.message = "Finished"
+            job.set_result(result)
+            job.error = None
+        else:
+            job.status = 'failed'
+            job.error = result.get("error")
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+def run_daily_plan(app, force=False):
+    """
+    Snapshot the pending waste entries and run the daily planning job in this
+    thread; returns the job row, or None when today's plan was already made
+    (unless ``force``).
+    """
+    day = plan_date()
+    if not force and daily_plan_done(day):
+        return None
+    job = store_job(DAILY_JOB_KIND, {"plan_date": day, "points": pending_waste_points()})
+    run_job(app, job.id)
+    # run_job committed through the session of its own app context
+    db.session.refresh(job)
+    return job
@@ -0,0 +1,135 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytz
+
+from shared.models import DriverRoute, RoutingJob
+from Route_Optimization_Gihanga.arrivals import route_etas
+from Route_Optimization_Gihanga.config import Config
+from Route_Optimization_Gihanga.planning import pending_waste_points, plan_routes
+
+# Daily precomputation. When the submission window closes (06:00 IST) the
+# waste entries are snapshotted, planned and assigned, and everything the
+# driver and citizen pages read is built ahead of the shift: the stored
+# routes with their stops, geometry and directions in the database. The ETA
+# timelines are per process: the process running the plan builds its own,
+# and every other process (the web workers when the CLI scheduler plans)
+# builds them in the background once it sees a new daily plan.
+
+DAILY_JOB_KIND = 'daily'
+
+# Daily planning job whose routes this process has warmed, the IST day it
+# was for and when to look for a newer one; requests check at most once per
+# WARM_CHECK_SECONDS until the day's plan is warmed
+WARM_CHECK_SECONDS = 60
+_warmed_plan = None
+_warmed_date = None
+_next_check = 0.0
+_warm_lock = threading.Lock()
+
+
+def _ist(moment):
+    return moment.replace(tzinfo=pytz.utc).astimezone(pytz.timezone("Asia/Kolkata"))
+
+
+def plan_date(moment=None):
+    """IST collection day ("YYYY-MM-DD") of a daily plan made at ``moment`` (naive UTC)."""
+    return _ist(moment or datetime.utcnow()).date().isoformat()
+
+
+def next_daily_run(now=None):
+    """Naive UTC time of the first daily planning run after ``now``."""
+    tz_ist = pytz.timezone("Asia/Kolkata")
+    day = _ist(now or datetime.utcnow()).date()
+    for offset in (0, 1):
+        run_day = day + timedelta(days=offset)
+        run = tz_ist.localize(datetime(run_day.year, run_day.month, run_day.day, Config.DAILY_PLAN_HOUR_IST))
+        run = run.astimezone(pytz.utc).replace(tzinfo=None)
+        if run > (now or datetime.utcnow()):
+            return run
+
+
+def daily_plan_done(day):
+    """The finished daily planning job for IST ``day``, if there is one."""
+    jobs = (RoutingJob.query
+            .filter_by(kind=DAILY_JOB_KIND, status='done')
+            .order_by(RoutingJob.created_at.desc())
+            .limit(10))
+    return next((job for job in jobs if (job.get_result() or {}).get("plan_date") == day), None)
+
+
+def daily_plan_missed(now=None):
+    """Whether today's window has closed before the shift start without a daily plan being made."""
+    hour = _ist(now or datetime.utcnow()).hour
+    if not Config.DAILY_PLAN_HOUR_IST <= hour < Config.SHIFT_START_HOUR_IST:
+        return False
+    return daily_plan_done(plan_date(now)) is None
+
+
+def warm_route_caches(vehicle_nos):
+    """Build the ETA timelines of the drivers' stored routes; returns how many are ready."""
+    warmed = 0
+    for driver_route in DriverRoute.query.filter(DriverRoute.driver_vehicle_no.in_(vehicle_nos)).all():
+        if route_etas(driver_route) is not None:
+            warmed += 1
+    return warmed
+
+
+def warm_latest_plan(app):
+    """
+    Start warming this process's caches for the routes of the latest daily
+    plan unless already done; returns whether warming was started. Cheap to
+    call per request: once today's plan is warmed it returns without a query,
+    before that it looks for the plan at most every ``WARM_CHECK_SECONDS``.
+    """
+    global _warmed_plan, _warmed_date, _next_check
+    with _warm_lock:
+        if _warmed_date == plan_date() or time.monotonic() < _next_check:
+            return False
+        _next_check = time.monotonic() + WARM_CHECK_SECONDS
+    job = (RoutingJob.query
+           .filter_by(kind=DAILY_JOB_KIND, status='done')
+           .order_by(RoutingJob.finished_at.desc())
+           .first())
+    if job is None:
+        return False
+    result = job.get_result() or {}
+    with _warm_lock:
+        if job.id == _warmed_plan:
+            return False
+        _warmed_plan, _warmed_date = job.id, result.get("plan_date")
+    vehicle_nos = [driver["vehicle_no"] for driver in result.get("drivers", [])]
+
+    def warm():
+        with app.app_context():
+            warmed = warm_route_caches(vehicle_nos)
+            print(f"Warmed {warmed} route caches for daily plan {job.id}")
+
+    threading.Thread(target=warm, name='route-cache-warmup', daemon=True).start()
+    return True
+
+
+def daily_plan(data, progress=None):
+    """
+    Plan and assign the routes of the collection day. ``points`` is the
+    snapshot taken when the window closed (the pending entries when absent);
+    the other keys are the /api/optimize options, with the daily construction
+    and time budget as defaults.
+    """
+    progress = progress or (lambda fraction, message: None)
+    payload = dict(data)
+    if payload.get('points') is None:
+        payload['points'] = pending_waste_points()
+    payload['assign'] = True
+    payload.setdefault('construction', Config.DAILY_PLAN_CONSTRUCTION)
+    payload.setdefault('time_budget', Config.DAILY_PLAN_TIME_BUDGET_SECONDS)
+
+    result, status = plan_routes(payload, lambda fraction, message: progress(0.9 * fraction, message))
+    if status >= 400:
+        return result, status
+
+    progress(0.9, "Warming route caches")
+    result["plan_date"] = payload.get('plan_date') or plan_date()
+    result["points"] = len(payload['points'])
+    result["warmed_routes"] = warm_route_caches([driver["vehicle_no"] for driver in result["drivers"]])
+    return result, 200
@@ -0,0 +1,304 @@
+from datetime import datetime, timedelta
+import hashlib
+import pytz
+
+from shared.models import db, CitizenTimeWindow, Driver, DriverRoute, DriverZone, RouteDirections, RouteGeometry, RouteStop, WasteAvailability
+from Route_Optimization_Gihanga.config import Config
+from Route_Optimization_Gihanga.routing.directions import route_directions
+from Route_Optimization_Gihanga.routing.geometry import route_geometry, route_path, route_point
+from Route_Optimization_Gihanga.routing.graph_store import get_spatial_index, get_contraction_hierarchy, get_shift_edge_minutes
+from Route_Optimization_Gihanga.routing.optimizer import RouteOptimizer
+from Route_Optimization_Gihanga.routing.parallel import ParallelSolver
+from Route_Optimization_Gihanga.routing.snap_cache import snap_waste_points
+
+# Route planning shared by the API endpoints and the background jobs. Each
+# function takes the request payload and returns ``(body, status)``.
+
+
+def store_route(vehicle_no, route, stops=None, path=None):
+    """
+    Save a driver's route and its ``route_stops`` rows. ``stops`` are the
+    optimizer's stop entries (username, node, eta_min); without them the
+    citizens are matched to the route points from the pending waste entries.
+    ``path`` is the optimizer's ``(road path, positions)`` of the route.
+    """
+    # Check if a route already exists for this driver
+    driver_route = DriverRoute.query.filter_by(driver_vehicle_no=vehicle_no).first()
+    if driver_route:
+        # Update existing route
+        driver_route.set_route(route)
+        driver_route.assigned_at = datetime.utcnow()
+        RouteStop.query.filter_by(route_id=driver_route.id).delete(synchronize_session=False)
+    else:
+        # Create a new record
+        driver_route = DriverRoute(driver_vehicle_no=vehicle_no, assigned_at=datetime.utcnow())
+        driver_route.set_route(route)
+        db.session.add(driver_route)
+        db.session.flush()
+
+    if stops is None:
+        stops = match_route_stops(route, pending_waste_points())
+    db.session.bulk_insert_mappings(RouteStop, route_stop_rows(driver_route, route, stops))
+    store_route_geometry(driver_route, path)
+
+
+def route_etag(driver_route, geometry=None):
+    """Validator for the driver-route payload; changes whenever the route is reassigned."""
+    digest = hashlib.sha1(driver_route.route_data.encode('utf-8'))
+    digest.update(driver_route.assigned_at.isoformat().encode('utf-8'))
+    if geometry is not None:
+        digest.update(geometry.polyline.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def store_route_geometry(driver_route, path=None):
+    """
+    Precompute what the maps need for a stored route: the encoded road
+    geometry and the driver's turn-by-turn directions. ``path`` is the
+    route's ``(road path, positions)`` when the optimizer already has it;
+    otherwise every leg is searched again. Returns the ``RouteGeometry`` row,
+    or None (dropping any stale rows) when the road graph is unavailable.
+    """
+    geometry = db.session.get(RouteGeometry, driver_route.id)
+    directions = db.session.get(RouteDirections, driver_route.id)
+    try:
+        index = get_spatial_index()
+        path, positions = path or route_path(index, get_contraction_hierarchy(), driver_route.get_route(),
+                                             get_shift_edge_minutes())
+    except Exception as e:
+        print(f"Route geometry for {driver_route.driver_vehicle_no} not stored: {e}")
+        for stale in (geometry, directions):
+            if stale:
+                db.session.delete(stale)
+        return None
+
+    if not geometry:
+        geometry = RouteGeometry(route_id=driver_route.id)
+        db.session.add(geometry)
+    geometry.set_geometry(route_geometry(index.graph, path, positions))
+    geometry.created_at = datetime.utcnow()
+    geometry.etag = route_etag(driver_route, geometry)
+
+    if not directions:
+        directions = RouteDirections(route_id=driver_route.id)
+        db.session.add(directions)
+    directions.set_steps(route_directions(index.graph, path))
+    directions.created_at = geometry.created_at
+    directions.etag = f"{geometry.etag}-d"
+    return geometry
+
+
+def shift_start(assigned_at):
+    """
+    Departure (UTC) of the collection run a route was assigned for: the
+    submission window closes at 06:00 IST, so routes assigned from 19:00 IST
+    onwards are driven the next morning.
+    """
+    tz_ist = pytz.timezone("Asia/Kolkata")
+    assigned_ist = assigned_at.replace(tzinfo=pytz.utc).astimezone(tz_ist)
+    day = assigned_ist.date() + timedelta(days=1 if assigned_ist.hour >= 19 else 0)
+    start_ist = tz_ist.localize(datetime(day.year, day.month, day.day, Config.SHIFT_START_HOUR_IST))
+    return start_ist.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def match_route_stops(route, points, tolerance=0.001):
+    """Stop entries for points lying on a route point (routes stored without stops)."""
+    positions = {}
+    for point in route[1:-1]:
+        lat, lon = route_point(point)
+        positions.setdefault((round(lat / tolerance), round(lon / tolerance)), [lat, lon])
+    stops = []
+    for p in points:
+        node = positions.get((round(p['lat'] / tolerance), round(p['lon'] / tolerance)))
+        if node:
+            stops.append({"lat": p['lat'], "lon": p['lon'], "username": p.get('username'), "node": node})
+    return stops
+
+
+def route_stop_rows(driver_route, route, stops):
+    """
+    One row per route position, or per citizen where several share a stop.
+    The ``eta_min`` of the stops are arrivals in the stored order, which is
+    the order the driver runs the route.
+    """
+    start = shift_start(driver_route.assigned_at)
+    by_point = {}
+    for stop in stops:
+        by_point.setdefault(tuple(stop['node']), []).append(stop)
+
+    usernames = {s['username'] for s in stops if s.get('username')}
+    waste_ids = {}
+    if usernames:
+        cutoff = datetime.utcnow() - timedelta(hours=Config.WASTE_WINDOW_HOURS)
+        for entry in (WasteAvailability.query
+                      .filter(WasteAvailability.username.in_(usernames), WasteAvailability.date >= cutoff)
+                      .order_by(WasteAvailability.id)):
+            waste_ids[entry.username] = entry.id
+
+    rows = []
+    for sequence, point in enumerate(route):
+        lat, lon = route_point(point)
+        served = by_point.pop((lat, lon), None) if 0 < sequence < len(route) - 1 else None
+        for stop in served or [{}]:
+            eta = stop.get('eta_min')
+            rows.append({
+                "route_id": driver_route.id,
+                "sequence": sequence,
+                "username": stop.get('username'),
+                "waste_id": waste_ids.get(stop.get('username')),
+                "node": stop.get('node_id'),
+                "latitude": lat,
+                "longitude": lon,
+                "planned_eta": start + timedelta(minutes=eta) if eta is not None else None,
+            })
+    # ETAs that go backwards along the route were planned for another stop
+    # order (e.g. a route edited before assigning), so none of them hold
+    planned = [row['planned_eta'] for row in rows if row['planned_eta'] is not None]
+    if any(later < earlier for earlier, later in zip(planned, planned[1:])):
+        for row in rows:
+            row['planned_eta'] = None
+    return rows
+
+
+def driver_zones(vehicle_nos):
+    """``{vehicle_no: [lat, lon]}`` of the zones stored with the last assignment."""
+    rows = DriverZone.query.filter(DriverZone.vehicle_no.in_(vehicle_nos)).all()
+    return {z.vehicle_no: [z.latitude, z.longitude] for z in rows}
+
+
+def store_driver_zone(vehicle_no, zone):
+    if zone is None:
+        return
+    row = db.session.get(DriverZone, vehicle_no) or DriverZone(vehicle_no=vehicle_no)
+    row.latitude, row.longitude = zone
+    db.session.add(row)
+
+
+def pending_waste_points():
+    """Waste entries of the current collection window, with the citizen's time window if one is set."""
+    cutoff = datetime.utcnow() - timedelta(hours=Config.WASTE_WINDOW_HOURS)
+    waste_entries = WasteAvailability.query.filter(WasteAvailability.date >= cutoff).all()
+    usernames = {w.username for w in waste_entries}
+    windows = {}
+    if usernames:
+        windows = {t.username: [t.opens, t.closes] for t in
+                   CitizenTimeWindow.query.filter(CitizenTimeWindow.username.in_(usernames)).all()}
+    points = []
+    for w in waste_entries:
+        point = {"lat": w.latitude, "lon": w.longitude, "username": w.username}
+        if w.username in windows:
+            point["time_window"] = windows[w.username]
+        points.append(point)
+    return points
+
+
+def _number(data, key):
+    value = data.get(key)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{key}' must be a number")
+
+
+def _no_progress(fraction, message):
+    pass
+
+
+def plan_routes(data, progress=None):
+    """Full optimisation run; with ``assign`` the routes are also stored for the drivers."""
+    progress = progress or _no_progress
+
+    points = data.get('points')
+    if points is None:
+        points = pending_waste_points()
+
+    vehicle_nos = data.get('vehicle_nos') or [driver.vehicle_no for driver in Driver.query.all()]
+
+    if not points:
+        return {"error": "No waste collection points to route"}, 400
+
+    progress(0.0, "Loading road network")
+    try:
+        index = get_spatial_index()
+        ch = get_contraction_hierarchy()
+    except Exception as e:
+        return {"error": f"Road network unavailable: {e}"}, 503
+
+    try:
+        progress(0.05, "Snapping waste points")
+        point_nodes = snap_waste_points(index, points)
+        optimizer = RouteOptimizer(
+            index, ch,
+            time_budget=_number(data, 'time_budget'),
+            solver=data.get('solver'),
+            objective=data.get('objective'),
+            construction=data.get('construction'),
+            max_shift=_number(data, 'max_shift_min'),
+            parallel=ParallelSolver(restarts=data.get('restarts'), seed=data.get('seed')),
+            edge_minutes=get_shift_edge_minutes(),
+        )
+        result = optimizer.optimize(points, vehicle_nos, point_nodes,
+                                    capacities=data.get('capacities'),
+                                    predicted_kg=data.get('predicted_kg'),
+                                    progress=progress,
+                                    zones=driver_zones(vehicle_nos),
+                                    shift_windows=data.get('shift_windows'))
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    result["single_route"].pop("path")
+    paths = {driver["vehicle_no"]: driver.pop("path") for driver in result["drivers"]}
+    if data.get('assign'):
+        for driver in result["drivers"]:
+            store_route(driver["vehicle_no"], driver["route"], driver["stops"], paths[driver["vehicle_no"]])
+            store_driver_zone(driver["vehicle_no"], driver["zone"])
+    # The routes (when assigned) and the new citizen snaps
+    db.session.commit()
+
+    return result, 200
+
+
+def update_routes(data, progress=None):
+    """Incremental update of the stored routes; ``dry_run`` leaves them untouched."""
+    progress = progress or _no_progress
+
+    points = data.get('points')
+    if points is None:
+        points = pending_waste_points()
+
+    stored = {r.driver_vehicle_no: r.get_route() for r in DriverRoute.query.all()}
+    vehicle_nos = data.get('vehicle_nos') or [driver.vehicle_no for driver in Driver.query.all()]
+    current_routes = {vehicle_no: stored.get(vehicle_no, []) for vehicle_no in vehicle_nos}
+
+    progress(0.0, "Loading road network")
+    try:
+        index = get_spatial_index()
+        ch = get_contraction_hierarchy()
+    except Exception as e:
+        return {"error": f"Road network unavailable: {e}"}, 503
+
+    try:
+        progress(0.1, "Snapping waste points")
+        point_nodes = snap_waste_points(index, points)
+        progress(0.3, "Repairing routes")
+        optimizer = RouteOptimizer(index, ch, objective=data.get('objective'),
+                                   edge_minutes=get_shift_edge_minutes())
+        result = optimizer.reoptimize(
+            current_routes, points, point_nodes,
+            capacities=data.get('capacities'),
+            time_budget=_number(data, 'time_budget'),
+            shift_windows=data.get('shift_windows'),
+        )
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+    paths = {change["vehicle_no"]: change.pop("path") for change in result["changes"]}
+    if not data.get('dry_run'):
+        for change in result["changes"]:
+            store_route(change["vehicle_no"], change["route"], change["stops"], paths[change["vehicle_no"]])
+    # The changed routes (unless a dry run) and the new citizen snaps
+    db.session.commit()
+
+    return result, 200
@@ -1,13 +1,27 @@
-from flask import Blueprint, render_template, session, redirect, url_for, flash, jsonify, request
+from flask import Blueprint, render_template, session, redirect, url_for, flash, jsonify, request, current_app
 import networkx as nx
 from datetime import datetime, timedelta
 import pytz
 import math
+import gzip
+import json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 from Route_Optimization_Gihanga import route_optimization_bp
-from shared.models import db, Citizen, Driver, DriverRoute, WasteAvailability
+from shared.models import db, Citizen, CitizenTimeWindow, Driver, DriverRoute, RouteDirections, RouteGeometry, RouteStop, WasteAvailability, RoutingJob
 #from Route_Optimization_Gihanga.models import db, Citizen, Driver, DriverRoute
 from shared.forms import CitizenLoginForm
+from Route_Optimization_Gihanga.routing.graph_store import get_road_graph
+from Route_Optimization_Gihanga.planning import plan_routes, update_routes, store_route, store_route_geometry, route_etag
+from Route_Optimization_Gihanga.jobs import JOB_KINDS, submit_job
+from Route_Optimization_Gihanga.pipeline import warm_latest_plan
+from Route_Optimization_Gihanga.tracking import latest_positions, record_positions
+from Route_Optimization_Gihanga.arrivals import citizen_eta, vehicle_eta
+from Route_Optimization_Gihanga.routing.time_windows import format_clock, parse_window
 
 @route_optimization_bp.route('/waste-collection-map-admin')
 def waste_collection_map_admin():
@@ -55,22 +69,156 @@ def assign_routes():
         vehicle_no = assignment.get('vehicle_no')
         route = assignment.get('route')
         if vehicle_no and route:
-            # Check if a route already exists for this driver
-            driver_route = DriverRoute.query.filter_by(driver_vehicle_no=vehicle_no).first()
-            if driver_route:
-                # Update existing route
-                driver_route.set_route(route)
-                driver_route.assigned_at = datetime.utcnow()
-            else:
-                # Create a new record
-                new_route = DriverRoute(driver_vehicle_no=vehicle_no)
-                new_route.set_route(route)
-                db.session.add(new_route)
+            store_route(vehicle_no, route, assignment.get('stops'))
 
     db.session.commit()
     return jsonify({"status": "success"}), 200
 
+# API: Optimize Routes
+@route_optimization_bp.route('/api/optimize', methods=['POST'])
+def optimize_routes():
+
+    data = request.get_json(silent=True) or {}
+    if data.get('async'):
+        return job_accepted(submit_job('optimize', data))
+
+    result, status = plan_routes(data)
+    return jsonify(result), status
+
+# API: Update the stored routes with late submissions / cancellations
+@route_optimization_bp.route('/api/reoptimize', methods=['POST'])
+def reoptimize_routes():
+
+    data = request.get_json(silent=True) or {}
+    if data.get('async'):
+        return job_accepted(submit_job('reoptimize', data))
+
+    result, status = update_routes(data)
+    return jsonify(result), status
+
+# API: Service hours of stops with restricted access (e.g. commercial
+# premises); the planner treats them as time windows
+@route_optimization_bp.route('/api/time-windows', methods=['GET'])
+def get_time_windows():
+
+    windows = CitizenTimeWindow.query.order_by(CitizenTimeWindow.username).all()
+    return jsonify({"time_windows": [w.to_dict() for w in windows]}), 200
+
+@route_optimization_bp.route('/api/time-windows', methods=['POST'])
+def set_time_window():
+
+    data = request.get_json(silent=True) or {}
+    username = data.get('username')
+    if not username or not Citizen.query.filter_by(username=username).first():
+        return jsonify({"error": "Citizen not found"}), 404
+
+    window = db.session.get(CitizenTimeWindow, username)
+    if data.get('time_window') is None:
+        # No window: the stop can be served at any time of the shift
+        if window:
+            db.session.delete(window)
+            db.session.commit()
+        return jsonify({"username": username, "time_window": None}), 200
+    try:
+        opens, closes = parse_window(data['time_window'])
+        if closes == math.inf:
+            raise ValueError("A time window needs a closing time")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    window = window or CitizenTimeWindow(username=username)
+    window.opens, window.closes = format_clock(opens), format_clock(closes)
+    db.session.add(window)
+    db.session.commit()
+    return jsonify(window.to_dict()), 200
+
+# API: Background route-planning jobs
+@route_optimization_bp.route('/api/jobs', methods=['POST'])
+def create_job():
+
+    data = request.get_json(silent=True) or {}
+    kind = data.pop('kind', 'optimize')
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"Unknown job kind '{kind}'"}), 400
+    return job_accepted(submit_job(kind, data))
+
+@route_optimization_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+
+    job = db.session.get(RoutingJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+def job_accepted(job):
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = url_for('routeOptimization.get_job', job_id=job.id)
+    return response, 202
+
+# API: Road network from the local graph cache (replaces the Overpass download on the maps)
+_road_data_cache = {}
+
+@route_optimization_bp.route('/api/road-data', methods=['GET'])
+def road_data():
+
+    try:
+        graph = get_road_graph()
+    except Exception as e:
+        return jsonify({"error": f"Road network unavailable: {e}"}), 503
+
+    if graph.version not in _road_data_cache:
+        _road_data_cache.clear()
+        _road_data_cache[graph.version] = graph.to_overpass()
+    return jsonify(_road_data_cache[graph.version])
+
 # API: Get Driver Route
+# Compressed bodies keyed by (etag, encoding); the payload only changes when
+# a route is reassigned, so each driver's phone gets it compressed once
+_compressed_cache = {}
+
+def compressed(response, etag):
+    """gzip / brotli the response body when the client accepts it."""
+    accepted = request.headers.get('Accept-Encoding', '')
+    if brotli is not None and 'br' in accepted:
+        encoding = 'br'
+    elif 'gzip' in accepted:
+        encoding = 'gzip'
+    else:
+        return response
+
+    key = (etag, encoding)
+    if key not in _compressed_cache:
+        if len(_compressed_cache) >= 256:
+            _compressed_cache.clear()
+        body = response.get_data()
+        _compressed_cache[key] = brotli.compress(body) if encoding == 'br' else gzip.compress(body, 6)
+    response.set_data(_compressed_cache[key])
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def cached_json(etag, payload):
+    """
+    JSON response validated by ``etag``: 304 when the client already has it,
+    otherwise ``payload()`` serialised and compressed.
+    """
+    response = current_app.response_class(status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Vary'] = 'Accept-Encoding, Cookie'
+    if request.if_none_match.contains(etag):
+        response.status_code = 304
+        return response
+    response.set_data(json.dumps(payload(), separators=(',', ':')))
+    return compressed(response, etag)
+
+def latest_driver_route(vehicle_no):
+    return (
+        DriverRoute.query
+        .filter_by(driver_vehicle_no=vehicle_no)
+        .order_by(DriverRoute.assigned_at.desc())
+        .first()
+    )
+
 @route_optimization_bp.route('/api/driver-route', methods=['GET'])
 def get_driver_route():
 
@@ -78,21 +226,96 @@ def get_driver_route():
     if not vehicle_no:
         return jsonify({"error": "Not logged in"}), 401
 
-    driver_route = (
-        DriverRoute.query
-        .filter_by(driver_vehicle_no=vehicle_no)
-        .order_by(DriverRoute.assigned_at.desc())
-        .first()
-    )
+    driver_route = latest_driver_route(vehicle_no)
     if not driver_route:
         return jsonify({"error": "No route assigned"}), 404
 
-    # Return the stored route as JSON
-    return jsonify({
+    # Routes stored before geometries were precomputed get theirs on first request
+    geometry = db.session.get(RouteGeometry, driver_route.id)
+    if not geometry:
+        geometry = store_route_geometry(driver_route)
+        db.session.commit()
+
+    # Return the stored route points and the encoded road geometry
+    return cached_json(geometry.etag if geometry else route_etag(driver_route), lambda: {
         "route": driver_route.get_route(),
-        "assigned_at": driver_route.assigned_at.isoformat()
+        "assigned_at": driver_route.assigned_at.isoformat(),
+        "geometry": geometry.to_dict() if geometry else None,
     })
 
+# API: Turn-by-turn directions precomputed when the route was assigned
+@route_optimization_bp.route('/api/driver-directions', methods=['GET'])
+def get_driver_directions():
+
+    vehicle_no = session.get('driver_vehicle_no')
+    if not vehicle_no:
+        return jsonify({"error": "Not logged in"}), 401
+
+    driver_route = latest_driver_route(vehicle_no)
+    if not driver_route:
+        return jsonify({"error": "No route assigned"}), 404
+
+    directions = db.session.get(RouteDirections, driver_route.id)
+    if not directions:
+        store_route_geometry(driver_route)
+        db.session.commit()
+        directions = db.session.get(RouteDirections, driver_route.id)
+        if not directions:
+            return jsonify({"error": "Road network unavailable"}), 503
+
+    return cached_json(directions.etag, directions.to_dict)
+
+
+# API: Live driver positions (batched GPS fixes from the driver map)
+@route_optimization_bp.route('/api/driver-positions', methods=['POST'])
+def post_driver_positions():
+
+    vehicle_no = session.get('driver_vehicle_no')
+    if not vehicle_no:
+        return jsonify({"error": "Not logged in"}), 401
+
+    data = request.get_json(silent=True) or {}
+    try:
+        accepted, rejected = record_positions(vehicle_no, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"accepted": accepted, "rejected": rejected}), 200
+
+# API: Latest position of every driver (admin fleet view)
+@route_optimization_bp.route('/api/driver-positions', methods=['GET'])
+def get_driver_positions():
+
+    if 'admin_username' not in session:
+        if {'driver_vehicle_no', 'citizen_username'} & set(session):
+            return jsonify({"error": "Not authorized"}), 403
+        return jsonify({"error": "Not logged in"}), 401
+
+    return jsonify({"positions": latest_positions()}), 200
+
+
+# API: Live ETAs. ?vehicle_no= gives every stop of that route (admins, or the
+# driver of that vehicle); otherwise the logged-in citizen's pickup or the
+# logged-in driver's route
+@route_optimization_bp.route('/api/eta', methods=['GET'])
+def get_eta():
+
+    vehicle_no = request.args.get('vehicle_no')
+    if vehicle_no:
+        if not ({'admin_username', 'driver_vehicle_no', 'citizen_username'} & set(session)):
+            return jsonify({"error": "Not logged in"}), 401
+        if 'admin_username' not in session and session.get('driver_vehicle_no') != vehicle_no:
+            return jsonify({"error": "Not authorized for this vehicle"}), 403
+        result, status = vehicle_eta(vehicle_no)
+    elif 'citizen_username' in session:
+        result, status = citizen_eta(session['citizen_username'])
+    elif session.get('driver_vehicle_no'):
+        result, status = vehicle_eta(session['driver_vehicle_no'])
+    else:
+        return jsonify({"error": "Not logged in"}), 401
+    # Build the timelines of a daily plan made by another process (scheduler)
+    warm_latest_plan(current_app._get_current_object())
+    return jsonify(result), status
+
 
 @route_optimization_bp.route('/citizen/waste_availability', methods=['GET', 'POST'])
 def citizen_waste_availability():
@@ -221,70 +444,36 @@ def citizen_map():
 
         assigned_driver_no = "N/A"
         assigned_route = []
+        route_geometry = None
         driver_start = [citizen_lat, citizen_lon]
     else:
-        # Citizen does have a recent waste availability
-        assigned_driver_no = None
-        assigned_route = None
-        TOLERANCE = 0.001
-        found_match = False
-
-        all_driver_routes = DriverRoute.query.order_by(DriverRoute.assigned_at.desc()).all()
-
-        for dr in all_driver_routes:
-            raw_points = dr.get_route()
-            if not raw_points:
-                continue
-
-            parsed_points = []
-            for p in raw_points:
-                if isinstance(p, str):
-                    lat_str, lon_str = p.split(',')
-                    lat = float(lat_str)
-                    lon = float(lon_str)
-                elif isinstance(p, list) and len(p) == 2:
-                    lat = float(p[0])
-                    lon = float(p[1])
-                else:
-                    continue
-
-                parsed_points.append([lat, lon])
-
-                # Check tolerance
-                if (abs(lat - citizen_lat) < TOLERANCE and
-                    abs(lon - citizen_lon) < TOLERANCE):
-                    assigned_driver_no = dr.driver_vehicle_no
-                    assigned_route = parsed_points
-                    found_match = True
-                    break
-
-            if found_match:
-                break
-
-        if not assigned_driver_no:
+        # Citizen does have a recent waste availability: find the stop that
+        # serves them on the most recently assigned route
+        stop = (RouteStop.query
+                .join(DriverRoute, RouteStop.route_id == DriverRoute.id)
+                .filter(RouteStop.username == citizen.username)
+                .order_by(DriverRoute.assigned_at.desc())
+                .first())
+
+        if not stop:
             flash("No assigned driver found for your location yet.", "info")
             assigned_driver_no = "N/A"
             assigned_route = []
+            route_geometry = None
             driver_start = [citizen_lat, citizen_lon]
         else:
-            # If you want the full route from DB:
-            full_raw_points = (DriverRoute.query
-                               .filter_by(driver_vehicle_no=assigned_driver_no)
-                               .order_by(DriverRoute.assigned_at.desc())
-                               .first()
-                               .get_route())
-            full_parsed = []
-            for p in full_raw_points:
-                if isinstance(p, str):
-                    lat_str, lon_str = p.split(',')
-                    lat = float(lat_str)
-                    lon = float(lon_str)
-                else:
-                    lat, lon = p[0], p[1]
-                full_parsed.append([lat, lon])
-
-            assigned_route = full_parsed
+            assigned_driver_no = db.session.get(DriverRoute, stop.route_id).driver_vehicle_no
+            rows = (RouteStop.query
+                    .with_entities(RouteStop.sequence, RouteStop.latitude, RouteStop.longitude)
+                    .filter_by(route_id=stop.route_id)
+                    .order_by(RouteStop.sequence)
+                    .all())
+            # Stops shared by several citizens have one row each
+            assigned_route = [[lat, lon] for i, (sequence, lat, lon) in enumerate(rows)
+                              if i == 0 or rows[i - 1][0] != sequence]
             driver_start = assigned_route[0]
+            geometry = db.session.get(RouteGeometry, stop.route_id)
+            route_geometry = geometry.to_dict() if geometry else None
 
     # Render the template
     return render_template(
@@ -293,5 +482,6 @@ def citizen_map():
         citizen_lon=citizen_lon,
         driver_vehicle_no=assigned_driver_no,
         driver_start=driver_start,
-        driver_route=assigned_route
+        driver_route=assigned_route,
+        route_geometry=route_geometry
     )
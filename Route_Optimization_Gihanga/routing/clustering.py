@@ -0,0 +1,140 @@
+import math
+
+import numpy as np
+
+from .graph import EARTH_RADIUS_KM
+
+
+def project(coords, origin):
+    """Local equirectangular metres of ``(lat, lon)`` rows around ``origin``."""
+    coords = np.radians(np.atleast_2d(np.asarray(coords, dtype=np.float64)))
+    origin = np.radians(np.asarray(origin, dtype=np.float64))
+    scale = np.array([1.0, math.cos(origin[0])])
+    return (coords - origin) * scale * EARTH_RADIUS_KM * 1000
+
+
+def kmeans_plus_plus(xy, centroids, rng):
+    """Fill the ``nan`` rows of ``centroids`` by k-means++ seeding, keeping the given ones."""
+    centroids = centroids.copy()
+    known = np.isfinite(centroids).all(axis=1)
+    if not known.any():
+        centroids[0] = xy[rng.integers(len(xy))]
+        known[0] = True
+    nearest = ((xy[:, None, :] - centroids[None, known]) ** 2).sum(axis=2).min(axis=1)
+    for k in np.nonzero(~known)[0]:
+        total = nearest.sum()
+        i = rng.choice(len(xy), p=nearest / total) if total > 0 else rng.integers(len(xy))
+        centroids[k] = xy[i]
+        nearest = np.minimum(nearest, ((xy - xy[i]) ** 2).sum(axis=1))
+    return centroids
+
+
+def balance_prices(distance, weights, target, slack, price=None, step=None, max_steps=60):
+    """
+    Per-cluster prices so that assigning every point to its cheapest cluster
+    (squared distance + price) loads each cluster within ``slack`` of its
+    target. Overloaded clusters get dearer, underloaded ones cheaper; a
+    cluster's step halves whenever its imbalance changes sign.
+
+    Returns ``(labels, price, step)``; pass ``price`` and ``step`` back in to
+    continue from them after the centroids move.
+    """
+    k = distance.shape[1]
+    price = np.zeros(k) if price is None else price.copy()
+    step = np.full(k, np.median(distance.min(axis=1)) + 1.0) if step is None else step.copy()
+    previous = np.zeros(k)
+    labels = np.argmin(distance + price, axis=1)
+    for _ in range(max_steps):
+        load = np.bincount(labels, weights=weights, minlength=k)
+        imbalance = load / target - 1
+        if np.all(np.abs(imbalance) <= slack):
+            break
+        flipped = np.sign(imbalance) * np.sign(previous) < 0
+        step = np.where(flipped, step / 2, step * 1.5)
+        price = price + step * np.sign(imbalance) * (np.abs(imbalance) > slack / 2)
+        price -= price.min()
+        previous = imbalance
+        labels = np.argmin(distance + price, axis=1)
+    return labels, price, step
+
+
+def capped_assignment(distance, weights, limit):
+    """
+    Greedy assignment respecting ``limit`` per cluster: points with the most
+    to lose (largest regret between their best and second-best cluster) pick
+    first. Used once at the end, after the prices have done most of the work.
+    """
+    order = np.argsort(distance, axis=1)
+    ranked = np.take_along_axis(distance, order, axis=1)
+    regret = ranked[:, 1] - ranked[:, 0] if distance.shape[1] > 1 else np.zeros(len(distance))
+    labels = np.empty(len(distance), dtype=np.int64)
+    room = np.asarray(limit, dtype=np.float64).copy()
+    for i in np.argsort(-regret, kind='stable'):
+        for c in order[i]:
+            if weights[i] <= room[c]:
+                break
+        else:
+            c = int(np.argmax(room))  # nothing fits: least overloaded cluster
+        labels[i] = c
+        room[c] -= weights[i]
+    return labels
+
+
+def _centroids(xy, weights, labels, previous):
+    k = len(previous)
+    total = np.bincount(labels, weights=weights, minlength=k)
+    sums = np.stack([np.bincount(labels, weights=weights * xy[:, d], minlength=k) for d in (0, 1)], axis=1)
+    return np.divide(sums, total[:, None], out=previous.copy(), where=total[:, None] > 0)
+
+
+def balanced_kmeans(xy, weights, shares, centroids=None, slack=0.1, tolerance_m=5.0, patience=3,
+                    max_iterations=30, seed=0):
+    """
+    Balanced k-means over points ``xy`` (metres): cluster ``k`` takes about
+    ``shares[k]`` of the total ``weights``, within ``slack``. Each iteration
+    prices the clusters into balance (see :func:`balance_prices`) and moves
+    the centroids, until no centroid moves more than ``tolerance_m`` or the
+    spread (weighted squared distance to the centroids) has not improved for
+    ``patience`` iterations. The best centroids found are kept and the final
+    labels capped with :func:`capped_assignment`.
+
+    ``centroids`` (``nan`` rows allowed) warm-starts the search, e.g. with the
+    zones of the last run. Returns ``(labels, centroids, iterations)``.
+    """
+    xy = np.asarray(xy, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.sum() <= 0:
+        weights = np.ones(len(xy))
+    shares = np.asarray(shares, dtype=np.float64)
+    k = len(shares)
+    if len(xy) == 0 or k == 0:
+        return np.zeros(len(xy), dtype=np.int64), np.full((k, 2), np.nan), 0
+    target = np.maximum(shares / shares.sum() * weights.sum(), 1e-9)
+
+    rng = np.random.default_rng(seed)
+    if centroids is None:
+        centroids = np.full((k, 2), np.nan)
+    centroids = kmeans_plus_plus(xy, np.asarray(centroids, dtype=np.float64), rng)
+
+    price = step = None
+    best = None
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        distance = ((xy[:, None, :] - centroids[None]) ** 2).sum(axis=2)
+        labels, price, step = balance_prices(distance, weights, target, slack, price, step)
+        # Near-balanced partitions can keep trading points at the borders
+        spread = float(np.dot(weights, distance[np.arange(len(xy)), labels]))
+        if best is None or spread < best[0] * (1 - 1e-4):
+            best = (spread, iterations, centroids, price)
+        elif iterations - best[1] >= patience:
+            break
+        moved = _centroids(xy, weights, labels, centroids)
+        shift = np.hypot(*(moved - centroids).T).max()
+        centroids = moved
+        if shift <= tolerance_m:
+            break
+    _, _, centroids, price = best
+
+    distance = ((xy[:, None, :] - centroids[None]) ** 2).sum(axis=2)
+    labels = capped_assignment(distance + price, weights, target * (1 + slack))
+    return labels, _centroids(xy, weights, labels, centroids), iterations
@@ -0,0 +1,291 @@
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+from .shortest_paths import path_from_predecessors
+
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy over the (undirected) road graph.
+
+    Nodes are contracted in order of edge difference; shortcuts that skip a
+    contracted node remember it as their ``middle`` so paths can be unpacked.
+    Only upward edges (towards higher-ranked nodes) are kept, in CSR form, and
+    every query is a pair of small upward searches that meet in the middle.
+
+    It is built on the graph's static weights, or on the per-edge ``weights``
+    given to ``build`` (e.g. learned travel minutes); ``weights_id`` names
+    those so a hierarchy built on other weights is not used.
+    """
+
+    ARRAYS = ('rank', 'up_indptr', 'up_indices', 'up_weight', 'up_length', 'up_middle')
+
+    def __init__(self, rank, up_indptr, up_indices, up_weight, up_length, up_middle, graph_version,
+                 weights_id=None):
+        self.rank = np.asarray(rank, dtype=np.int32)
+        self.up_indptr = np.asarray(up_indptr, dtype=np.int64)
+        self.up_indices = np.asarray(up_indices, dtype=np.int32)
+        self.up_weight = np.asarray(up_weight, dtype=np.float64)
+        self.up_length = np.asarray(up_length, dtype=np.float64)
+        self.up_middle = np.asarray(up_middle, dtype=np.int32)
+        self.graph_version = graph_version
+        self.weights_id = weights_id
+        self._lists = None
+        self._middles = None
+
+    @property
+    def num_shortcuts(self):
+        return int((self.up_middle >= 0).sum())
+
+    # Preprocessing
+
+    @classmethod
+    def build(cls, graph, witness_settle_limit=50, progress=None, weights=None, weights_id=None):
+        indptr, indices, adj_weights, lengths = graph.adjacency_lists()
+        if weights is not None:
+            adj_weights = np.asarray(weights, dtype=np.float64)[graph.adj_edge].tolist()
+        n = graph.num_nodes
+        adj = [dict() for _ in range(n)]
+        for u in range(n):
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                if v != u and (v not in adj[u] or adj_weights[k] < adj[u][v][0]):
+                    adj[u][v] = (adj_weights[k], lengths[k], -1)
+
+        def witness_search(source, excluded, targets, limit):
+            dist = {source: 0.0}
+            heap = [(0.0, source)]
+            remaining = set(targets)
+            settled = 0
+            while heap:
+                d, x = heapq.heappop(heap)
+                if d > dist[x]:
+                    continue
+                if d > limit:
+                    break
+                remaining.discard(x)
+                settled += 1
+                if not remaining or settled > witness_settle_limit:
+                    break
+                for y, (w, _, _) in adj[x].items():
+                    nd = d + w
+                    if y != excluded and nd < dist.get(y, math.inf):
+                        dist[y] = nd
+                        heapq.heappush(heap, (nd, y))
+            return dist
+
+        def shortcuts_for(v):
+            neighbours = list(adj[v].items())
+            shortcuts = []
+            for i, (u, (wu, lu, _)) in enumerate(neighbours):
+                others = neighbours[i + 1:]
+                if not others:
+                    continue
+                limit = wu + max(w for _, (w, _, _) in others)
+                # A tentative distance is an upper bound, so it is a valid witness
+                dist = witness_search(u, v, [x for x, _ in others], limit)
+                for x, (wx, lx, _) in others:
+                    if dist.get(x, math.inf) > wu + wx:
+                        shortcuts.append((u, x, wu + wx, lu + lx))
+            return shortcuts
+
+        deleted_neighbours = [0] * n
+
+        def priority(v):
+            shortcuts = shortcuts_for(v)
+            return len(shortcuts) - len(adj[v]) + deleted_neighbours[v], shortcuts
+
+        heap = [(priority(v)[0], v) for v in range(n)]
+        heapq.heapify(heap)
+        rank = [0] * n
+        contracted = [False] * n
+        up = [None] * n
+        order = 0
+
+        while heap:
+            _, v = heapq.heappop(heap)
+            if contracted[v]:
+                continue
+            # Lazy update: re-evaluate and postpone if no longer the cheapest
+            p, shortcuts = priority(v)
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))
+                continue
+
+            rank[v] = order
+            order += 1
+            contracted[v] = True
+            up[v] = list(adj[v].items())
+            for u in adj[v]:
+                del adj[u][v]
+                deleted_neighbours[u] += 1
+            for a, b, w, length in shortcuts:
+                if b not in adj[a] or w < adj[a][b][0]:
+                    adj[a][b] = (w, length, v)
+                    adj[b][a] = (w, length, v)
+            adj[v] = {}
+
+            if progress and order % 5000 == 0:
+                progress(order, n)
+
+        up_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(edges) for edges in up], out=up_indptr[1:])
+        flat = [(u, w, length, m) for edges in up for u, (w, length, m) in edges]
+        up_indices, up_weight, up_length, up_middle = (list(col) for col in zip(*flat)) if flat else ([], [], [], [])
+        return cls(rank, up_indptr, up_indices, up_weight, up_length, up_middle, graph.version, weights_id)
+
+    # Persistence
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({"graph_version": self.graph_version, "weights_id": self.weights_id,
+                       "shortcuts": self.num_shortcuts}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in cls.ARRAYS]
+        return cls(*arrays, graph_version=meta['graph_version'], weights_id=meta.get('weights_id'))
+
+    # Queries
+
+    def _up_lists(self):
+        if self._lists is None:
+            self._lists = (self.up_indptr.tolist(), self.up_indices.tolist(),
+                           self.up_weight.tolist(), self.up_length.tolist())
+        return self._lists
+
+    def _upward(self, source):
+        """Dijkstra restricted to upward edges; returns ``(dist, length, pred)``."""
+        indptr, indices, weights, lengths = self._up_lists()
+        dist = {source: 0.0}
+        length = {source: 0.0}
+        pred = {source: -1}
+        settled = {}
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled[u] = d
+            lu = length[u]
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                nd = d + weights[k]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    length[v] = lu + lengths[k]
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
+        return settled, length, pred
+
+    def _middle(self, a, b):
+        if self._middles is None:
+            middles = {}
+            indptr, indices, _, _ = self._up_lists()
+            up_middle = self.up_middle.tolist()
+            for v, (start, end) in enumerate(zip(indptr[:-1], indptr[1:])):
+                for k in range(start, end):
+                    m = up_middle[k]
+                    if m >= 0:
+                        middles[(v, indices[k])] = m
+                        middles[(indices[k], v)] = m
+            self._middles = middles
+        return self._middles.get((a, b), -1)
+
+    def unpack(self, path):
+        """Expand a path over CH edges into original road nodes."""
+        if len(path) < 2:
+            return list(path)
+        out = [path[0]]
+        stack = [(a, b) for a, b in zip(path[:-1], path[1:])][::-1]
+        while stack:
+            a, b = stack.pop()
+            m = self._middle(a, b)
+            if m < 0:
+                out.append(b)
+            else:
+                stack.append((m, b))
+                stack.append((a, m))
+        return out
+
+    @staticmethod
+    def _join(forward_pred, backward_pred, meeting):
+        up = path_from_predecessors(forward_pred, meeting)
+        down = path_from_predecessors(backward_pred, meeting)
+        return up + down[::-1][1:]
+
+    def query(self, source, target):
+        """Point-to-point shortest path; returns ``(cost, road node path)``."""
+        forward, _, forward_pred = self._upward(source)
+        best = math.inf
+        meeting = -1
+        backward, _, backward_pred = self._upward(target)
+        for node, d in backward.items():
+            total = forward.get(node, math.inf) + d
+            if total < best:
+                best = total
+                meeting = node
+        if meeting < 0:
+            return math.inf, []
+        return best, self.unpack(self._join(forward_pred, backward_pred, meeting))
+
+    def many_to_many(self, sources, targets):
+        """
+        Bucket-based many-to-many search: one upward search per target fills
+        buckets at every node it reaches, then one upward search per source
+        scans those buckets. Returns a :class:`ManyToManyPaths`.
+        """
+        buckets = {}
+        backward_preds = []
+        for j, target in enumerate(targets):
+            dist, length, pred = self._upward(target)
+            backward_preds.append(pred)
+            for node, d in dist.items():
+                buckets.setdefault(node, []).append((j, d, length[node]))
+
+        cost = np.full((len(sources), len(targets)), np.inf)
+        total_length = np.full((len(sources), len(targets)), np.inf)
+        meeting = np.full((len(sources), len(targets)), -1, dtype=np.int64)
+        forward_preds = []
+        for i, source in enumerate(sources):
+            dist, length, pred = self._upward(source)
+            forward_preds.append(pred)
+            best = [math.inf] * len(targets)
+            best_length = [math.inf] * len(targets)
+            best_meeting = [-1] * len(targets)
+            for node, d in dist.items():
+                for j, d2, l2 in buckets.get(node, ()):
+                    if d + d2 < best[j]:
+                        best[j] = d + d2
+                        best_length[j] = length[node] + l2
+                        best_meeting[j] = node
+            cost[i] = best
+            total_length[i] = best_length
+            meeting[i] = best_meeting
+        return ManyToManyPaths(self, cost, total_length, meeting, forward_preds, backward_preds)
+
+
+class ManyToManyPaths:
+    def __init__(self, ch, cost, length, meeting, forward_preds, backward_preds):
+        self.ch = ch
+        self.cost = cost
+        self.length = length
+        self.meeting = meeting
+        self.forward_preds = forward_preds
+        self.backward_preds = backward_preds
+
+    def path(self, i, j):
+        meeting = int(self.meeting[i, j])
+        if meeting < 0:
+            return []
+        return self.ch.unpack(self.ch._join(self.forward_preds[i], self.backward_preds[j], meeting))
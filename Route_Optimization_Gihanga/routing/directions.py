@@ -0,0 +1,92 @@
+import numpy as np
+
+from .graph import haversine_km
+
+# A bearing change of more than this many degrees is announced as a turn
+TURN_ANGLE = 30
+
+
+def bearings(coords):
+    """Initial great-circle bearing (0-360 degrees) of every segment of a coordinate path."""
+    lat = np.radians(coords[:, 0])
+    lon = np.radians(coords[:, 1])
+    dlon = lon[1:] - lon[:-1]
+    x = np.sin(dlon) * np.cos(lat[1:])
+    y = np.cos(lat[:-1]) * np.sin(lat[1:]) - np.sin(lat[:-1]) * np.cos(lat[1:]) * np.cos(dlon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+def turn_direction(previous, bearing):
+    angle = (bearing - previous + 360) % 360
+    if TURN_ANGLE < angle < 180:
+        return "right"
+    if 180 <= angle < 360 - TURN_ANGLE:
+        return "left"
+    return "straight"
+
+
+def instruction(turn, road, distance_m, first=False):
+    if first or turn == "straight":
+        return f"Go straight on {road} for {distance_m:.0f} m"
+    return f"Turn {turn} onto {road} for {distance_m:.0f} m"
+
+
+def route_directions(graph, path):
+    """
+    Turn-by-turn steps along a road node path, in driving order. Consecutive
+    edges are merged into one step while they stay on the same road without
+    turning.
+
+    Every step carries its instruction, the turn, road name and length, and
+    the point where it ends (``lat``/``lon``, index ``position`` in the path
+    and ``cumulative_m`` driven from the start), which is where the driver
+    moves on to the next step.
+    """
+    if len(path) < 2:
+        return []
+    coords = graph.coords[np.asarray(path, dtype=np.int64)]
+    heading = bearings(coords)
+    edges = graph.path_edges(path)
+    straight_km = haversine_km(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+
+    steps = []
+    current = None
+    previous = None
+    driven = 0.0
+
+    def finish(step, end):
+        steps.append({
+            "instruction": instruction(step["turn"], step["road"], step["distance_m"], not steps),
+            "turn": step["turn"],
+            "road": step["road"],
+            "distance_m": round(step["distance_m"], 1),
+            "start_position": step["start"],
+            "position": end,
+            "lat": float(coords[end, 0]),
+            "lon": float(coords[end, 1]),
+            "cumulative_m": round(driven, 1),
+        })
+
+    for i, edge in enumerate(edges):
+        if straight_km[i] == 0:
+            continue
+        if edge >= 0:
+            road = graph.way_names[graph.edge_way[edge]] or "Unnamed Road"
+            length_m = float(graph.edge_length[edge]) * 1000
+        else:
+            road, length_m = "Unnamed Road", float(straight_km[i]) * 1000
+        turn = "straight" if previous is None else turn_direction(previous, heading[i])
+
+        if current is not None and road == current["road"] and turn == "straight" and current["turn"] == "straight":
+            current["distance_m"] += length_m
+        else:
+            if current is not None:
+                finish(current, i)
+            current = {"road": road, "turn": "straight" if current is None else turn,
+                       "distance_m": length_m, "start": i}
+        driven += length_m
+        previous = heading[i]
+
+    if current is not None:
+        finish(current, len(path) - 1)
+    return steps
@@ -0,0 +1,106 @@
+import numpy as np
+
+from .shortest_paths import dijkstra, path_from_predecessors
+
+
+class TreePaths:
+    """Paths read back from the Dijkstra predecessor tree of every source."""
+
+    def __init__(self, nodes, predecessors):
+        self.nodes = nodes
+        self.predecessors = predecessors
+
+    def path(self, i, j):
+        return path_from_predecessors(self.predecessors[i], self.nodes[j])
+
+
+class DistanceMatrix:
+    """
+    Stop-to-stop costs for one routing run.
+
+    ``nodes[i]`` is the road node of matrix row/column ``i``. Without a
+    contraction hierarchy the matrix is filled with one Dijkstra search per
+    stop, which stops as soon as every other stop is settled; with one it uses
+    the bucket-based many-to-many search. Either way the search trees are kept
+    so polylines can be assembled without searching again.
+
+    Given ``edge_minutes`` (travel minutes per graph edge, e.g. from a learned
+    speed profile) the searches run on them instead of the static road-type
+    weights: ``cost`` is then the travel minutes of the fastest path, also
+    kept as ``minutes`` to time the routes. A contraction hierarchy has to be
+    built on the same minutes (see ``graph_store.get_contraction_hierarchy``);
+    without ``edge_minutes`` ``minutes`` stays None and routes are timed at
+    the average speed.
+    """
+
+    def __init__(self, nodes, cost, length, paths, minutes=None):
+        self.nodes = list(nodes)
+        self.position = {node: i for i, node in enumerate(self.nodes)}
+        self.cost = cost
+        self.length = length
+        self.paths = paths
+        self.minutes = minutes
+
+    @classmethod
+    def build(cls, graph, nodes, ch=None, edge_minutes=None):
+        nodes = list(dict.fromkeys(nodes))
+        if ch is not None:
+            result = ch.many_to_many(nodes, nodes)
+            return cls(nodes, result.cost, result.length, result,
+                       result.cost if edge_minutes is not None else None)
+
+        n = len(nodes)
+        cost = np.full((n, n), np.inf)
+        length = np.full((n, n), np.inf)
+        adj_minutes = np.asarray(edge_minutes)[graph.adj_edge].tolist() if edge_minutes is not None else None
+        predecessors = []
+        for i, source in enumerate(nodes):
+            dist, dist_km, pred = dijkstra(graph, source, targets=nodes, adj_weights=adj_minutes)
+            for j, target in enumerate(nodes):
+                if target in dist:
+                    cost[i, j] = dist[target]
+                    length[i, j] = dist_km[target]
+            predecessors.append(pred)
+        return cls(nodes, cost, length, TreePaths(nodes, predecessors),
+                   cost if edge_minutes is not None else None)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def path(self, i, j):
+        """Road node path from stop ``i`` to stop ``j``."""
+        if not np.isfinite(self.cost[i, j]):
+            return []
+        return self.paths.path(i, j)
+
+    def full_path(self, tour):
+        """
+        Concatenated road path for a tour given as matrix indices, and the
+        index in it of every tour position (as ``geometry.route_path``).
+        """
+        path = [self.nodes[tour[0]]] if len(tour) else []
+        positions = [0] if len(tour) else []
+        for a, b in zip(tour[:-1], tour[1:]):
+            if a != b:
+                segment = self.path(a, b)
+                # Avoid duplicating the junction node; unreachable legs are a straight line
+                path.extend(segment[1:] if segment else [self.nodes[b]])
+            positions.append(len(path) - 1)
+        return path, positions
+
+    def tour_cost(self, tour):
+        tour = np.asarray(tour, dtype=np.int64)
+        return float(self.cost[tour[:-1], tour[1:]].sum())
+
+    def tour_length(self, tour):
+        tour = np.asarray(tour, dtype=np.int64)
+        return float(self.length[tour[:-1], tour[1:]].sum())
+
+    def timing_length(self, average_speed):
+        """
+        Leg lengths the fleet rules time at ``average_speed``: the road km, or
+        with travel minutes known the km driven in that time at that speed.
+        """
+        if self.minutes is None:
+            return self.length
+        return self.minutes * (average_speed / 60)
@@ -0,0 +1,127 @@
+import math
+
+import numpy as np
+
+from .graph import EARTH_RADIUS_KM, haversine_km
+
+
+def edge_travel_minutes(graph, speeds_kmh, default_speed_kmh, profile=None):
+    """
+    Minutes to drive every edge of the graph at the speed of its road type.
+    With a learned :class:`SpeedProfile` the result is ``(num_edges, 24)``,
+    one column per hour of the day, using the learned speeds where known.
+    """
+    way_speed = np.array([speeds_kmh.get(t, default_speed_kmh) for t in graph.way_types] or [default_speed_kmh],
+                         dtype=np.float64)
+    minutes = np.asarray(graph.edge_length) / way_speed[np.asarray(graph.edge_way)] * 60
+    if profile is not None:
+        return profile.edge_minutes(graph.edge_length, minutes)
+    return minutes
+
+
+class RouteTimeline:
+    """
+    Travel-time profile of one route in driving order: prefix sums of the
+    per-edge minutes and kilometres along the road path, and where on the path
+    every stop lies. All remaining ETAs for a driver position then come out of
+    one vectorised pass over the stops.
+
+    ``segment_minutes`` may have one column per hour of the day (a learned
+    speed profile); ETAs then use the hour in which each segment is reached.
+    """
+
+    def __init__(self, coords, segment_minutes, segment_km, stop_positions, stop_time):
+        self.coords = np.asarray(coords, dtype=np.float64)
+        segment_minutes = np.asarray(segment_minutes, dtype=np.float64)
+        self.hourly = segment_minutes if segment_minutes.ndim == 2 else None
+        self.segment_minutes = segment_minutes.mean(axis=1) if self.hourly is not None else segment_minutes
+        self.segment_km = np.asarray(segment_km, dtype=np.float64)
+        self.prefix_minutes = np.concatenate([[0.0], np.cumsum(self.segment_minutes)])
+        self.prefix_km = np.concatenate([[0.0], np.cumsum(self.segment_km)])
+        self.stop_positions = np.asarray(stop_positions, dtype=np.int64)
+        self.stop_time = stop_time
+        # Local equirectangular metres for matching positions to segments
+        self._scale = np.array([1.0, math.cos(math.radians(self.coords[0, 0]) if len(self.coords) else 0.0)])
+        self._xy = self._project(self.coords)
+
+    @classmethod
+    def from_path(cls, graph, path, stop_positions, stop_time, edge_minutes, average_speed):
+        """
+        Timeline over a road node path; ``edge_minutes`` holds the travel time
+        of every graph edge (legs without a road edge are timed as a straight
+        line at ``average_speed``).
+        """
+        path = np.asarray(path, dtype=np.int64)
+        coords = graph.coords[path]
+        edges = np.asarray(graph.path_edges(path.tolist()), dtype=np.int64)
+        straight = haversine_km(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+        on_road = edges >= 0
+        km = np.where(on_road, np.asarray(graph.edge_length)[np.maximum(edges, 0)], straight)
+        minutes = np.asarray(edge_minutes)[np.maximum(edges, 0)]
+        off_road = straight / average_speed * 60
+        if minutes.ndim == 2:
+            on_road, off_road = on_road[:, None], off_road[:, None]
+        minutes = np.where(on_road, minutes, off_road)
+        return cls(coords, minutes, km, stop_positions, stop_time)
+
+    def _project(self, coords):
+        return np.radians(np.atleast_2d(coords)) * self._scale * EARTH_RADIUS_KM * 1000
+
+    @property
+    def num_segments(self):
+        return len(self.segment_minutes)
+
+    def locate(self, lat, lon, start=0, slack_m=30.0):
+        """
+        Match a position to the path, never moving back before segment
+        ``start``. Among the segments nearly as close as the nearest one the
+        earliest wins, so a road driven twice is matched to the first pass.
+
+        Returns ``(segment, fraction, offset_m)``.
+        """
+        if self.num_segments == 0:
+            return 0, 0.0, 0.0
+        start = min(max(start, 0), self.num_segments - 1)
+        q = self._project([lat, lon])[0]
+        a = self._xy[start:-1]
+        d = self._xy[start + 1:] - a
+        length2 = np.einsum('ij,ij->i', d, d)
+        t = np.clip(np.einsum('ij,ij->i', q - a, d) / np.where(length2 > 0, length2, 1), 0, 1)
+        distance = np.hypot(*(a + d * t[:, None] - q).T)
+        k = int(np.argmax(distance <= distance.min() + slack_m))
+        return start + k, float(t[k]), float(distance[k])
+
+    def _prefix_minutes(self, segment, hour):
+        """
+        Prefix minutes with every segment timed in the hour it is reached,
+        leaving segment ``segment`` at ``hour`` (IST, fractional): the clock
+        is estimated from the average profile, then the hourly times are
+        looked up in one pass.
+        """
+        if self.hourly is None or hour is None:
+            return self.prefix_minutes
+        clock = hour + (self.prefix_minutes[:-1] - self.prefix_minutes[segment]) / 60
+        minutes = self.hourly[np.arange(self.num_segments), np.floor(clock).astype(np.int64) % 24]
+        return np.concatenate([[0.0], np.cumsum(minutes)])
+
+    def remaining(self, segment=0, fraction=0.0, offset_km=0.0, average_speed=None, hour=None):
+        """
+        Minutes and km still to drive to every stop from a point ``fraction``
+        along ``segment``, counting the stop time of the stops served on the
+        way; ``nan`` for stops already passed. ``offset_km`` (driver off the
+        route) is added as a straight line at ``average_speed``. ``hour`` is
+        the time of day (IST) at the position, used with hourly profiles.
+        """
+        prefix_minutes = self._prefix_minutes(segment, hour) if self.num_segments else self.prefix_minutes
+        done_minutes = prefix_minutes[segment] + fraction * (prefix_minutes[segment + 1] - prefix_minutes[segment]) \
+            if self.num_segments else 0.0
+        done_km = self.prefix_km[segment] + fraction * self.segment_km[segment] if self.num_segments else 0.0
+        position = segment + fraction
+        ahead = self.stop_positions > position
+        stops_before = np.cumsum(ahead) - 1
+        minutes = prefix_minutes[self.stop_positions] - done_minutes + stops_before * self.stop_time
+        km = self.prefix_km[self.stop_positions] - done_km
+        if offset_km and average_speed:
+            minutes = minutes + offset_km / average_speed * 60
+            km = km + offset_km
+        return np.where(ahead, minutes, np.nan), np.where(ahead, km, np.nan)
@@ -0,0 +1,69 @@
+import numpy as np
+
+from . import polyline
+from .shortest_paths import bidirectional_dijkstra
+
+
+def route_point(point):
+    """(lat, lon) of a stored route point, a "lat,lon" string or a [lat, lon] pair."""
+    if isinstance(point, str):
+        lat, lon = point.split(',')
+        return float(lat), float(lon)
+    return float(point[0]), float(point[1])
+
+
+def route_path(index, ch, route, edge_minutes=None):
+    """
+    Road node path through every point of a stored route ("lat,lon" keys or
+    [lat, lon] pairs, depot at both ends), one shortest path per leg: on the
+    hierarchy's weights, else on ``edge_minutes`` as the optimizer searches
+    (see ``DistanceMatrix``), else on the static weights.
+
+    Returns ``(path, positions)`` where ``positions[k]`` is the index in
+    ``path`` of route point ``k``.
+    """
+    if not route:
+        return [], []
+    lats, lons = zip(*map(route_point, route))
+    nodes = index.snap(lats, lons)[0].tolist()
+
+    adj_minutes = None
+    if ch is None and edge_minutes is not None:
+        adj_minutes = np.asarray(edge_minutes)[index.graph.adj_edge].tolist()
+    path = [nodes[0]]
+    positions = [0]
+    for source, target in zip(nodes[:-1], nodes[1:]):
+        if source != target:
+            if ch is not None:
+                _, leg = ch.query(source, target)
+            else:
+                _, leg = bidirectional_dijkstra(index.graph, source, target, adj_minutes)
+            # Unreachable legs are drawn as a straight line
+            path.extend(leg[1:] if leg else [target])
+        positions.append(len(path) - 1)
+    return path, positions
+
+
+def road_runs(graph, path):
+    """``[[edge index, road name], ...]`` wherever the road name changes along ``path``."""
+    runs = []
+    for k, edge in enumerate(graph.path_edges(path)):
+        name = graph.way_names[graph.edge_way[edge]] if edge >= 0 else ""
+        if not runs or runs[-1][1] != name:
+            runs.append([k, name])
+    return runs
+
+
+def route_geometry(graph, path, positions, precision=5):
+    """
+    Full road geometry of a route (see :func:`route_path`), computed once when
+    it is assigned so the maps only have to decode it: the encoded polyline,
+    where each route point lies on it and the road names along it.
+    """
+    return {
+        "polyline": polyline.encode(graph.coords[path], precision),
+        "precision": precision,
+        "stops": positions,
+        "roads": road_runs(graph, path),
+        "graph_version": graph.version,
+    }
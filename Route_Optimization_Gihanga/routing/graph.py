@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import networkx as nx
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def road_name(tags):
+    # Same naming rule the driver map uses for its directions
+    name = tags.get('name', '')
+    ref = tags.get('ref', '')
+    if name and ref:
+        return f"{name} ({ref})"
+    return name or ref or "Unnamed Road"
+
+
+class RoadGraph:
+    """
+    Undirected road network in CSR form.
+
+    Nodes are integer ids into ``coords`` (lat, lon). Every undirected edge is
+    stored once in the ``edge_*`` arrays and twice in the adjacency arrays
+    (``indptr``/``indices``/``adj_edge``), so a neighbour scan of node ``u`` is
+    ``indices[indptr[u]:indptr[u + 1]]``.
+    """
+
+    ARRAYS = ('coords', 'edge_u', 'edge_v', 'edge_length', 'edge_weight', 'edge_way',
+              'indptr', 'indices', 'adj_edge')
+
+    def __init__(self, coords, edge_u, edge_v, edge_length, edge_weight, edge_way,
+                 way_names, way_types, version=None):
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.edge_u = np.asarray(edge_u, dtype=np.int32)
+        self.edge_v = np.asarray(edge_v, dtype=np.int32)
+        self.edge_length = np.asarray(edge_length, dtype=np.float64)
+        self.edge_weight = np.asarray(edge_weight, dtype=np.float64)
+        self.edge_way = np.asarray(edge_way, dtype=np.int32)
+        self.way_names = list(way_names)
+        self.way_types = list(way_types)
+        self._build_adjacency()
+        self.version = version or self._fingerprint()
+
+    @property
+    def num_nodes(self):
+        return len(self.coords)
+
+    @property
+    def num_edges(self):
+        return len(self.edge_u)
+
+    def _build_adjacency(self):
+        n = self.num_nodes
+        m = self.num_edges
+        src = np.concatenate([self.edge_u, self.edge_v])
+        dst = np.concatenate([self.edge_v, self.edge_u])
+        eid = np.concatenate([np.arange(m), np.arange(m)]).astype(np.int32)
+        order = np.argsort(src, kind='stable')
+        self.indices = dst[order]
+        self.adj_edge = eid[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+        self._lists = None
+
+    def _fingerprint(self):
+        digest = hashlib.sha1()
+        for name in ('coords', 'edge_u', 'edge_v', 'edge_weight'):
+            digest.update(np.ascontiguousarray(getattr(self, name)).tobytes())
+        return digest.hexdigest()[:16]
+
+    def save(self, directory):
+        """Write the graph as one ``.npy`` file per array plus ``meta.json``."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        meta = {
+            "version": self.version,
+            "num_nodes": self.num_nodes,
+            "num_edges": self.num_edges,
+            "way_names": self.way_names,
+            "way_types": self.way_types,
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Load a saved graph; arrays are memory-mapped read-only by default."""
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+                  for name in cls.ARRAYS}
+        graph = cls.__new__(cls)
+        for name, array in arrays.items():
+            setattr(graph, name, array)
+        graph.way_names = meta['way_names']
+        graph.way_types = meta['way_types']
+        graph.version = meta['version']
+        graph._lists = None
+        return graph
+
+    def adjacency_lists(self):
+        # Plain Python lists are much faster than NumPy scalars inside the
+        # heap-based searches, so convert once and reuse.
+        if self._lists is None:
+            self._lists = (
+                self.indptr.tolist(),
+                self.indices.tolist(),
+                self.edge_weight[self.adj_edge].tolist(),
+                self.edge_length[self.adj_edge].tolist(),
+            )
+        return self._lists
+
+    def node_key(self, node):
+        lat, lon = self.coords[node]
+        return f"{lat},{lon}"
+
+    def node_latlon(self, node):
+        lat, lon = self.coords[node]
+        return [float(lat), float(lon)]
+
+    def path_coords(self, path):
+        return self.coords[np.asarray(path, dtype=np.int64)].tolist()
+
+    def path_edges(self, path):
+        """Edge id between each pair of consecutive path nodes (cheapest if parallel)."""
+        indptr, indices, weights, _ = self.adjacency_lists()
+        edges = []
+        for u, v in zip(path[:-1], path[1:]):
+            best = None
+            for k in range(indptr[u], indptr[u + 1]):
+                if indices[k] == v and (best is None or weights[k] < weights[best]):
+                    best = k
+            edges.append(int(self.adj_edge[best]) if best is not None else -1)
+        return edges
+
+    def to_overpass(self):
+        """Overpass-shaped ``out geom`` payload with one element per edge."""
+        coords = self.coords.tolist()
+        elements = []
+        for u, v, way in zip(self.edge_u.tolist(), self.edge_v.tolist(), self.edge_way.tolist()):
+            elements.append({
+                "type": "way",
+                "tags": {"highway": self.way_types[way], "name": self.way_names[way]},
+                "geometry": [
+                    {"lat": coords[u][0], "lon": coords[u][1]},
+                    {"lat": coords[v][0], "lon": coords[v][1]},
+                ],
+            })
+        return {"elements": elements}
+
+    @classmethod
+    def from_overpass(cls, road_data, road_type_weights, default_weight=2):
+        """
+        Build the weighted graph from an Overpass JSON response. Ways may carry
+        their own ``geometry`` (``out geom``) or reference ``node`` elements.
+        """
+        elements = road_data.get('elements', [])
+        nodes = {e['id']: (e['lat'], e['lon']) for e in elements if e.get('type') == 'node'}
+        ways = []
+        for element in elements:
+            if element.get('type') != 'way':
+                continue
+            if element.get('geometry'):
+                coords = [(p['lat'], p['lon']) for p in element['geometry']]
+            else:
+                coords = [nodes[n] for n in element.get('nodes', []) if n in nodes]
+            if len(coords) > 1:
+                ways.append((element.get('tags', {}), coords))
+        return cls.from_ways(ways, road_type_weights, default_weight)
+
+    @classmethod
+    def from_osm_xml(cls, path, road_type_weights, default_weight=2):
+        """Build the weighted graph from an ``.osm`` XML extract."""
+        nodes = {}
+        ways = []
+        for _, element in ET.iterparse(path, events=('end',)):
+            if element.tag == 'node':
+                nodes[element.get('id')] = (float(element.get('lat')), float(element.get('lon')))
+            elif element.tag == 'way':
+                tags = {t.get('k'): t.get('v') for t in element.findall('tag')}
+                if 'highway' in tags:
+                    refs = [nd.get('ref') for nd in element.findall('nd')]
+                    coords = [nodes[r] for r in refs if r in nodes]
+                    if len(coords) > 1:
+                        ways.append((tags, coords))
+                element.clear()
+        return cls.from_ways(ways, road_type_weights, default_weight)
+
+    @classmethod
+    def from_file(cls, path, road_type_weights, default_weight=2):
+        if path.lower().endswith(('.osm', '.xml')):
+            return cls.from_osm_xml(path, road_type_weights, default_weight)
+        with open(path, encoding='utf-8') as f:
+            return cls.from_overpass(json.load(f), road_type_weights, default_weight)
+
+    @classmethod
+    def from_ways(cls, ways, road_type_weights, default_weight=2):
+        g = nx.Graph()
+        way_names = []
+        way_types = []
+        for tags, coords in ways:
+            road_type = tags.get('highway', 'unknown')
+            base_weight = road_type_weights.get(road_type, default_weight)
+            way_index = len(way_names)
+            way_names.append(road_name(tags))
+            way_types.append(road_type)
+
+            for a, b in zip(coords[:-1], coords[1:]):
+                if a == b:
+                    continue
+                length = float(haversine_km(a[0], a[1], b[0], b[1]))
+                weight = length * base_weight
+                # Keep the cheapest of any duplicated segments
+                if g.has_edge(a, b) and g[a][b]['weight'] <= weight:
+                    continue
+                g.add_edge(a, b, weight=weight, length=length, way=way_index)
+
+        return cls.from_networkx(g, way_names, way_types)
+
+    @classmethod
+    def from_networkx(cls, g, way_names, way_types):
+        if g.number_of_nodes() == 0:
+            raise ValueError("Road data contains no usable ways")
+
+        # Points snapped onto a disconnected fragment could never be reached,
+        # so only the largest connected component is kept.
+        component = max(nx.connected_components(g), key=len)
+        g = g.subgraph(component)
+
+        node_ids = {key: i for i, key in enumerate(g.nodes)}
+        coords = np.array(list(g.nodes), dtype=np.float64)
+        edges = list(g.edges(data=True))
+        edge_u = [node_ids[a] for a, _, _ in edges]
+        edge_v = [node_ids[b] for _, b, _ in edges]
+        edge_length = [d['length'] for _, _, d in edges]
+        edge_weight = [d['weight'] for _, _, d in edges]
+        edge_way = [d['way'] for _, _, d in edges]
+        return cls(coords, edge_u, edge_v, edge_length, edge_weight, edge_way,
+                   way_names, way_types)
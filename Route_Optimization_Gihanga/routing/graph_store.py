@@ -0,0 +1,172 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from Route_Optimization_Gihanga.config import Config
+from .contraction import ContractionHierarchy
+from .eta import edge_travel_minutes
+from .graph import RoadGraph
+from .spatial_index import SpatialIndex
+from .speed_profile import SpeedProfile
+
+_graph = None
+_index = None
+_ch = None
+_profile = None
+# (profile, shift travel minutes per edge, their weights id)
+_shift_minutes = None
+_lock = threading.Lock()
+
+
+def fetch_overpass(url=None, timeout=None):
+    with urllib.request.urlopen(url or Config.OVERPASS_API_URL,
+                                timeout=timeout or Config.OVERPASS_TIMEOUT_SECONDS) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def import_road_graph(source=None, output=None):
+    """
+    Build the weighted graph once from an Overpass JSON / OSM XML file (or a
+    fresh Overpass download when ``source`` is None) and store it on disk.
+    """
+    output = output or Config.ROAD_GRAPH_PATH
+    if source:
+        graph = RoadGraph.from_file(source, Config.ROAD_TYPE_WEIGHTS, Config.DEFAULT_ROAD_WEIGHT)
+    else:
+        graph = RoadGraph.from_overpass(fetch_overpass(), Config.ROAD_TYPE_WEIGHTS,
+                                        Config.DEFAULT_ROAD_WEIGHT)
+    graph.save(output)
+    return graph
+
+
+def load_road_graph(path=None):
+    path = path or Config.ROAD_GRAPH_PATH
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        if not Config.OVERPASS_FALLBACK:
+            raise FileNotFoundError(
+                f"No road graph at {path}; run `flask routeOptimization import-graph <extract>`")
+        print("Road graph cache missing, downloading extract from Overpass...")
+        import_road_graph(output=path)
+
+    start = time.perf_counter()
+    graph = RoadGraph.load(path)
+    print(f"Road graph {graph.version} loaded in {(time.perf_counter() - start) * 1000:.1f} ms: "
+          f"{graph.num_nodes} nodes, {graph.num_edges} edges")
+    return graph
+
+
+def get_road_graph():
+    """Road graph shared by every request in this process (loaded on first use)."""
+    global _graph
+    if _graph is None:
+        with _lock:
+            if _graph is None:
+                _graph = load_road_graph()
+    return _graph
+
+
+def get_spatial_index():
+    """Snapping index over the shared road graph."""
+    global _index
+    graph = get_road_graph()
+    if _index is None or _index.graph is not graph:
+        with _lock:
+            if _index is None or _index.graph is not graph:
+                _index = SpatialIndex(graph, Config.SNAP_CELL_SIZE_M)
+    return _index
+
+
+def build_contraction_hierarchy(output=None, progress=None):
+    """Build the hierarchy on the learned shift travel minutes, or the static weights without a profile."""
+    graph = get_road_graph()
+    edge_minutes, weights_id = _shift_edge_minutes()
+    start = time.perf_counter()
+    ch = ContractionHierarchy.build(graph, progress=progress, weights=edge_minutes, weights_id=weights_id)
+    elapsed = time.perf_counter() - start
+    ch.save(output or Config.CONTRACTION_HIERARCHY_PATH)
+    return ch, elapsed
+
+
+def get_contraction_hierarchy():
+    """
+    Contraction hierarchy for the shared graph, or None when not built
+    (optional) or built on other weights than the current speed profile's;
+    routing then searches the graph directly until ``build-ch`` is run again.
+    """
+    global _ch
+    graph = get_road_graph()
+    weights_id = _shift_edge_minutes()[1]
+    if _ch is not None and _ch.graph_version == graph.version and _ch.weights_id == weights_id:
+        return _ch
+    path = Config.CONTRACTION_HIERARCHY_PATH
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        return None
+    with _lock:
+        ch = ContractionHierarchy.load(path)
+        if ch.graph_version != graph.version:
+            print(f"Ignoring contraction hierarchy built for graph {ch.graph_version}")
+            return None
+        if ch.weights_id != weights_id:
+            print("Ignoring contraction hierarchy built on other edge weights than the speed profile's; "
+                  "run `flask routeOptimization build-ch` again")
+            return None
+        _ch = ch
+    return _ch
+
+
+def get_speed_profile():
+    """Learned speed profile for the shared graph, or None when not built (optional)."""
+    global _profile
+    graph = get_road_graph()
+    if _profile is not None and _profile.graph_version == graph.version:
+        return _profile
+    path = Config.SPEED_PROFILE_PATH
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        return None
+    with _lock:
+        profile = SpeedProfile.load(path)
+        if profile.graph_version != graph.version:
+            print(f"Ignoring speed profile built for graph {profile.graph_version}")
+            return None
+        _profile = profile
+    return _profile
+
+
+def _shift_edge_minutes():
+    global _shift_minutes
+    profile = get_speed_profile()
+    if profile is None:
+        return None, None
+    cached = _shift_minutes
+    if cached is None or cached[0] is not profile:
+        hourly = edge_travel_minutes(get_road_graph(), Config.ROAD_TYPE_SPEEDS_KMH, Config.AVERAGE_SPEED_KMH,
+                                     profile)
+        hours = [(Config.SHIFT_START_HOUR_IST + h) % 24 for h in range(math.ceil(Config.MAX_SHIFT_MINUTES / 60))]
+        minutes = np.ascontiguousarray(hourly[:, hours].mean(axis=1))
+        cached = _shift_minutes = (profile, minutes, hashlib.sha1(minutes.tobytes()).hexdigest()[:16])
+    return cached[1], cached[2]
+
+
+def get_shift_edge_minutes():
+    """
+    Travel minutes per edge averaged over the shift hours from the learned
+    speed profile, which routes are searched and timed on; None without a
+    profile (static road-type weights, timed at the average speed).
+    """
+    return _shift_edge_minutes()[0]
+
+
+def reset_road_graph():
+    global _graph, _index, _ch, _profile, _shift_minutes
+    with _lock:
+        _graph = None
+        _index = None
+        _ch = None
+        _profile = None
+        _shift_minutes = None
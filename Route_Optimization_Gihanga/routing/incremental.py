@@ -0,0 +1,36 @@
+from .local_search import Deadline, improve_tour, sequence_check
+from .geometry import route_point
+from .vrp import insert_leftovers
+
+
+def route_nodes(index, route):
+    """
+    Road nodes of the stops of a stored route (``DriverRoute.route_data``,
+    "lat,lon" keys or [lat, lon] pairs with the depot at both ends).
+    """
+    stops = route[1:-1]
+    if not stops:
+        return []
+    lats, lons = zip(*map(route_point, stops))
+    return index.snap(lats, lons)[0].tolist()
+
+
+def repair_routes(matrix, routes, removed, added, rule, time_budget=None):
+    """
+    Update existing depot-to-depot routes instead of solving again: drop the
+    ``removed`` stops, put every ``added`` stop at its cheapest feasible
+    position (as allowed by ``rule``) and run a short 2-opt / Or-opt repair on
+    the routes that changed. Routes that were not touched keep their order.
+
+    Returns ``(routes, changed, unassigned)`` where ``changed`` is the set of
+    route indices that differ from the input.
+    """
+    original = [list(r) for r in routes]
+    routes = [[s for s in r if s not in removed] for r in original]
+    unassigned = insert_leftovers(matrix.cost, routes, list(added), rule)
+
+    changed = {v for v, r in enumerate(routes) if r != original[v]}
+    deadline = Deadline(time_budget)
+    for v in sorted(changed):
+        routes[v] = improve_tour(matrix.cost, routes[v], deadline, sequence_check(rule, v))
+    return routes, changed, unassigned
@@ -0,0 +1,278 @@
+import time
+
+import numpy as np
+
+EPS = 1e-9
+
+
+class Deadline:
+    def __init__(self, seconds):
+        self.end = time.perf_counter() + seconds if seconds is not None else None
+
+    def expired(self):
+        return self.end is not None and time.perf_counter() >= self.end
+
+
+def tour_cost(cost, tour):
+    tour = np.asarray(tour, dtype=np.int64)
+    return float(cost[tour[:-1], tour[1:]].sum())
+
+
+# The road graph is undirected, so the cost matrix is symmetric and reversing
+# a stretch of a tour does not change the cost of the edges inside it. That
+# is what makes every move below an O(1) delta of at most four matrix reads.
+
+def _improving(delta, feasible, candidate):
+    """
+    Index of the best improving move, or with a ``feasible`` test (e.g. time
+    windows) of the best one whose ``candidate(k)`` tour passes it.
+    """
+    if feasible is None:
+        k = int(np.argmin(delta))
+        return k if delta[k] < -EPS else None
+    for k in np.argsort(delta):
+        if delta[k] >= -EPS:
+            break
+        if feasible(candidate(int(k))):
+            return int(k)
+    return None
+
+
+def two_opt(cost, tour, deadline=None, feasible=None):
+    """Reverse tour[i+1..j] while that shortens the depot-to-depot tour."""
+    tour = list(tour)
+    n = len(tour)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 3):
+            t = np.asarray(tour, dtype=np.int64)
+            a, b = t[i], t[i + 1]
+            j = np.arange(i + 2, n - 1)
+            delta = cost[a, t[j]] + cost[b, t[j + 1]] - cost[a, b] - cost[t[j], t[j + 1]]
+
+            def reversed_at(k):
+                end = int(j[k])
+                return tour[:i + 1] + tour[i + 1:end + 1][::-1] + tour[end + 1:]
+
+            k = _improving(delta, feasible, reversed_at)
+            if k is not None:
+                tour = reversed_at(k)
+                improved = True
+            if deadline and deadline.expired():
+                return tour
+    return tour
+
+
+def or_opt(cost, tour, deadline=None, max_segment=3, feasible=None):
+    """Move segments of up to ``max_segment`` stops (optionally reversed) elsewhere in the tour."""
+    tour = list(tour)
+    improved = True
+    while improved:
+        improved = False
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length < len(tour):
+                t = np.asarray(tour, dtype=np.int64)
+                prev, first, last, nxt = t[i - 1], t[i], t[i + length - 1], t[i + length]
+                removal_gain = cost[prev, first] + cost[last, nxt] - cost[prev, nxt]
+
+                # Insertion edges (x, y) outside the segment and its neighbours
+                k = np.concatenate([np.arange(0, i - 1), np.arange(i + length, len(tour) - 1)])
+                if len(k):
+                    x, y = t[k], t[k + 1]
+                    forward = cost[x, first] + cost[last, y] - cost[x, y]
+                    backward = cost[x, last] + cost[first, y] - cost[x, y]
+                    best = np.minimum(forward, backward)
+
+                    def moved_to(m):
+                        segment = tour[i:i + length]
+                        if backward[m] < forward[m]:
+                            segment = segment[::-1]
+                        rest = tour[:i] + tour[i + length:]
+                        at = int(k[m]) + 1 if k[m] < i else int(k[m]) - length + 1
+                        return rest[:at] + segment + rest[at:]
+
+                    m = _improving(best - removal_gain, feasible, moved_to)
+                    if m is not None:
+                        tour = moved_to(m)
+                        improved = True
+                        continue
+                i += 1
+                if deadline and deadline.expired():
+                    return tour
+    return tour
+
+
+def improve_tour(cost, tour, deadline=None, feasible=None):
+    """
+    2-opt and Or-opt alternated until neither finds an improvement. With
+    ``feasible`` (a test on whole tours) only moves to tours passing it are
+    made.
+    """
+    best = tour_cost(cost, tour)
+    while True:
+        tour = or_opt(cost, two_opt(cost, tour, deadline, feasible), deadline, feasible=feasible)
+        current = tour_cost(cost, tour)
+        if current >= best - EPS or (deadline and deadline.expired()):
+            return tour
+        best = current
+
+
+def removal_delta(matrix, route, i):
+    """Change in ``matrix`` cost when route[i] is taken out of the route."""
+    prev, stop, nxt = route[i - 1], route[i], route[i + 1]
+    return matrix[prev, nxt] - matrix[prev, stop] - matrix[stop, nxt]
+
+
+def insertion_deltas(matrix, route, stop):
+    """Change in cost for inserting ``stop`` after every position of the route."""
+    r = np.asarray(route, dtype=np.int64)
+    return matrix[r[:-1], stop] + matrix[stop, r[1:]] - matrix[r[:-1], r[1:]]
+
+
+def exchange_deltas(matrix, route_a, i, route_b):
+    """Cost changes of both routes for swapping route_a[i] with every stop of route_b."""
+    pa, u, na = route_a[i - 1], route_a[i], route_a[i + 1]
+    rb = np.asarray(route_b, dtype=np.int64)
+    pb, v, nb = rb[:-2], rb[1:-1], rb[2:]
+    delta_a = matrix[pa, v] + matrix[v, na] - matrix[pa, u] - matrix[u, na]
+    delta_b = matrix[pb, u] + matrix[u, nb] - matrix[pb, v] - matrix[v, nb]
+    return delta_a, delta_b
+
+
+class BalancedSplit:
+    """
+    Acceptance rule for inter-route moves when the stops were split evenly:
+    lower the total cost without lengthening the longest route.
+
+    A rule returns ``(score, ok)`` for a move; the best ``ok`` move with a
+    negative score is applied.
+    """
+
+    def start(self, cost, routes):
+        self.costs = [tour_cost(cost, r) for r in routes]
+        self.makespan = max(self.costs)
+
+    def rank(self, cost, routes):
+        """Sort key of a complete solution, lower is better."""
+        costs = [tour_cost(cost, r) for r in routes]
+        return (max(costs), sum(costs))
+
+    def _score(self, a, b, delta_a, delta_b):
+        ok = ((self.costs[a] + delta_a <= self.makespan + EPS)
+              & (self.costs[b] + delta_b <= self.makespan + EPS))
+        return delta_a + delta_b, ok
+
+    def relocate(self, routes, a, i, b, delta_a, delta_b):
+        return self._score(a, b, delta_a, delta_b)
+
+    def exchange(self, routes, a, i, b, delta_a, delta_b):
+        return self._score(a, b, delta_a, delta_b)
+
+
+def sequence_check(rule, vehicle):
+    """The rule's feasibility test for reordering one vehicle's route, if the order matters to it."""
+    check = getattr(rule, 'sequence_check', None)
+    return check(vehicle) if check else None
+
+
+def _best(best, score, ok, *move):
+    score = np.where(ok, score, np.inf)
+    k = int(np.argmin(score))
+    if score[k] < -EPS and (best is None or score[k] < best[0]):
+        return (score[k], k) + move
+    return best
+
+
+def _relocate(cost, routes, rule):
+    """Apply the best move of a single stop to another route; returns the routes changed."""
+    best = None
+    for a, route_a in enumerate(routes):
+        for i in range(1, len(route_a) - 1):
+            removal = removal_delta(cost, route_a, i)
+            for b, route_b in enumerate(routes):
+                if a != b:
+                    insertion = insertion_deltas(cost, route_b, route_a[i])
+                    score, ok = rule.relocate(routes, a, i, b, removal, insertion)
+                    best = _best(best, score, ok, a, i, b)
+    if best is None:
+        return ()
+    _, k, a, i, b = best
+    routes[b].insert(k + 1, routes[a].pop(i))
+    return a, b
+
+
+def _exchange(cost, routes, rule):
+    """Apply the best swap of two stops on different routes; returns the routes changed."""
+    best = None
+    for a, route_a in enumerate(routes):
+        for i in range(1, len(route_a) - 1):
+            for b in range(a + 1, len(routes)):
+                if len(routes[b]) < 3:
+                    continue
+                delta_a, delta_b = exchange_deltas(cost, route_a, i, routes[b])
+                score, ok = rule.exchange(routes, a, i, b, delta_a, delta_b)
+                best = _best(best, score, ok, a, i, b)
+    if best is None:
+        return ()
+    _, k, a, i, b = best
+    j = k + 1
+    routes[a][i], routes[b][j] = routes[b][j], routes[a][i]
+    return a, b
+
+
+def double_bridge(tour, rng):
+    """Classic 4-opt kick: cut the stops into A B C D and reconnect as A C B D."""
+    stops = tour[1:-1]
+    if len(stops) < 8:
+        return list(tour)
+    i, j, k = sorted(rng.choice(np.arange(1, len(stops)), 3, replace=False))
+    return tour[:1] + stops[:i] + stops[j:k] + stops[i:j] + stops[k:] + tour[-1:]
+
+
+def perturb(cost, routes, rule, rng, moves=None):
+    """
+    Random restart point for multi-start search: a double-bridge kick inside
+    every route plus ``moves`` random relocations between routes that ``rule``
+    allows (feasibility only, the score is ignored).
+    """
+    routes = [double_bridge(r, rng) for r in routes]
+    if len(routes) < 2:
+        return routes
+    moves = moves if moves is not None else max(1, sum(len(r) - 2 for r in routes) // 10)
+    for _ in range(moves):
+        loaded = [a for a, r in enumerate(routes) if len(r) > 2]
+        if not loaded:
+            break
+        a = int(rng.choice(loaded))
+        b = int(rng.choice([x for x in range(len(routes)) if x != a]))
+        i = int(rng.integers(1, len(routes[a]) - 1))
+        rule.start(cost, routes)
+        insertion = insertion_deltas(cost, routes[b], routes[a][i])
+        _, ok = rule.relocate(routes, a, i, b, removal_delta(cost, routes[a], i), insertion)
+        allowed = np.flatnonzero(np.broadcast_to(ok, insertion.shape))
+        if len(allowed):
+            routes[b].insert(int(rng.choice(allowed)) + 1, routes[a].pop(i))
+    return routes
+
+
+def improve_routes(cost, routes, time_budget=None, rule=None):
+    """
+    Local search over several depot-to-depot routes: intra-route 2-opt/Or-opt,
+    then inter-route relocate/exchange moves allowed by ``rule`` (default
+    :class:`BalancedSplit`), repeated until no move helps or the time budget
+    (seconds) runs out.
+    """
+    deadline = Deadline(time_budget)
+    rule = rule or BalancedSplit()
+    checks = [sequence_check(rule, v) for v in range(len(routes))]
+    routes = [improve_tour(cost, r, deadline, check) for r, check in zip(routes, checks)]
+    while len(routes) > 1 and not deadline.expired():
+        rule.start(cost, routes)
+        changed = _relocate(cost, routes, rule) or _exchange(cost, routes, rule)
+        if not changed:
+            break
+        for r in changed:
+            routes[r] = improve_tour(cost, routes[r], deadline, checks[r])
+    return routes
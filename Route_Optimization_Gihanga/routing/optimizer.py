@@ -0,0 +1,347 @@
+import math
+
+import numpy as np
+
+from Route_Optimization_Gihanga.config import Config
+from .distance_matrix import DistanceMatrix
+from .incremental import repair_routes, route_nodes
+from .local_search import tour_cost
+from .parallel import ParallelSolver
+from .time_windows import TimeWindowRules, parse_window
+from .tour import nearest_neighbour_tour, split_tour
+from .vrp import FleetRules, construct_routes, zone_centres
+
+SOLVERS = ('vrp', 'split')
+
+
+def _kg(value, key):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{key}' must be a number of kg")
+
+
+class RouteOptimizer:
+    """
+    Server-side replacement for the solver that used to run in admin_map.html:
+    snap the waste points to the road graph, build the stop-to-stop distance
+    matrix once, construct a single nearest-neighbour tour from the depot,
+    split it between the drivers and re-solve each slice. The nearest-neighbour
+    tours are then improved by local search within ``time_budget`` seconds.
+
+    With ``solver='vrp'`` the drivers' routes are instead built by a
+    capacity- and shift-aware vehicle routing solver (see ``routing.vrp``),
+    minimising total distance or makespan as given by ``objective``. The
+    'cluster' construction first gives every driver a compact zone (balanced
+    k-means), seeded with the drivers' zones of the last run when known.
+    Points with a ``time_window`` and per-driver shift windows make it a
+    VRPTW (see ``routing.time_windows``); the 'split' solver ignores them.
+
+    The local search runs through a :class:`ParallelSolver`: every driver's
+    tour (and the comparison tour) is improved as a separate task, then the
+    inter-route search is restarted from several seeded starting points.
+
+    ``edge_minutes`` (travel minutes per graph edge, e.g. from the learned
+    speed profile) makes the stop-to-stop paths the fastest ones and times
+    the routes instead of ``average_speed``; a contraction hierarchy passed
+    with it must have been built on the same minutes.
+    """
+
+    def __init__(self, index, ch=None, depot=None, average_speed=None, stop_time=None, time_budget=None,
+                 solver=None, objective=None, construction=None, max_shift=None, parallel=None, edge_minutes=None):
+        self.index = index
+        self.graph = index.graph
+        self.ch = ch
+        self.depot = depot or (Config.DEPOT_LAT, Config.DEPOT_LON)
+        self.average_speed = average_speed or Config.AVERAGE_SPEED_KMH
+        self.stop_time = stop_time if stop_time is not None else Config.STOP_TIME_MINUTES
+        self.time_budget = time_budget if time_budget is not None else Config.IMPROVEMENT_TIME_BUDGET_SECONDS
+        self.solver = solver or Config.ROUTING_SOLVER
+        self.objective = objective or Config.ROUTING_OBJECTIVE
+        self.construction = construction or Config.VRP_CONSTRUCTION
+        self.max_shift = max_shift or Config.MAX_SHIFT_MINUTES
+        self.parallel = parallel or ParallelSolver()
+        self.edge_minutes = edge_minutes
+        if self.solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{self.solver}', expected one of {', '.join(SOLVERS)}")
+
+    def estimate_travel_time(self, num_stops, distance_km):
+        return (distance_km / self.average_speed) * 60 + num_stops * self.stop_time
+
+    def summarize_tour(self, matrix, tour):
+        distance = matrix.tour_length(tour)
+        timed = tour_cost(matrix.timing_length(self.average_speed), tour)
+        return {
+            "distance_km": round(distance, 3),
+            "estimated_time_min": round(self.estimate_travel_time(max(len(tour) - 2, 0), timed), 1),
+        }
+
+    def describe_tour(self, matrix, tour):
+        """
+        The tour's route, road polyline and summary. ``path`` holds the road
+        node path and the path index of every route point, so storing the
+        route does not search the legs again; it is not JSON output.
+        """
+        path, positions = matrix.full_path(tour)
+        return {
+            "route": [self.graph.node_key(matrix.nodes[i]) for i in tour],
+            "polyline": self.graph.path_coords(path),
+            "path": (path, positions),
+            "cost": round(matrix.tour_cost(tour), 4),
+            **self.summarize_tour(matrix, tour),
+        }
+
+    @staticmethod
+    def point_demands(points, predicted_kg=None):
+        """
+        Kg to collect per point: the point's own ``demand_kg`` if given,
+        otherwise an even share of ``predicted_kg`` (e.g. the household MSW/SOW
+        prediction for the area), otherwise ``Config.DEFAULT_STOP_DEMAND_KG``.
+        """
+        known = [_kg(p.get('demand_kg'), 'demand_kg') for p in points]
+        missing = sum(1 for d in known if d is None)
+        if predicted_kg is not None and missing:
+            default = max(_kg(predicted_kg, 'predicted_kg') - sum(d for d in known if d is not None), 0) / missing
+        else:
+            default = Config.DEFAULT_STOP_DEMAND_KG
+        return [d if d is not None else default for d in known]
+
+    @staticmethod
+    def vehicle_capacities(vehicle_nos, capacities=None):
+        """Capacity per vehicle from a ``{vehicle_no: kg}`` mapping or a single kg value."""
+        if isinstance(capacities, dict):
+            return [_kg(capacities.get(v, Config.VEHICLE_CAPACITY_KG), 'capacities') for v in vehicle_nos]
+        if capacities is not None:
+            return [_kg(capacities, 'capacities')] * len(vehicle_nos)
+        return [float(Config.VEHICLE_CAPACITY_KG)] * len(vehicle_nos)
+
+    def snap_depot(self):
+        return int(self.index.snap([self.depot[0]], [self.depot[1]])[0][0])
+
+    def group_points(self, points, point_nodes=None, predicted_kg=None):
+        """Points and kg per road node; several citizens can share one stop."""
+        if point_nodes is None:
+            point_nodes = self.index.snap([p['lat'] for p in points],
+                                          [p['lon'] for p in points])[0].tolist()
+        stops_by_node = {}
+        demand_by_node = {}
+        for point, node, demand in zip(points, point_nodes, self.point_demands(points, predicted_kg)):
+            stops_by_node.setdefault(node, []).append(point)
+            demand_by_node[node] = demand_by_node.get(node, 0.0) + demand
+        return stops_by_node, demand_by_node
+
+    @staticmethod
+    def node_windows(stops_by_node):
+        """``{node: (opens, closes)}`` for stops with a ``time_window``; shared stops get the overlap."""
+        windows = {}
+        for node, points in stops_by_node.items():
+            for point in points:
+                window = parse_window(point.get('time_window'))
+                if window is None:
+                    continue
+                opens, closes = windows.get(node, (0.0, np.inf))
+                windows[node] = (max(opens, window[0]), min(closes, window[1]))
+        return windows
+
+    def shift_bounds(self, vehicle_nos, shift_windows=None):
+        """Departure and latest return (minutes after midnight IST) per vehicle."""
+        default = (Config.SHIFT_START_HOUR_IST * 60, None)
+        bounds = [parse_window((shift_windows or {}).get(v, default)) for v in vehicle_nos]
+        return [b[0] for b in bounds], [b[1] for b in bounds]
+
+    def fleet_rules(self, matrix, demand, capacity, stops_by_node, vehicle_nos, shift_windows=None):
+        """
+        :class:`FleetRules`, or :class:`TimeWindowRules` once a stop or a
+        driver has a time window.
+        """
+        windows = self.node_windows(stops_by_node)
+        if not windows and not shift_windows:
+            return FleetRules(matrix.timing_length(self.average_speed), demand, capacity, self.max_shift,
+                              self.average_speed, self.stop_time, self.objective)
+        earliest = np.zeros(len(matrix))
+        latest = np.full(len(matrix), np.inf)
+        for node, (opens, closes) in windows.items():
+            earliest[matrix.position[node]], latest[matrix.position[node]] = opens, closes
+        shift_start, shift_end = self.shift_bounds(vehicle_nos, shift_windows)
+        return TimeWindowRules(matrix.timing_length(self.average_speed), demand, capacity, self.max_shift,
+                               self.average_speed,
+                               self.stop_time, self.objective, earliest, latest, shift_start, shift_end)
+
+    @staticmethod
+    def arrival_minutes(rule, vehicle, tour):
+        """
+        Minutes after the shift start (``SHIFT_START_HOUR_IST``) at which each
+        tour position is served, waiting for time windows included.
+        """
+        arrival = rule.arrival_minutes(vehicle, tour)
+        if isinstance(rule, TimeWindowRules):
+            arrival = arrival + rule.shift_start[vehicle] - Config.SHIFT_START_HOUR_IST * 60
+        return arrival
+
+    def describe_stops(self, matrix, tour, stops_by_node, arrival):
+        return [
+            {
+                "lat": p['lat'],
+                "lon": p['lon'],
+                "username": p.get('username'),
+                "node": self.graph.node_latlon(matrix.nodes[i]),
+                "node_id": int(matrix.nodes[i]),
+                "eta_min": round(float(arrival[k]), 1),
+                **({"time_window": p['time_window']} if p.get('time_window') else {}),
+            }
+            for k, i in enumerate(tour[1:-1], start=1)
+            for p in stops_by_node.get(matrix.nodes[i], [])
+        ]
+
+    def optimize(self, points, vehicle_nos, point_nodes=None, capacities=None, predicted_kg=None, progress=None,
+                 zones=None, shift_windows=None):
+        """
+        ``progress(fraction, message)`` is called as the run moves between
+        stages. ``zones`` maps vehicle numbers to the ``[lat, lon]`` centre of
+        their area in an earlier run (see the 'zone' of every driver result),
+        ``shift_windows`` to ``["HH:MM", "HH:MM"]`` (IST) departure and
+        latest return.
+        """
+        if not vehicle_nos:
+            raise ValueError("No drivers available for route assignment")
+        progress = progress or (lambda fraction, message: None)
+
+        depot_node = self.snap_depot()
+        stops_by_node, demand_by_node = self.group_points(points, point_nodes, predicted_kg)
+        # Points snapped onto the depot node cannot be a stop of a depot-to-depot
+        # tour; they are reported as unassigned so that they are not lost
+        at_depot = stops_by_node.pop(depot_node, [])
+
+        progress(0.1, f"Building distance matrix for {len(stops_by_node)} stops")
+        matrix = DistanceMatrix.build(self.graph, [depot_node] + list(stops_by_node), self.ch, self.edge_minutes)
+        depot = matrix.position[depot_node]
+        stops = [matrix.position[node] for node in stops_by_node]
+        demand = [demand_by_node.get(node, 0.0) if i != depot else 0.0 for i, node in enumerate(matrix.nodes)]
+        capacity = self.vehicle_capacities(vehicle_nos, capacities)
+
+        progress(0.5, "Constructing routes")
+        coords = self.graph.coords[matrix.nodes]
+        single_tour = nearest_neighbour_tour(matrix, depot, stops)
+        if self.solver == 'vrp':
+            rule = self.fleet_rules(matrix, demand, capacity, stops_by_node, vehicle_nos, shift_windows)
+            seeds = np.array([(zones or {}).get(v) or (np.nan, np.nan) for v in vehicle_nos], dtype=np.float64)
+            tours, unassigned = construct_routes(matrix, depot, stops, rule, coords, self.construction,
+                                                 seeds, Config.CLUSTER_BALANCE_SLACK)
+        else:
+            tours = [nearest_neighbour_tour(matrix, depot, subset)
+                     for subset in split_tour(single_tour, len(vehicle_nos))]
+            unassigned = []
+            # No capacity limit; no driver may end up with a longer shift
+            # than the longest slice
+            rule = FleetRules(matrix.timing_length(self.average_speed), demand, [math.inf] * len(tours), 0,
+                              self.average_speed, self.stop_time)
+            rule.max_shift = max(rule.route_duration(tour) for tour in tours)
+        before = [self.summarize_tour(matrix, tour) for tour in tours]
+        single_before = self.summarize_tour(matrix, single_tour)
+
+        # Half the budget for the independent per-tour searches, half for the
+        # multi-start search across drivers
+        progress(0.6, "Improving driver routes")
+        if isinstance(rule, TimeWindowRules):
+            improved = self.parallel.improve_tours(matrix.cost, [single_tour] + tours, self.time_budget / 2,
+                                                   rule, [None] + list(range(len(tours))))
+        else:
+            improved = self.parallel.improve_tours(matrix.cost, [single_tour] + tours, self.time_budget / 2)
+        single_tour, tours = improved[0], improved[1:]
+        progress(0.75, "Exchanging stops between drivers")
+        tours = self.parallel.improve_routes(matrix.cost, tours, rule, self.time_budget / 2)
+
+        progress(0.9, "Assembling route geometry")
+
+        single = self.describe_tour(matrix, single_tour)
+        single["before"] = single_before
+
+        drivers = []
+        for v, (vehicle_no, tour, initial_summary, vehicle_capacity, zone) in enumerate(zip(
+                vehicle_nos, tours, before, capacity, zone_centres(coords, tours))):
+            result = self.describe_tour(matrix, tour)
+            result["vehicle_no"] = vehicle_no
+            result["before"] = initial_summary
+            result["load_kg"] = round(sum(demand[i] for i in tour[1:-1]), 2)
+            result["capacity_kg"] = vehicle_capacity
+            result["zone"] = zone
+            arrival = self.arrival_minutes(rule, v, tour)
+            result["estimated_time_min"] = round(float(arrival[-1] - arrival[0]), 1)
+            result["stops"] = self.describe_stops(matrix, tour, stops_by_node, arrival)
+            drivers.append(result)
+
+        return {
+            "depot": self.graph.node_latlon(depot_node),
+            "solver": self.solver,
+            "objective": self.objective if self.solver == 'vrp' else None,
+            "single_route": single,
+            "drivers": drivers,
+            "unassigned": at_depot + [p for i in unassigned for p in stops_by_node.get(matrix.nodes[i], [])],
+            "total_distance_km": round(sum(d["distance_km"] for d in drivers), 3),
+            "max_time_min": max((d["estimated_time_min"] for d in drivers), default=0),
+            "before": {
+                "total_distance_km": round(sum(b["distance_km"] for b in before), 3),
+                "max_time_min": max((b["estimated_time_min"] for b in before), default=0),
+            },
+        }
+
+    def reoptimize(self, current_routes, points, point_nodes=None, capacities=None, time_budget=None,
+                   shift_windows=None):
+        """
+        Bring stored routes (``{vehicle_no: route_data}``) up to date with the
+        current waste ``points`` without a full solve: stops whose points are
+        gone are dropped, new points are inserted where they are cheapest and
+        only the affected drivers' routes are repaired and returned.
+        """
+        vehicle_nos = list(current_routes)
+        if not vehicle_nos:
+            raise ValueError("No drivers available for route assignment")
+
+        depot_node = self.snap_depot()
+        stops_by_node, demand_by_node = self.group_points(points, point_nodes)
+        # Unassigned, as in optimize
+        at_depot = stops_by_node.pop(depot_node, [])
+
+        routed = {v: route_nodes(self.index, route) for v, route in current_routes.items()}
+        in_routes = {node for nodes in routed.values() for node in nodes}
+        removed_nodes = in_routes - set(stops_by_node)
+        added_nodes = [node for node in stops_by_node if node not in in_routes]
+        if not removed_nodes and not added_nodes:
+            return {"changes": [], "unassigned": at_depot, "unchanged": vehicle_nos}
+
+        matrix = DistanceMatrix.build(self.graph, [depot_node] + list(in_routes) + added_nodes, self.ch,
+                                      self.edge_minutes)
+        depot = matrix.position[depot_node]
+        demand = [demand_by_node.get(node, 0.0) if i != depot else 0.0 for i, node in enumerate(matrix.nodes)]
+        rule = self.fleet_rules(matrix, demand, self.vehicle_capacities(vehicle_nos, capacities),
+                                stops_by_node, vehicle_nos, shift_windows)
+
+        tours = [[depot] + [matrix.position[node] for node in routed[v]] + [depot] for v in vehicle_nos]
+        tours, changed, unassigned = repair_routes(
+            matrix, tours,
+            removed={matrix.position[node] for node in removed_nodes},
+            added=[matrix.position[node] for node in added_nodes],
+            rule=rule,
+            time_budget=time_budget if time_budget is not None else Config.REOPTIMIZE_TIME_BUDGET_SECONDS,
+        )
+
+        changes = []
+        for v in sorted(changed):
+            vehicle_no = vehicle_nos[v]
+            nodes = {matrix.nodes[i] for i in tours[v][1:-1]}
+            result = self.describe_tour(matrix, tours[v])
+            result["vehicle_no"] = vehicle_no
+            result["stops"] = self.describe_stops(matrix, tours[v], stops_by_node,
+                                                  self.arrival_minutes(rule, v, tours[v]))
+            result["added"] = [p for node in added_nodes if node in nodes for p in stops_by_node[node]]
+            result["removed"] = [self.graph.node_key(node) for node in routed[vehicle_no]
+                                 if node in removed_nodes]
+            changes.append(result)
+
+        return {
+            "changes": changes,
+            "unassigned": at_depot + [p for i in unassigned for p in stops_by_node.get(matrix.nodes[i], [])],
+            "unchanged": [vehicle_nos[v] for v in range(len(vehicle_nos)) if v not in changed],
+        }
@@ -0,0 +1,183 @@
+import atexit
+import copy
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Route_Optimization_Gihanga.config import Config
+from .local_search import Deadline, improve_routes, improve_tour, perturb, sequence_check
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# Shared blocks attached by this (worker) process, keyed by block name
+_attached = {}
+
+
+class SharedArray:
+    """
+    A NumPy array in a named shared-memory block. Only the small descriptor
+    (name, shape, dtype) is pickled to the workers, which map the same pages.
+    """
+
+    def __init__(self, array):
+        array = np.ascontiguousarray(array)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.descriptor = (self.shm.name, array.shape, array.dtype.str)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)[...] = array
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach(*descriptors):
+    """Map the given shared blocks in this process, dropping blocks of earlier runs."""
+    names = {d[0] for d in descriptors}
+    for name in [n for n in _attached if n not in names]:
+        _attached.pop(name)[0].close()
+    arrays = []
+    for name, shape, dtype in descriptors:
+        if name not in _attached:
+            shm = shared_memory.SharedMemory(name=name)
+            _attached[name] = (shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+        arrays.append(_attached[name][1])
+    return arrays
+
+
+def pool_context():
+    """
+    Start method of the worker processes. Forking the web process would copy
+    its threads' locks (job threads, the DB session, the model libraries) in
+    whatever state they are in, so workers come from a fork server started
+    before any of that (spawn where there is none, e.g. Windows).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Imported once by the server instead of by every worker
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def get_pool(workers):
+    """Process pool reused across requests; recreated if the worker count changes."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# Tasks. Matrices arrive either as arrays (in-process) or as SharedArray
+# descriptors (in a worker); rules travel without their length matrix.
+
+def _matrices(cost, length):
+    if isinstance(cost, tuple):
+        if length is None:
+            return attach(cost)[0], None
+        return tuple(attach(cost, length))
+    return cost, length
+
+
+def _bind(rule, length):
+    if rule is not None and hasattr(rule, 'length'):
+        rule.length = length
+    return rule
+
+
+def _improve_tour_task(cost, length, time_budget, tour, rule=None, vehicle=None):
+    cost, length = _matrices(cost, length)
+    check = sequence_check(_bind(rule, length), vehicle) if rule is not None else None
+    return improve_tour(cost, tour, Deadline(time_budget), check)
+
+
+def _restart_task(cost, length, time_budget, routes, rule, seed):
+    cost, length = _matrices(cost, length)
+    rule = _bind(rule, length)
+    if seed is not None:
+        routes = perturb(cost, routes, rule, np.random.default_rng(seed))
+    routes = improve_routes(cost, routes, time_budget, rule=rule)
+    return routes, rule.rank(cost, routes)
+
+
+class ParallelSolver:
+    """
+    Runs independent pieces of a routing run in a process pool: per-driver
+    tour improvement (each driver's route is its own subproblem) and
+    multi-start inter-route local search.
+
+    The cost/length matrices are copied once into shared memory; the road
+    graph itself is never sent to the workers. Restart ``k`` perturbs the
+    starting routes with seed ``seed + k`` (restart 0 is the unperturbed
+    search), so for a given seed and a search that finishes within its time
+    budget the result does not depend on the number of workers. With one
+    worker everything runs in this process.
+    """
+
+    def __init__(self, workers=None, restarts=None, seed=None):
+        self.workers = workers if workers is not None else Config.OPTIMIZER_WORKERS
+        self.restarts = max(1, restarts if restarts is not None else Config.OPTIMIZER_RESTARTS)
+        self.seed = seed if seed is not None else Config.OPTIMIZER_SEED
+
+    def _run(self, function, cost, length, jobs, time_budget):
+        # Jobs run in waves of ``workers``; split the budget between the waves
+        if time_budget is not None and len(jobs) > self.workers:
+            time_budget = time_budget * max(self.workers, 1) / len(jobs)
+        if self.workers <= 1 or len(jobs) <= 1:
+            return [function(cost, length, time_budget, *job) for job in jobs]
+
+        shared = [SharedArray(cost)] + ([SharedArray(length)] if length is not None else [])
+        try:
+            descriptors = [s.descriptor for s in shared] + [None]
+            pool = get_pool(self.workers)
+            futures = [pool.submit(function, descriptors[0], descriptors[1], time_budget, *job) for job in jobs]
+            return [f.result() for f in futures]
+        finally:
+            for s in shared:
+                s.release()
+
+    def improve_tours(self, cost, tours, time_budget=None, rule=None, vehicles=None):
+        """
+        Improve independent depot-to-depot tours (one task per tour). With a
+        ``rule``, tour ``k`` is kept feasible for vehicle ``vehicles[k]``
+        (None for a tour no vehicle drives).
+        """
+        if rule is None:
+            return self._run(_improve_tour_task, cost, None, [(tour,) for tour in tours], time_budget)
+        length = getattr(rule, 'length', None)
+        portable = copy.copy(rule)
+        if length is not None:
+            portable.length = None
+        vehicles = vehicles if vehicles is not None else range(len(tours))
+        jobs = [(tour, portable if v is not None else None, v) for tour, v in zip(tours, vehicles)]
+        return self._run(_improve_tour_task, cost, length, jobs, time_budget)
+
+    def improve_routes(self, cost, routes, rule, time_budget=None):
+        """
+        Best of ``restarts`` local searches over the routes of all drivers,
+        compared with ``rule.rank``.
+        """
+        length = getattr(rule, 'length', None)
+        portable = copy.copy(rule)
+        if length is not None:
+            portable.length = None
+        jobs = [(routes, portable, None if k == 0 else self.seed + k) for k in range(self.restarts)]
+        results = self._run(_restart_task, cost, length, jobs, time_budget)
+        return min(results, key=lambda result: result[1])[0]
@@ -0,0 +1,40 @@
+import numpy as np
+
+# Google encoded polyline format: each coordinate is stored as the difference
+# from the previous one, scaled to an integer and written as 5-bit chunks in
+# printable ASCII. Precision 5 (1e-5 degrees) is about 1 m.
+
+
+def _encode_value(value, chunks):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+
+
+def encode(coords, precision=5):
+    """Encode a sequence of (lat, lon) pairs."""
+    if len(coords) == 0:
+        return ""
+    scaled = np.round(np.asarray(coords, dtype=np.float64) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    chunks = []
+    for value in deltas.ravel().tolist():
+        _encode_value(value, chunks)
+    return "".join(chunks)
+
+
+def decode(text, precision=5):
+    """Decode an encoded polyline back into ``[lat, lon]`` pairs."""
+    values = []
+    value = shift = 0
+    for char in text:
+        byte = ord(char) - 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    deltas = np.asarray(values, dtype=np.int64).reshape(-1, 2)
+    return (np.cumsum(deltas, axis=0) / 10 ** precision).tolist()
@@ -0,0 +1,117 @@
+import heapq
+import math
+
+
+def dijkstra(graph, source, targets=None, stop_at_first=False, adj_weights=None):
+    """
+    Single-source Dijkstra over the CSR road graph.
+
+    Returns ``(dist, length, pred)`` dictionaries for every settled node, where
+    ``dist`` is the weighted cost and ``length`` the road distance in km of the
+    cheapest path. When ``targets`` is given the search stops once all of them
+    are settled (or the first one, with ``stop_at_first``). ``adj_weights``
+    (in adjacency order, e.g. travel minutes) replaces the graph's weights.
+    """
+    indptr, indices, weights, lengths = graph.adjacency_lists()
+    if adj_weights is not None:
+        weights = adj_weights
+    dist = {source: 0.0}
+    length = {source: 0.0}
+    pred = {source: -1}
+    settled = set()
+    remaining = set(targets) if targets is not None else None
+    heap = [(0.0, source)]
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        if remaining is not None and u in remaining:
+            remaining.discard(u)
+            if stop_at_first or not remaining:
+                break
+        lu = length[u]
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[k]
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                length[v] = lu + lengths[k]
+                pred[v] = u
+                heapq.heappush(heap, (nd, v))
+
+    return ({v: dist[v] for v in settled},
+            {v: length[v] for v in settled},
+            pred)
+
+
+def bidirectional_dijkstra(graph, source, target, adj_weights=None):
+    """Point-to-point query; returns ``(cost, path)`` or ``(inf, [])``."""
+    if source == target:
+        return 0.0, [source]
+
+    indptr, indices, weights, _ = graph.adjacency_lists()
+    if adj_weights is not None:
+        weights = adj_weights
+    dists = ({source: 0.0}, {target: 0.0})
+    preds = ({source: -1}, {target: -1})
+    settled = (set(), set())
+    heaps = ([(0.0, source)], [(0.0, target)])
+    best = math.inf
+    meeting = None
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        dist, pred, done = dists[side], preds[side], settled[side]
+        other_dist = dists[1 - side]
+
+        d, u = heapq.heappop(heaps[side])
+        if u in done:
+            continue
+        done.add(u)
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[k]
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                pred[v] = u
+                heapq.heappush(heaps[side], (nd, v))
+            if v in other_dist and nd + other_dist[v] < best:
+                best = nd + other_dist[v]
+                meeting = v
+
+    if meeting is None:
+        return math.inf, []
+
+    forward = path_from_predecessors(preds[0], meeting)
+    backward = path_from_predecessors(preds[1], meeting)
+    return best, forward + backward[::-1][1:]
+
+
+def path_from_predecessors(pred, target):
+    path = []
+    node = target
+    while node != -1:
+        path.append(node)
+        node = pred[node]
+    path.reverse()
+    return path
+
+
+def path_cost(graph, path):
+    """Weighted cost and road length (km) along a node path."""
+    indptr, indices, weights, lengths = graph.adjacency_lists()
+    cost = 0.0
+    length = 0.0
+    for u, v in zip(path[:-1], path[1:]):
+        best = None
+        for k in range(indptr[u], indptr[u + 1]):
+            if indices[k] == v and (best is None or weights[k] < weights[best]):
+                best = k
+        if best is not None:
+            cost += weights[best]
+            length += lengths[best]
+    return cost, length
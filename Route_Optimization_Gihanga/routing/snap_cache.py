@@ -0,0 +1,52 @@
+from shared.models import db, Citizen, CitizenSnap
+
+
+def snap_waste_points(index, points):
+    """
+    Road node for every waste point. Citizens rarely move, so the snap of a
+    citizen's registered location is kept in ``citizen_snaps`` and reused while
+    it and the graph version match; everything else is snapped in one batch
+    call. Only points at the location stored in the citizen table are cached,
+    never other coordinates sent under a username. New snaps are added to the
+    session; the caller commits them with its own changes.
+    """
+    graph = index.graph
+    usernames = {p['username'] for p in points if p.get('username')}
+    cached, homes = {}, {}
+    if usernames:
+        cached = {s.username: s for s in
+                  CitizenSnap.query.filter(CitizenSnap.username.in_(usernames)).all()}
+        homes = {c.username: (c.latitude, c.longitude) for c in
+                 Citizen.query.filter(Citizen.username.in_(usernames)).all()}
+
+    def at_home(point):
+        return homes.get(point.get('username')) == (point['lat'], point['lon'])
+
+    nodes = [None] * len(points)
+    missing = []
+    for i, point in enumerate(points):
+        snap = cached.get(point.get('username'))
+        if (snap and at_home(point) and snap.graph_version == graph.version
+                and snap.latitude == point['lat'] and snap.longitude == point['lon']):
+            nodes[i] = snap.node
+        else:
+            missing.append(i)
+
+    if missing:
+        snapped, distances = index.snap([points[i]['lat'] for i in missing],
+                                        [points[i]['lon'] for i in missing])
+        for i, node, distance in zip(missing, snapped.tolist(), distances.tolist()):
+            nodes[i] = node
+            if not at_home(points[i]):
+                continue
+            username = points[i]['username']
+            snap = cached.get(username) or CitizenSnap(username=username)
+            snap.latitude = points[i]['lat']
+            snap.longitude = points[i]['lon']
+            snap.graph_version = graph.version
+            snap.node = node
+            snap.distance_m = distance
+            cached[username] = snap
+            db.session.add(snap)
+
+    return nodes
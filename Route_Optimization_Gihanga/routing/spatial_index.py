@@ -0,0 +1,180 @@
+import numpy as np
+
+from .graph import EARTH_RADIUS_KM
+
+METERS_PER_DEGREE = EARTH_RADIUS_KM * 1000 * np.pi / 180
+
+
+class SpatialIndex:
+    """
+    Uniform grid over the road graph for nearest-node and nearest-edge lookups.
+
+    Coordinates are projected to local metres (equirectangular around the
+    graph centre, accurate to well under a metre at city scale). Nodes and edge
+    segments are bucketed by grid cell in CSR form, and a batch query gathers
+    the candidates of every point's surrounding cells with NumPy in one pass.
+    A result is exact when it lies within the searched window, so points
+    without one are retried with a doubled window and, past ``max_radius``
+    cells, with a full scan.
+    """
+
+    def __init__(self, graph, cell_size_m=100.0, search_radius=1, max_radius=8):
+        self.graph = graph
+        self.cell_size = float(cell_size_m)
+        self.radius = int(search_radius)
+        self.max_radius = int(max_radius)
+
+        lat, lon = graph.coords[:, 0], graph.coords[:, 1]
+        self.lat0 = float(lat.mean())
+        self.lon0 = float(lon.mean())
+        self.kx = METERS_PER_DEGREE * np.cos(np.radians(self.lat0))
+        self.ky = METERS_PER_DEGREE
+
+        self.xy = self.project(lat, lon)
+        self.origin = self.xy.min(axis=0)
+        cells = self._cell_xy(self.xy)
+        self.nx, self.ny = (cells.max(axis=0) + 1).tolist()
+
+        self.node_start, self.node_order = self._bucket(self._cell_id(cells), np.arange(len(cells)))
+        self._build_edge_buckets()
+
+    def project(self, lats, lons):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        return np.column_stack([(lons - self.lon0) * self.kx, (lats - self.lat0) * self.ky])
+
+    def unproject(self, xy):
+        return np.column_stack([xy[:, 1] / self.ky + self.lat0, xy[:, 0] / self.kx + self.lon0])
+
+    def _cell_xy(self, xy):
+        return np.floor((xy - self.origin) / self.cell_size).astype(np.int64)
+
+    def _cell_id(self, cells):
+        return cells[:, 1] * self.nx + cells[:, 0]
+
+    def _bucket(self, cell_ids, items):
+        order = np.argsort(cell_ids, kind='stable')
+        start = np.zeros(self.nx * self.ny + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell_ids, minlength=self.nx * self.ny), out=start[1:])
+        return start, items[order]
+
+    def _build_edge_buckets(self):
+        # An edge segment goes into every cell its bounding box overlaps
+        a = self._cell_xy(self.xy[self.graph.edge_u])
+        b = self._cell_xy(self.xy[self.graph.edge_v])
+        lo = np.minimum(a, b)
+        span = np.abs(a - b) + 1
+        edge_ids = np.arange(len(a))
+        cell_ids = []
+        owners = []
+        for dy in range(int(span[:, 1].max(initial=1))):
+            for dx in range(int(span[:, 0].max(initial=1))):
+                mask = (span[:, 0] > dx) & (span[:, 1] > dy)
+                cells = lo[mask] + (dx, dy)
+                cell_ids.append(self._cell_id(cells))
+                owners.append(edge_ids[mask])
+        self.edge_start, self.edge_order = self._bucket(np.concatenate(cell_ids), np.concatenate(owners))
+
+    def _candidates(self, qxy, start, order, r):
+        """(query index, candidate item) pairs from the cells within ``r`` of each query."""
+        cells = self._cell_xy(qxy)
+        offsets = np.array([(dx, dy) for dy in range(-r, r + 1) for dx in range(-r, r + 1)])
+        window = cells[:, None, :] + offsets[None, :, :]
+        valid = ((window[..., 0] >= 0) & (window[..., 0] < self.nx)
+                 & (window[..., 1] >= 0) & (window[..., 1] < self.ny))
+        ids = np.where(valid, window[..., 1] * self.nx + window[..., 0], 0)
+        counts = np.where(valid, start[ids + 1] - start[ids], 0).ravel()
+        firsts = start[ids].ravel()
+
+        total = int(counts.sum())
+        query = np.repeat(np.repeat(np.arange(len(qxy)), offsets.shape[0]), counts)
+        run_start = np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(firsts, counts) + np.arange(total) - run_start
+        return query, order[positions]
+
+    @staticmethod
+    def _best_per_query(num_queries, query, dist):
+        best = np.full(num_queries, -1, dtype=np.int64)
+        best_dist = np.full(num_queries, np.inf)
+        if len(query):
+            order = np.lexsort((dist, query))
+            q_sorted = query[order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = q_sorted[1:] != q_sorted[:-1]
+            best[q_sorted[first]] = order[first]
+            best_dist[q_sorted[first]] = dist[order[first]]
+        return best, best_dist
+
+    def _search(self, qxy, start, order, num_items, measure):
+        """
+        Best item per query under ``measure(query_xy, items)``, which returns the
+        distances followed by any extra per-pair arrays (kept for the winners).
+        """
+        n = len(qxy)
+        best_item = np.full(n, -1, dtype=np.int64)
+        best_dist = np.full(n, np.inf)
+        _, *shapes = measure(np.zeros((0, 2)), np.zeros(0, dtype=np.int64))
+        extras = [np.zeros((n,) + e.shape[1:]) for e in shapes]
+
+        pending = np.arange(n)
+        r = self.radius
+        while len(pending) and r <= self.max_radius:
+            query, cand = self._candidates(qxy[pending], start, order, r)
+            dist, *extra = measure(qxy[pending][query], cand)
+            best, dist_best = self._best_per_query(len(pending), query, dist)
+            found = dist_best <= r * self.cell_size
+            rows = pending[found]
+            best_item[rows] = cand[best[found]]
+            best_dist[rows] = dist_best[found]
+            for out, e in zip(extras, extra):
+                out[rows] = e[best[found]]
+            pending = pending[~found]
+            r *= 2
+
+        items = np.arange(num_items)
+        for i in pending:
+            dist, *extra = measure(np.repeat(qxy[i:i + 1], num_items, axis=0), items)
+            k = int(np.argmin(dist))
+            best_item[i], best_dist[i] = k, dist[k]
+            for out, e in zip(extras, extra):
+                out[i] = e[k]
+        return best_item, best_dist, extras
+
+    def _node_distance(self, qxy, nodes):
+        return (np.hypot(*(self.xy[nodes] - qxy).T),)
+
+    def snap(self, lats, lons):
+        """Nearest graph node for every point; returns ``(nodes, distances_m)``."""
+        qxy = self.project(lats, lons)
+        nodes, dist, _ = self._search(qxy, self.node_start, self.node_order,
+                                      len(self.xy), self._node_distance)
+        return nodes, dist
+
+    def _edge_distance(self, qxy, edges):
+        a = self.xy[self.graph.edge_u[edges]]
+        b = self.xy[self.graph.edge_v[edges]]
+        ab = b - a
+        denom = np.maximum((ab * ab).sum(axis=1), 1e-12)
+        t = np.clip(((qxy - a) * ab).sum(axis=1) / denom, 0.0, 1.0)
+        proj = a + t[:, None] * ab
+        return np.hypot(*(qxy - proj).T), t, proj
+
+    def snap_to_edges(self, lats, lons):
+        """
+        Nearest road segment for every point. Returns a dict of arrays:
+        ``edge``, ``t`` (fraction along edge_u -> edge_v), ``lat``/``lon`` of
+        the projected point, ``distance_m`` and ``node`` (closer edge endpoint).
+        """
+        qxy = self.project(lats, lons)
+        edges, dist, (t, proj) = self._search(qxy, self.edge_start, self.edge_order,
+                                              self.graph.num_edges, self._edge_distance)
+        latlon = self.unproject(proj)
+        nodes = np.where(t <= 0.5, self.graph.edge_u[edges], self.graph.edge_v[edges])
+        return {
+            "edge": edges,
+            "t": t,
+            "lat": latlon[:, 0],
+            "lon": latlon[:, 1],
+            "distance_m": dist,
+            "node": nodes,
+        }
@@ -0,0 +1,92 @@
+import json
+import os
+
+import numpy as np
+
+from .graph import haversine_km
+
+HOURS = 24
+# Slower than this the truck is standing at a pickup rather than driving
+MIN_SPEED_KMH = 2
+MAX_SPEED_KMH = 100
+
+
+def match_traces(index, vehicles, times, lats, lons, reported_mps, max_distance_m, max_gap_s):
+    """
+    Nearest-segment map matching of GPS traces given as arrays sorted by
+    vehicle and time (``times`` in epoch seconds). Every fix within
+    ``max_distance_m`` of a road is matched to that edge with the speed the
+    phone reported or, failing that, the speed to the next fix of the same
+    trace along the matched points.
+
+    Returns ``(edges, speeds_kmh, keep)`` where ``keep`` marks the fixes the
+    samples come from.
+    """
+    snapped = index.snap_to_edges(lats, lons)
+    n = len(times)
+    derived = np.full(n, np.nan)
+    if n > 1:
+        dt = np.diff(times)
+        same = (vehicles[1:] == vehicles[:-1]) & (dt > 0) & (dt <= max_gap_s)
+        step_km = haversine_km(snapped['lat'][:-1], snapped['lon'][:-1], snapped['lat'][1:], snapped['lon'][1:])
+        derived[:-1][same] = step_km[same] / dt[same] * 3600
+    speeds = np.where(np.isfinite(reported_mps), reported_mps * 3.6, derived)
+    keep = ((snapped['distance_m'] <= max_distance_m) & np.isfinite(speeds)
+            & (speeds >= MIN_SPEED_KMH) & (speeds <= MAX_SPEED_KMH))
+    return snapped['edge'][keep], speeds[keep], keep
+
+
+class SpeedProfile:
+    """
+    Learned truck speed per graph edge and hour of the day (IST), stored as
+    ``uint8`` km/h (0 = not enough data) so a profile costs 24 bytes per
+    edge; ``samples`` counts the GPS fixes behind every value.
+    """
+
+    ARRAYS = ('speeds', 'samples')
+
+    def __init__(self, speeds, samples, graph_version):
+        self.speeds = speeds
+        self.samples = samples
+        self.graph_version = graph_version
+
+    @classmethod
+    def build(cls, graph, edges, hours, speeds_kmh, min_samples=3):
+        """Harmonic mean speed (time-weighted over the same road) of the samples in every (edge, hour) bin."""
+        bins = np.asarray(edges, dtype=np.int64) * HOURS + np.asarray(hours, dtype=np.int64)
+        size = graph.num_edges * HOURS
+        count = np.bincount(bins, minlength=size)
+        inverse = np.bincount(bins, weights=1.0 / np.asarray(speeds_kmh, dtype=np.float64), minlength=size)
+        mean = np.divide(count, inverse, out=np.zeros(size), where=inverse > 0)
+        speeds = np.where(count >= min_samples, np.clip(np.rint(mean), 1, 255), 0).astype(np.uint8)
+        samples = np.minimum(count, np.iinfo(np.uint16).max).astype(np.uint16)
+        return cls(speeds.reshape(-1, HOURS), samples.reshape(-1, HOURS), graph.version)
+
+    @property
+    def coverage(self):
+        """Share of (edge, hour) bins with a learned speed."""
+        return float(np.count_nonzero(self.speeds)) / max(self.speeds.size, 1)
+
+    def edge_minutes(self, length_km, fallback_minutes):
+        """``(num_edges, 24)`` minutes per edge and hour, ``fallback_minutes`` where nothing was learned."""
+        speeds = np.asarray(self.speeds, dtype=np.float32)
+        learned = np.divide(np.asarray(length_km, dtype=np.float32)[:, None] * 60, speeds,
+                            out=np.zeros(speeds.shape, dtype=np.float32), where=speeds > 0)
+        return np.where(speeds > 0, learned, np.asarray(fallback_minutes, dtype=np.float32)[:, None])
+
+    # Persistence
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({"graph_version": self.graph_version, "coverage": self.coverage}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in cls.ARRAYS]
+        return cls(*arrays, graph_version=meta['graph_version'])
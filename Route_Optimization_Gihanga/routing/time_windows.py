@@ -0,0 +1,159 @@
+import math
+
+import numpy as np
+
+from .local_search import EPS, tour_cost
+from .vrp import FleetRules
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_clock(value):
+    """Minutes after midnight of an ``"HH:MM"`` time (or a number of minutes)."""
+    if isinstance(value, (int, float)):
+        minutes = float(value)
+    else:
+        try:
+            hours, minutes = str(value).split(':')
+            minutes = int(hours) * 60 + int(minutes)
+        except ValueError:
+            raise ValueError(f"Invalid time '{value}', expected HH:MM")
+    if not 0 <= minutes <= MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time '{value}', expected HH:MM")
+    return float(minutes)
+
+
+def format_clock(minutes):
+    minutes = int(round(minutes))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_window(window):
+    """``(opens, closes)`` minutes of an ``["HH:MM", "HH:MM"]`` window; None for no window."""
+    if window is None:
+        return None
+    if not isinstance(window, (list, tuple)) or len(window) != 2:
+        raise ValueError("A time window is a pair [opens, closes]")
+    opens, closes = (parse_clock(w) if w is not None else None for w in window)
+    opens = opens if opens is not None else 0.0
+    closes = closes if closes is not None else math.inf
+    if closes < opens:
+        raise ValueError(f"Time window {window} closes before it opens")
+    return opens, closes
+
+
+class TimeWindowRules(FleetRules):
+    """
+    :class:`FleetRules` with time windows (VRPTW). Times are minutes after
+    midnight (IST) of the collection day; ``earliest``/``latest`` bound the
+    start of service at every matrix index and vehicle ``v`` leaves the depot
+    at ``shift_start[v]`` and must be back by ``shift_end[v]`` (and within
+    ``max_shift`` minutes). A truck arriving early waits for the window.
+
+    ``start`` computes the schedule of every route together with its forward
+    time slack: how far the service at each position can be pushed back
+    without breaking a later window. Inserting or swapping a stop then only
+    looks at its neighbours, so the checks are vectorised over all positions
+    like the capacity and shift checks.
+    """
+
+    def __init__(self, length, demand, capacities, max_shift, average_speed, stop_time, objective='distance',
+                 earliest=None, latest=None, shift_start=None, shift_end=None):
+        super().__init__(length, demand, capacities, max_shift, average_speed, stop_time, objective)
+        n = len(self.demand)
+        self.earliest = np.zeros(n) if earliest is None else np.asarray(earliest, dtype=np.float64)
+        self.latest = np.full(n, math.inf) if latest is None else np.asarray(latest, dtype=np.float64)
+        vehicles = len(self.capacities)
+        self.shift_start = np.zeros(vehicles) if shift_start is None else np.asarray(shift_start, dtype=np.float64)
+        shift_end = np.full(vehicles, math.inf) if shift_end is None else np.asarray(shift_end, dtype=np.float64)
+        self.shift_end = np.minimum(shift_end, self.shift_start + self.max_shift)
+
+    def travel(self, a, b):
+        return self.length[a, b] / self.average_speed * 60
+
+    def schedule(self, vehicle, route):
+        """
+        ``(begin, slack)`` per route position: when service starts (departure
+        from the depot first, return last) and the forward time slack.
+        """
+        r = np.asarray(route, dtype=np.int64)
+        service = np.full(len(r), float(self.stop_time))
+        service[0] = 0.0
+        earliest = self.earliest[r].copy()
+        latest = self.latest[r].copy()
+        earliest[0] = latest[0] = self.shift_start[vehicle]
+        earliest[-1], latest[-1] = -math.inf, self.shift_end[vehicle]
+
+        # begin[i] = max(arrival[i], earliest[i]) as a running maximum over
+        # the prefix sums of service + travel
+        steps = np.concatenate([[0.0], service[:-1] + self.travel(r[:-1], r[1:])])
+        elapsed = np.cumsum(steps)
+        begin = elapsed + np.maximum.accumulate(earliest - elapsed)
+        wait = begin - np.concatenate([[begin[0]], begin[:-1] + steps[1:]])
+        waited = np.cumsum(wait)
+        # slack[i] = min over j >= i of latest[j] - begin[j] plus the waiting in between
+        slack = np.minimum.accumulate((latest - begin + waited)[::-1])[::-1] - waited
+        return begin, slack
+
+    def first_late(self, vehicle, route):
+        begin, _ = self.schedule(vehicle, route)
+        latest = self.latest[np.asarray(route, dtype=np.int64)]
+        latest[0], latest[-1] = self.shift_start[vehicle], self.shift_end[vehicle]
+        late = np.flatnonzero(begin > latest + EPS)
+        return int(late[0]) if len(late) else None
+
+    def route_duration(self, route, vehicle=None):
+        if vehicle is None or len(route) < 3:
+            return super().route_duration(route)
+        begin, _ = self.schedule(vehicle, route)
+        return float(begin[-1] - begin[0])
+
+    def arrival_minutes(self, vehicle, route):
+        begin, _ = self.schedule(vehicle, route)
+        return begin - begin[0]
+
+    # Acceptance rule used by improve_routes
+
+    def rank(self, cost, routes):
+        total = sum(tour_cost(cost, r) for r in routes)
+        if self.objective == 'makespan':
+            return (max(self.route_duration(r, v) for v, r in enumerate(routes)), total)
+        return (total,)
+
+    def start(self, cost, routes):
+        super().start(cost, routes)
+        self.schedules = [self.schedule(v, r) for v, r in enumerate(routes)]
+
+    def _fits_between(self, vehicle, route, before, after, stop):
+        """Whether ``stop`` can be served between positions ``before`` and ``after`` (arrays)."""
+        r = np.asarray(route, dtype=np.int64)
+        begin, slack = self.schedules[vehicle]
+        departure = begin[before] + np.where(before > 0, self.stop_time, 0.0)
+        start = np.maximum(departure + self.travel(r[before], stop), self.earliest[stop])
+        arrival_next = start + self.stop_time + self.travel(stop, r[after])
+        earliest_next = np.where(after == len(r) - 1, -math.inf, self.earliest[r[after]])
+        push = np.maximum(arrival_next, earliest_next) - begin[after]
+        return (start <= self.latest[stop] + EPS) & (push <= slack[after] + EPS)
+
+    def insertion_feasible(self, vehicle, route, stop):
+        positions = np.arange(len(route) - 1)
+        return self._fits_between(vehicle, route, positions, positions + 1, stop)
+
+    def relocate(self, routes, a, i, b, delta_a, delta_b):
+        score, ok = super().relocate(routes, a, i, b, delta_a, delta_b)
+        # Taking a stop out never makes the rest of route a later
+        return score, ok & self.insertion_feasible(b, routes[b], routes[a][i])
+
+    def exchange(self, routes, a, i, b, delta_a, delta_b):
+        score, ok = super().exchange(routes, a, i, b, delta_a, delta_b)
+        route_a, route_b = routes[a], routes[b]
+        j = np.arange(1, len(route_b) - 1)
+        into_b = self._fits_between(b, route_b, j - 1, j + 1, route_a[i])
+        into_a = self._fits_between(a, route_a, np.array([i - 1]), np.array([i + 1]),
+                                    np.asarray(route_b[1:-1], dtype=np.int64))
+        return score, ok & into_a & into_b
+
+    def sequence_check(self, vehicle):
+        """Feasibility test for reordered routes of ``vehicle`` (intra-route moves)."""
+        return lambda route: self.first_late(vehicle, route) is None
+
@@ -0,0 +1,34 @@
+import math
+
+import numpy as np
+
+
+def nearest_neighbour_tour(matrix, depot, stops):
+    """
+    Greedy tour over matrix indices, starting and ending at ``depot``.
+
+    Each step is a row lookup in the precomputed cost matrix instead of a
+    shortest-path search.
+    """
+    stops = [s for s in dict.fromkeys(stops) if s != depot]
+    remaining = np.array(stops, dtype=np.int64)
+    tour = [depot]
+    current = depot
+    while len(remaining):
+        costs = matrix.cost[current, remaining]
+        k = int(np.argmin(costs))
+        if not np.isfinite(costs[k]):
+            # Remaining stops are unreachable from here
+            break
+        current = int(remaining[k])
+        tour.append(current)
+        remaining = np.delete(remaining, k)
+    tour.append(depot)
+    return tour
+
+
+def split_tour(tour, parts):
+    """Cut the stops of a depot-to-depot tour into ``parts`` consecutive slices."""
+    stops = tour[1:-1]
+    size = math.ceil(len(stops) / parts) if parts else 0
+    return [stops[i * size:(i + 1) * size] for i in range(parts)]
@@ -0,0 +1,353 @@
+import math
+
+import numpy as np
+
+from .clustering import balanced_kmeans, project
+from .local_search import EPS, exchange_deltas, insertion_deltas, removal_delta, tour_cost
+from .tour import nearest_neighbour_tour
+
+OBJECTIVES = ('distance', 'makespan')
+CONSTRUCTIONS = ('savings', 'sweep', 'cluster')
+
+
+class FleetRules:
+    """
+    Capacity and shift limits of the fleet for one routing run.
+
+    ``demand`` holds the kg to collect at every matrix index (0 for the
+    depot), ``capacities`` the kg each vehicle can carry. A route's duration
+    is its road length at ``average_speed`` plus ``stop_time`` per stop, and
+    must stay within ``max_shift`` minutes. Load, length and stop count are
+    tracked per route so that checking a move costs O(1). When the legs have
+    known travel times, ``length`` holds the km driven in that time at
+    ``average_speed`` (see ``DistanceMatrix.timing_length``).
+    """
+
+    def __init__(self, length, demand, capacities, max_shift, average_speed, stop_time, objective='distance'):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective '{objective}', expected one of {', '.join(OBJECTIVES)}")
+        self.length = length
+        self.demand = np.asarray(demand, dtype=np.float64)
+        self.capacities = [float(c) for c in capacities]
+        self.max_shift = float(max_shift)
+        self.average_speed = average_speed
+        self.stop_time = stop_time
+        self.objective = objective
+
+    def duration(self, length_km, stops):
+        return length_km / self.average_speed * 60 + stops * self.stop_time
+
+    def route_load(self, route):
+        return float(self.demand[route].sum())
+
+    def route_duration(self, route):
+        return self.duration(tour_cost(self.length, route), max(len(route) - 2, 0))
+
+    def fits(self, vehicle, load, length_km, stops):
+        return (load <= self.capacities[vehicle] + EPS
+                and self.duration(length_km, stops) <= self.max_shift + EPS)
+
+    def arrival_minutes(self, vehicle, route):
+        """Minutes after leaving the depot at which each route position is reached."""
+        route = np.asarray(route, dtype=np.int64)
+        legs = np.concatenate([[0.0], np.cumsum(self.length[route[:-1], route[1:]])])
+        stops_before = np.maximum(np.arange(len(route)) - 1, 0)
+        return legs / self.average_speed * 60 + stops_before * self.stop_time
+
+    # Order-dependent limits; none here, see TimeWindowRules
+
+    def first_late(self, vehicle, route):
+        """Position of the first stop the route serves too late, None if there is none."""
+        return None
+
+    def insertion_feasible(self, vehicle, route, stop):
+        """Which positions of the route ``stop`` could be inserted after, ignoring load and length."""
+        return np.ones(len(route) - 1, dtype=bool)
+
+    def sequence_check(self, vehicle):
+        """Feasibility test for reordered routes of ``vehicle``, None when any order will do."""
+        return None
+
+    # Acceptance rule used by improve_routes
+
+    def rank(self, cost, routes):
+        """Sort key of a complete solution, lower is better."""
+        total = sum(tour_cost(cost, r) for r in routes)
+        if self.objective == 'makespan':
+            return (max(self.route_duration(r) for r in routes), total)
+        return (total,)
+
+    def start(self, cost, routes):
+        self.lengths = [tour_cost(self.length, r) for r in routes]
+        self.loads = [self.route_load(r) for r in routes]
+        self.stops = [len(r) - 2 for r in routes]
+
+    def _score(self, a, b, cost_a, cost_b, length_a, length_b, load_a, load_b, stops_a, stops_b):
+        duration_a = self.duration(self.lengths[a] + length_a, self.stops[a] + stops_a)
+        duration_b = self.duration(self.lengths[b] + length_b, self.stops[b] + stops_b)
+        ok = ((self.loads[a] + load_a <= self.capacities[a] + EPS)
+              & (self.loads[b] + load_b <= self.capacities[b] + EPS)
+              & (duration_a <= self.max_shift + EPS)
+              & (duration_b <= self.max_shift + EPS))
+        if self.objective == 'makespan':
+            before = max(self.duration(self.lengths[a], self.stops[a]),
+                         self.duration(self.lengths[b], self.stops[b]))
+            # Shorten the longer of the two routes; distance only breaks ties
+            score = np.maximum(duration_a, duration_b) - before + 1e-6 * (cost_a + cost_b)
+        else:
+            score = cost_a + cost_b
+        return score, ok
+
+    def relocate(self, routes, a, i, b, delta_a, delta_b):
+        stop = routes[a][i]
+        demand = self.demand[stop]
+        return self._score(a, b, delta_a, delta_b,
+                           removal_delta(self.length, routes[a], i),
+                           insertion_deltas(self.length, routes[b], stop),
+                           -demand, demand, -1, 1)
+
+    def exchange(self, routes, a, i, b, delta_a, delta_b):
+        length_a, length_b = exchange_deltas(self.length, routes[a], i, routes[b])
+        load = self.demand[routes[b][1:-1]] - self.demand[routes[a][i]]
+        return self._score(a, b, delta_a, delta_b, length_a, length_b, load, -load, 0, 0)
+
+
+def savings_routes(cost, depot, stops, rules, share=math.inf):
+    """
+    Clarke-Wright savings: start with one route per stop and merge route ends
+    in order of ``cost[depot, i] + cost[depot, j] - cost[i, j]`` while the
+    merged route still fits the largest vehicle and takes at most ``share``
+    minutes.
+    """
+    largest = int(np.argmax(rules.capacities))
+    length = rules.length
+    routes = {s: [s] for s in stops}
+    route_of = {s: s for s in stops}
+    loads = {s: float(rules.demand[s]) for s in stops}
+    lengths = {s: length[depot, s] + length[s, depot] for s in stops}
+
+    stops = np.asarray(stops, dtype=np.int64)
+    i, j = np.triu_indices(len(stops), k=1)
+    savings = cost[depot, stops[i]] + cost[depot, stops[j]] - cost[stops[i], stops[j]]
+    order = np.argsort(-savings, kind='stable')
+    for k in order[savings[order] > EPS]:
+        u, v = int(stops[i[k]]), int(stops[j[k]])
+        ru, rv = route_of[u], route_of[v]
+        if ru == rv:
+            continue
+        left, right = routes[ru], routes[rv]
+        # Orient so that u ends the left route and v starts the right one
+        if left[-1] != u:
+            if left[0] != u:
+                continue
+            left = left[::-1]
+        if right[0] != v:
+            if right[-1] != v:
+                continue
+            right = right[::-1]
+        load = loads[ru] + loads[rv]
+        merged_length = lengths[ru] + lengths[rv] - length[u, depot] - length[depot, v] + length[u, v]
+        stops_merged = len(left) + len(right)
+        if (not rules.fits(largest, load, merged_length, stops_merged)
+                or rules.duration(merged_length, stops_merged) > share):
+            continue
+        routes[ru] = left + right
+        loads[ru] = load
+        lengths[ru] = merged_length
+        for s in routes.pop(rv):
+            route_of[s] = ru
+        del loads[rv], lengths[rv]
+    return [[depot] + r + [depot] for r in routes.values()]
+
+
+def balanced_share(tour, rules, num_vehicles):
+    """
+    Minutes of work per vehicle if the depot-to-depot ``tour`` over all stops
+    were shared evenly; unlimited unless minimising makespan.
+    """
+    if rules.objective != 'makespan' or len(tour) < 3:
+        return math.inf
+    return rules.route_duration(tour) / max(num_vehicles, 1)
+
+
+def bearing_order(coords, depot, stops):
+    """Stops sorted by bearing around the depot, starting after the widest gap."""
+    dy = coords[stops, 0] - coords[depot, 0]
+    dx = (coords[stops, 1] - coords[depot, 1]) * math.cos(math.radians(coords[depot, 0]))
+    angle = np.arctan2(dy, dx)
+    order = np.argsort(angle)
+    gaps = np.diff(np.concatenate([angle[order], angle[order[:1]] + 2 * math.pi]))
+    order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+    return [stops[k] for k in order]
+
+
+def sweep_routes(ordered, depot, rules, vehicles, share=math.inf):
+    """
+    Sweep: fill the vehicles one after another with the stops in bearing
+    order (see :func:`bearing_order`). Every vehicle but the last also stops
+    at ``share`` minutes of work.
+    """
+    length = rules.length
+    routes = []
+    position = 0
+    for n, vehicle in enumerate(vehicles):
+        last_vehicle = n == len(vehicles) - 1
+        route, load, route_length = [], 0.0, 0.0
+        while position < len(ordered):
+            s = ordered[position]
+            last = route[-1] if route else depot
+            new_length = route_length - length[last, depot] + length[last, s] + length[s, depot]
+            new_load = load + rules.demand[s]
+            if not rules.fits(vehicle, new_load, new_length, len(route) + 1):
+                break
+            if route and not last_vehicle and rules.duration(route_length, len(route)) >= share:
+                break
+            route.append(s)
+            load, route_length = new_load, new_length
+            position += 1
+        routes.append([depot] + route + [depot])
+    return routes
+
+
+def cut_to_fit(route, depot, rules, vehicle):
+    """Longest prefix of a depot-to-depot route that ``vehicle`` can serve."""
+    length = rules.length
+    load, route_length, last = 0.0, 0.0, depot
+    for k, s in enumerate(route[1:-1]):
+        new_length = route_length - length[last, depot] + length[last, s] + length[s, depot]
+        if not rules.fits(vehicle, load + rules.demand[s], new_length, k + 1):
+            return route[:k + 1] + [depot]
+        load, route_length, last = load + rules.demand[s], new_length, s
+    return route
+
+
+def cluster_routes(matrix, coords, depot, stops, rules, zones=None, slack=0.1):
+    """
+    Zone first, route second: balanced k-means over the road-node
+    coordinates of the stops gives every vehicle a compact zone with a share
+    of the demand proportional to its capacity, then each zone is toured
+    nearest-neighbour and cut where it no longer fits the vehicle.
+
+    ``zones`` are ``(lat, lon)`` rows per vehicle (``nan`` when unknown) from
+    an earlier run; they seed the clustering so that similar stop sets give
+    the drivers the same areas again. Returns ``(routes, leftover)``.
+    """
+    num_vehicles = len(rules.capacities)
+    if not stops:
+        return [[depot, depot] for _ in range(num_vehicles)], []
+    origin = coords[depot]
+    seeds = project(zones, origin) if zones is not None else None
+    shares = np.nan_to_num(np.asarray(rules.capacities), posinf=1.0)
+    labels, _, _ = balanced_kmeans(project(coords[stops], origin), rules.demand[stops], shares, seeds, slack)
+    routes, leftover = [], []
+    for v in range(num_vehicles):
+        zone = [s for s, label in zip(stops, labels) if label == v]
+        route = cut_to_fit(nearest_neighbour_tour(matrix, depot, zone), depot, rules, v)
+        routes.append(route)
+        served = set(route)
+        leftover.extend(s for s in zone if s not in served)
+    return routes, leftover
+
+
+def zone_centres(coords, routes):
+    """Mean ``[lat, lon]`` of the stops of every route (None for an empty route), to seed the next run."""
+    return [np.asarray(coords[r[1:-1]]).mean(axis=0).tolist() if len(r) > 2 else None for r in routes]
+
+
+def assign_vehicles(routes, depot, rules, num_vehicles):
+    """
+    Match constructed routes to vehicles, heaviest route to largest truck.
+    Returns one route per vehicle (empty routes for idle trucks) and the stops
+    of routes that no vehicle could take.
+    """
+    by_load = sorted(routes, key=rules.route_load, reverse=True)
+    vehicles = sorted(range(num_vehicles), key=lambda v: rules.capacities[v], reverse=True)
+    assigned = [None] * num_vehicles
+    leftover = []
+    for route in by_load:
+        for v in vehicles:
+            if assigned[v] is None and rules.fits(v, rules.route_load(route),
+                                                   tour_cost(rules.length, route), len(route) - 2):
+                assigned[v] = route
+                break
+        else:
+            leftover.extend(route[1:-1])
+    return [r if r is not None else [depot, depot] for r in assigned], leftover
+
+
+def drop_late_stops(routes, rules):
+    """
+    Take stops out of the routes until every time window holds, each time
+    the first stop served after its window closes. Returns the stops removed.
+    """
+    removed = []
+    for v, route in enumerate(routes):
+        late = rules.first_late(v, route)
+        while late is not None and len(route) > 2:
+            removed.append(route.pop(min(max(late, 1), len(route) - 2)))
+            late = rules.first_late(v, route)
+    return removed
+
+
+def insert_leftovers(cost, routes, leftover, rules):
+    """Cheapest feasible insertion of stops that did not fit during construction."""
+    unassigned = []
+    for stop in sorted(leftover, key=lambda s: -rules.demand[s]):
+        rules.start(cost, routes)
+        best = None
+        for v, route in enumerate(routes):
+            insertion = insertion_deltas(cost, route, stop)
+            extra = insertion_deltas(rules.length, route, stop)
+            allowed = rules.insertion_feasible(v, route, stop)
+            for k in np.argsort(insertion):
+                if allowed[k] and rules.fits(v, rules.loads[v] + rules.demand[stop],
+                                             rules.lengths[v] + extra[k], rules.stops[v] + 1):
+                    if best is None or insertion[k] < best[0]:
+                        best = (insertion[k], v, int(k) + 1)
+                    break
+        if best is None:
+            unassigned.append(stop)
+        else:
+            routes[best[1]].insert(best[2], stop)
+    return unassigned
+
+
+def construct_routes(matrix, depot, stops, rules, coords=None, construction='savings', zones=None,
+                     cluster_slack=0.1):
+    """
+    Capacitated, shift-limited starting routes over ``stops`` (matrix
+    indices) for ``len(rules.capacities)`` vehicles, to be improved by local
+    search with ``rules`` as the acceptance rule. ``zones`` and
+    ``cluster_slack`` are used by the 'cluster' construction.
+
+    Returns ``(routes, unassigned)``, one route per vehicle and the stops no
+    vehicle could serve.
+    """
+    if construction not in CONSTRUCTIONS:
+        raise ValueError(f"Unknown construction '{construction}', expected one of {', '.join(CONSTRUCTIONS)}")
+    num_vehicles = len(rules.capacities)
+    reachable = [s for s in stops if np.isfinite(matrix.cost[depot, s]) and np.isfinite(matrix.cost[s, depot])]
+    unreachable = sorted(set(stops) - set(reachable))
+
+    if construction in ('sweep', 'cluster') and coords is None:
+        raise ValueError(f"{construction.capitalize()} construction needs stop coordinates")
+
+    # When minimising makespan no route should take more than its share of
+    # the work, measured on a tour built the same way as the routes
+    if construction == 'cluster':
+        routes, leftover = cluster_routes(matrix, coords, depot, reachable, rules, zones, cluster_slack)
+    elif construction == 'sweep':
+        ordered = bearing_order(coords, depot, reachable) if reachable else []
+        share = balanced_share([depot] + ordered + [depot], rules, num_vehicles)
+        routes = sweep_routes(ordered, depot, rules, range(num_vehicles), share)
+        served = {s for r in routes for s in r[1:-1]}
+        leftover = [s for s in reachable if s not in served]
+        routes = [nearest_neighbour_tour(matrix, depot, r[1:-1]) for r in routes]
+    else:
+        share = balanced_share(nearest_neighbour_tour(matrix, depot, reachable), rules, num_vehicles)
+        routes, leftover = assign_vehicles(savings_routes(matrix.cost, depot, reachable, rules, share),
+                                           depot, rules, num_vehicles)
+
+    leftover = leftover + drop_late_stops(routes, rules)
+    unassigned = insert_leftovers(matrix.cost, routes, leftover, rules) + unreachable
+    return routes, unassigned
@@ -0,0 +1,24 @@
+// Decoder for the Google encoded polylines served with the route geometry
+// (see routing/polyline.py). Returns an array of [lat, lon] pairs.
+function decodePolyline(encoded, precision = 5) {
+  const factor = Math.pow(10, precision);
+  const coords = [];
+  let index = 0, lat = 0, lon = 0;
+
+  function nextValue() {
+    let result = 0, shift = 0, byte;
+    do {
+      byte = encoded.charCodeAt(index++) - 63;
+      result |= (byte & 0x1f) << shift;
+      shift += 5;
+    } while (byte >= 0x20);
+    return (result & 1) ? ~(result >> 1) : (result >> 1);
+  }
+
+  while (index < encoded.length) {
+    lat += nextValue();
+    lon += nextValue();
+    coords.push([lat / factor, lon / factor]);
+  }
+  return coords;
+}
@@ -0,0 +1,222 @@
+import math
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from shared.models import db, DriverPosition
+from Route_Optimization_Gihanga.config import Config
+from Route_Optimization_Gihanga.routing.graph_store import get_spatial_index
+from Route_Optimization_Gihanga.routing.speed_profile import SpeedProfile, match_traces
+
+# Live driver tracking. The driver map posts its GPS fixes in batches:
+#
+#   {"t0": <epoch ms>, "fixes": [[dt_ms, lat, lon, accuracy_m, speed_mps, heading], ...]}
+#
+# where each fix was taken ``dt_ms`` after ``t0`` and the last three values
+# are optional (null or left out). The latest position of every driver is
+# kept in memory; other processes' inserts are picked up by reading only the
+# rows added since the last read (the table is append-only).
+
+_latest = {}
+_last_id = None
+_pruned_day = None
+_lock = threading.Lock()
+
+# A phone clock this far ahead of the server is not trusted
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+EPOCH = datetime(1970, 1, 1)
+
+
+def partition_day(moment):
+    return moment.year * 10000 + moment.month * 100 + moment.day
+
+
+def _optional(fix, k):
+    if len(fix) <= k or fix[k] is None:
+        return None
+    value = float(fix[k])
+    return value if math.isfinite(value) else None
+
+
+def parse_fixes(vehicle_no, data):
+    """
+    ``driver_positions`` rows for a batch payload. Raises ValueError for a
+    malformed batch; single fixes that are out of range are skipped and
+    counted. Returns ``(rows, rejected)``.
+    """
+    fixes = data.get('fixes')
+    if not isinstance(fixes, list):
+        raise ValueError("Expected a 'fixes' array")
+    if len(fixes) > Config.MAX_POSITION_BATCH:
+        raise ValueError(f"At most {Config.MAX_POSITION_BATCH} fixes per request")
+    try:
+        t0 = float(data.get('t0', 0))
+    except (TypeError, ValueError):
+        raise ValueError("'t0' must be a timestamp in milliseconds")
+
+    now = datetime.utcnow()
+    oldest = now - timedelta(days=Config.POSITION_RETENTION_DAYS)
+    rows = []
+    rejected = 0
+    for fix in fixes:
+        try:
+            recorded_at = datetime.utcfromtimestamp((t0 + float(fix[0])) / 1000)
+            lat, lon = float(fix[1]), float(fix[2])
+            accuracy, speed, heading = _optional(fix, 3), _optional(fix, 4), _optional(fix, 5)
+        except (TypeError, ValueError, IndexError, OverflowError, OSError):
+            rejected += 1
+            continue
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or not oldest <= recorded_at <= now + MAX_CLOCK_SKEW:
+            rejected += 1
+            continue
+        rows.append({
+            "partition_day": partition_day(recorded_at),
+            "vehicle_no": vehicle_no,
+            "recorded_at": recorded_at,
+            "latitude": lat,
+            "longitude": lon,
+            "accuracy_m": accuracy,
+            "speed_mps": speed,
+            "heading": heading,
+        })
+    return rows, rejected
+
+
+def _position(row):
+    return {
+        "vehicle_no": row["vehicle_no"],
+        "lat": row["latitude"],
+        "lon": row["longitude"],
+        "recorded_at": row["recorded_at"].isoformat(),
+        "accuracy_m": row["accuracy_m"],
+        "speed_mps": row["speed_mps"],
+        "heading": row["heading"],
+    }
+
+
+def _remember(positions):
+    """
+    Keep the newest fix per vehicle (ISO timestamps compare in time order);
+    of fixes with the same time, the one stored last.
+    """
+    changed = set()
+    for position in positions:
+        current = _latest.get(position["vehicle_no"])
+        if current is None or position["recorded_at"] >= current["recorded_at"]:
+            _latest[position["vehicle_no"]] = position
+            changed.add(position["vehicle_no"])
+    return changed
+
+
+def refresh_latest():
+    """Fold rows stored since the last read (by any process) into the cache."""
+    global _last_id
+    with _lock:
+        if _last_id is None:
+            # First use in this process: the newest fix of every vehicle.
+            # Batches can arrive out of order (a phone catching up after a
+            # gap), so the highest id is not necessarily the latest fix.
+            _last_id = db.session.query(func.max(DriverPosition.id)).scalar() or 0
+            ranked = (db.session.query(
+                DriverPosition.id,
+                func.row_number().over(partition_by=DriverPosition.vehicle_no,
+                                       order_by=(DriverPosition.recorded_at.desc(),
+                                                 DriverPosition.id.desc())).label('rank'))
+                      .filter(DriverPosition.id <= _last_id)
+                      .subquery())
+            rows = (DriverPosition.query
+                    .join(ranked, DriverPosition.id == ranked.c.id)
+                    .filter(ranked.c.rank == 1)
+                    .all())
+        else:
+            rows = DriverPosition.query.filter(DriverPosition.id > _last_id).order_by(DriverPosition.id).all()
+            if rows:
+                _last_id = rows[-1].id
+        return _remember(row.to_dict() for row in rows)
+
+
+def latest_positions():
+    refresh_latest()
+    return sorted(_latest.values(), key=lambda p: p["vehicle_no"])
+
+
+def latest_position(vehicle_no):
+    refresh_latest()
+    return _latest.get(vehicle_no)
+
+
+def record_positions(vehicle_no, data):
+    """
+    Store a batch of fixes with one bulk insert and update the cached latest
+    position. Returns ``(accepted, rejected)``.
+    """
+    rows, rejected = parse_fixes(vehicle_no, data)
+    if rows:
+        db.session.bulk_insert_mappings(DriverPosition, rows)
+        db.session.commit()
+        with _lock:
+            _remember(_position(row) for row in rows)
+    prune_positions_daily()
+    return len(rows), rejected
+
+
+def prune_positions(retention_days=None):
+    """Drop the partition days older than the retention period; returns the rows deleted."""
+    retention_days = retention_days if retention_days is not None else Config.POSITION_RETENTION_DAYS
+    cutoff = partition_day(datetime.utcnow() - timedelta(days=retention_days))
+    deleted = DriverPosition.query.filter(DriverPosition.partition_day < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def prune_positions_daily():
+    global _pruned_day
+    today = partition_day(datetime.utcnow())
+    if _pruned_day != today:
+        _pruned_day = today
+        prune_positions()
+
+
+def learn_speed_profile(days=None, output=None, progress=None):
+    """
+    Offline job: map-match the GPS history of the last ``days`` days to the
+    road graph and store per-edge, per-hour (IST) speeds for the ETAs. The
+    history is read one partition day at a time in (vehicle, time) order.
+    Returns ``(profile, samples)``.
+    """
+    days = days if days is not None else Config.POSITION_RETENTION_DAYS
+    index = get_spatial_index()
+    today = datetime.utcnow()
+    ist_offset = timedelta(hours=5, minutes=30)
+
+    edges, hours, speeds = [], [], []
+    for k in range(days, -1, -1):
+        day = partition_day(today - timedelta(days=k))
+        rows = (DriverPosition.query
+                .with_entities(DriverPosition.vehicle_no, DriverPosition.recorded_at, DriverPosition.latitude,
+                               DriverPosition.longitude, DriverPosition.speed_mps)
+                .filter(DriverPosition.partition_day == day)
+                .order_by(DriverPosition.vehicle_no, DriverPosition.recorded_at)
+                .all())
+        if rows:
+            vehicles, times, lats, lons, reported = zip(*rows)
+            day_edges, day_speeds, keep = match_traces(
+                index, np.asarray(vehicles), np.array([(t - EPOCH).total_seconds() for t in times]),
+                np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64),
+                np.array([v if v is not None else np.nan for v in reported], dtype=np.float64),
+                Config.SPEED_MATCH_DISTANCE_M, Config.SPEED_MAX_GAP_SECONDS)
+            edges.append(day_edges)
+            speeds.append(day_speeds)
+            hours.append(np.array([(t + ist_offset).hour for t, kept in zip(times, keep) if kept], dtype=np.int64))
+        if progress:
+            progress(day, len(rows))
+
+    edges = np.concatenate(edges) if edges else np.zeros(0, dtype=np.int64)
+    profile = SpeedProfile.build(index.graph, edges,
+                                 np.concatenate(hours) if hours else np.zeros(0, dtype=np.int64),
+                                 np.concatenate(speeds) if speeds else np.zeros(0),
+                                 Config.SPEED_PROFILE_MIN_SAMPLES)
+    profile.save(output or Config.SPEED_PROFILE_PATH)
+    return profile, len(edges)
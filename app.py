@@ -1,6 +1,9 @@
+import os
 from flask import Flask, render_template
 from shared import shared_bp, db
+from shared.model_registry import registry
 from Route_Optimization_Gihanga import route_optimization_bp
+from Route_Optimization_Gihanga.jobs import fail_interrupted_jobs
 from HouseHold_Waste_Prediction_Chirath import household_bp
 from Hospital_Waste_Prediction_Dharani import hospital_bp
 from Feedback_Complaints_Chatbot_Himan import chatbot_bp, init_chatbot_db
@@ -20,6 +23,32 @@ app.register_blueprint(route_optimization_bp, url_prefix='/routeOptimization')
 app.register_blueprint(household_bp, url_prefix='/household')
 app.register_blueprint(hospital_bp, url_prefix='/hospital')
 app.register_blueprint(chatbot_bp, url_prefix='/chat')
+
+# The ML models load on first use; WARM_UP_MODELS loads them ahead of time
+# instead ("*" for all, or comma-separated names/patterns such as
+# "hospital.*"). Importing the app only loads the fork-safe joblib/XGBoost
+# models (with gunicorn --preload that is the master); the TensorFlow and
+# PyTorch models are loaded by each worker from gunicorn's post_fork hook,
+# e.g. "from app import start_worker as post_fork" in gunicorn.conf.py.
+def warm_up_models(fork_safe_only=False):
+    if os.getenv('WARM_UP_MODELS'):
+        registry.warm_up(os.getenv('WARM_UP_MODELS').split(','), fork_safe_only)
+
+
+def recover_routing_jobs():
+    """Fail the routing jobs left behind by processes that stopped."""
+    with app.app_context():
+        fail_interrupted_jobs()
+
+
+def start_worker(server, worker):
+    """gunicorn ``post_fork`` hook: recover stopped jobs, load this worker's WARM_UP_MODELS."""
+    recover_routing_jobs()
+    warm_up_models()
+
+
+warm_up_models(fork_safe_only=True)
+
 # Home Route
 @app.route('/')
 def home():
@@ -28,4 +57,6 @@ def home():
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+    recover_routing_jobs()
+    warm_up_models()
     app.run(debug=True)
\ No newline at end of file
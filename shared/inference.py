@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Micro-batching of model calls: concurrent requests are collected for up to
+# INFERENCE_MAX_WAIT_MS and run as one batch of at most INFERENCE_MAX_BATCH
+# rows. A longer wait gives bigger batches (throughput) at the cost of
+# latency for a lone request.
+MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH', '64'))
+MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', '5'))
+
+
+def compiled_call(model):
+    """
+    ``model(inputs, training=False)`` compiled with ``tf.function`` and
+    returning NumPy, instead of ``model.predict`` (which sets up a data
+    pipeline on every call). The batch size is left free when tracing, so
+    varying batch sizes do not retrace.
+    """
+    import tensorflow as tf
+    call = tf.function(lambda inputs: model(inputs, training=False), reduce_retracing=True)
+
+    def run(*inputs):
+        return call(list(inputs) if len(inputs) > 1 else inputs[0]).numpy()
+    return run
+
+
+class MicroBatcher:
+    """
+    In-process inference queue in front of ``run`` (a function of one or
+    more arrays with a row per example). ``submit`` blocks the calling
+    thread until its rows have been run as part of a batch.
+    """
+
+    def __init__(self, run, max_batch_size=None, max_wait_ms=None, name='model'):
+        self.run = run
+        self.max_batch_size = max_batch_size or MAX_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else MAX_WAIT_MS) / 1000
+        self.name = name
+        self.batches = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+        self._requests = None
+        self._pid = None
+
+    def submit(self, *inputs):
+        """Outputs of the rows of ``inputs``, run together with other waiting requests."""
+        future = Future()
+        self._queue().put((inputs, len(inputs[0]), future))
+        return future.result()
+
+    def _queue(self):
+        # The worker thread does not survive a fork (e.g. gunicorn --preload),
+        # so a forked process starts its own
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._requests = queue.Queue()
+                    threading.Thread(target=self._work, args=(self._requests,),
+                                     name=f'{self.name}-batcher', daemon=True).start()
+                    self._pid = os.getpid()
+        return self._requests
+
+    def _work(self, requests):
+        carry = None
+        while True:
+            first = carry or requests.get()
+            carry = None
+            batch, rows = [first], first[1]
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if rows + request[1] > self.max_batch_size:
+                    carry = request  # starts the next batch
+                    break
+                batch.append(request)
+                rows += request[1]
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        try:
+            inputs = [np.concatenate([request[0][i] for request in batch]) for i in range(len(batch[0][0]))]
+            outputs = np.asarray(self.run(*inputs))
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(outputs)
+        start = 0
+        for _, count, future in batch:
+            future.set_result(outputs[start:start + count])
+            start += count
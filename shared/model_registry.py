@@ -0,0 +1,73 @@
+import fnmatch
+import threading
+import time
+
+
+class ModelRegistry:
+    """
+    One instance of every trained model (and other heavy object) per
+    process, loaded on first use or ahead of time by ``warm_up``. Components
+    register a loader for each model at import time; the ML libraries are
+    only imported by the loaders, so importing the app stays fast.
+
+    Only models registered as ``fork_safe`` (plain joblib/XGBoost objects)
+    may be loaded before a fork, e.g. in a gunicorn master with
+    ``--preload``, and shared copy-on-write by the workers. TensorFlow and
+    PyTorch models keep threads and locks that do not survive a fork, so
+    each worker loads its own (gunicorn ``post_fork``, see app.py).
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._fork_safe = set()
+        self._models = {}
+        self._load_seconds = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, fork_safe=False):
+        """Register ``loader`` (called without arguments) as the way to build model ``name``."""
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            if fork_safe:
+                self._fork_safe.add(name)
+
+    def get(self, name):
+        """The process's instance of model ``name``, loading it on first use."""
+        if name in self._models:
+            return self._models[name]
+        if name not in self._loaders:
+            raise KeyError(f"No model registered as '{name}'")
+        with self._locks[name]:
+            # Another thread may have loaded it while this one waited
+            if name not in self._models:
+                start = time.perf_counter()
+                model = self._loaders[name]()
+                self._load_seconds[name] = time.perf_counter() - start
+                self._models[name] = model
+                print(f"Loaded model {name} in {self._load_seconds[name]:.2f} s")
+        return self._models[name]
+
+    def warm_up(self, patterns=('*',), fork_safe_only=False):
+        """
+        Load every registered model whose name matches one of the glob
+        ``patterns`` (only the fork-safe ones with ``fork_safe_only``);
+        returns their names.
+        """
+        names = [name for name in list(self._loaders)
+                 if any(fnmatch.fnmatch(name, pattern.strip()) for pattern in patterns)
+                 and (name in self._fork_safe or not fork_safe_only)]
+        for name in names:
+            self.get(name)
+        return names
+
+    def status(self):
+        """``{name: {"loaded", "fork_safe", "load_seconds"}}`` of every registered model."""
+        return {name: {"loaded": name in self._models,
+                       "fork_safe": name in self._fork_safe,
+                       "load_seconds": round(self._load_seconds[name], 3) if name in self._load_seconds else None}
+                for name in sorted(self._loaders)}
+
+
+registry = ModelRegistry()
@@ -75,3 +75,160 @@ class WasteAvailability(db.Model):
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     date = db.Column(DateTime, nullable=False) # storing the date as a text string
+
+class RouteStop(db.Model):
+    __tablename__ = 'route_stops'
+    id = db.Column(db.Integer, primary_key=True)
+    route_id = db.Column(db.Integer, db.ForeignKey('driver_routes.id'), nullable=False)
+    sequence = db.Column(db.Integer, nullable=False)  # position in the route, depot = 0
+    username = db.Column(db.String(100), index=True)  # citizen served here (None for the depot)
+    waste_id = db.Column(db.Integer, db.ForeignKey('waste_availability.id'))
+    node = db.Column(db.Integer)  # snapped road node
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    planned_eta = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index('ix_route_stops_route_sequence', 'route_id', 'sequence'),)
+
+class RouteGeometry(db.Model):
+    __tablename__ = 'route_geometries'
+    route_id = db.Column(db.Integer, db.ForeignKey('driver_routes.id'), primary_key=True)
+    graph_version = db.Column(db.String(32))
+    polyline = db.Column(db.Text, nullable=False)  # Google encoded polyline of the full road path
+    precision = db.Column(db.Integer, nullable=False, default=5)
+    stops = db.Column(db.Text, nullable=False)  # polyline index of every route point
+    roads = db.Column(db.Text, nullable=False)  # [[edge index, road name], ...]
+    etag = db.Column(db.String(40), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def set_geometry(self, geometry):
+        self.graph_version = geometry['graph_version']
+        self.polyline = geometry['polyline']
+        self.precision = geometry['precision']
+        self.stops = json.dumps(geometry['stops'])
+        self.roads = json.dumps(geometry['roads'])
+
+    def to_dict(self):
+        return {
+            "polyline": self.polyline,
+            "precision": self.precision,
+            "stops": json.loads(self.stops),
+            "roads": json.loads(self.roads),
+            "graph_version": self.graph_version,
+        }
+
+class RouteDirections(db.Model):
+    __tablename__ = 'route_directions'
+    route_id = db.Column(db.Integer, db.ForeignKey('driver_routes.id'), primary_key=True)
+    steps = db.Column(db.Text, nullable=False)  # turn-by-turn steps in driving order
+    total_distance_m = db.Column(db.Float, nullable=False, default=0.0)
+    etag = db.Column(db.String(48), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def set_steps(self, steps):
+        self.steps = json.dumps(steps)
+        self.total_distance_m = steps[-1]['cumulative_m'] if steps else 0.0
+
+    def to_dict(self):
+        return {
+            "steps": json.loads(self.steps),
+            "total_distance_m": self.total_distance_m,
+        }
+
+class DriverPosition(db.Model):
+    # Append-only GPS history; rows are only ever inserted in batches and
+    # deleted a whole partition_day at a time
+    __tablename__ = 'driver_positions'
+    id = db.Column(db.Integer, primary_key=True)
+    partition_day = db.Column(db.Integer, nullable=False)  # UTC day of the fix as YYYYMMDD
+    vehicle_no = db.Column(db.String(50), nullable=False)
+    recorded_at = db.Column(db.DateTime, nullable=False)  # time of the fix on the phone (UTC)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    accuracy_m = db.Column(db.Float)
+    speed_mps = db.Column(db.Float)
+    heading = db.Column(db.Float)
+
+    # AUTOINCREMENT keeps ids growing after old days are deleted (readers
+    # catch up on new rows by id)
+    __table_args__ = (db.Index('ix_driver_positions_day_vehicle', 'partition_day', 'vehicle_no', 'recorded_at'),
+                      {'sqlite_autoincrement': True})
+
+    def to_dict(self):
+        return {
+            "vehicle_no": self.vehicle_no,
+            "lat": self.latitude,
+            "lon": self.longitude,
+            "recorded_at": self.recorded_at.isoformat(),
+            "accuracy_m": self.accuracy_m,
+            "speed_mps": self.speed_mps,
+            "heading": self.heading,
+        }
+
+class CitizenSnap(db.Model):
+    __tablename__ = 'citizen_snaps'
+    username = db.Column(db.String(100), db.ForeignKey('citizens.username'), primary_key=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    graph_version = db.Column(db.String(32), nullable=False)
+    node = db.Column(db.Integer, nullable=False)
+    distance_m = db.Column(db.Float, nullable=False)
+
+# Hours a (commercial) stop can be served, "HH:MM" IST; used as a VRPTW time window
+class CitizenTimeWindow(db.Model):
+    __tablename__ = 'citizen_time_windows'
+    username = db.Column(db.String(100), db.ForeignKey('citizens.username'), primary_key=True)
+    opens = db.Column(db.String(5), nullable=False)
+    closes = db.Column(db.String(5), nullable=False)
+
+    def to_dict(self):
+        return {"username": self.username, "time_window": [self.opens, self.closes]}
+
+# Centre of the area a driver was given in the last assignment; seeds the next clustering
+class DriverZone(db.Model):
+    __tablename__ = 'driver_zones'
+    vehicle_no = db.Column(db.String(50), db.ForeignKey('drivers.vehicle_no'), primary_key=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RoutingJob(db.Model):
+    __tablename__ = 'routing_jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued/running/done/failed
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    message = db.Column(db.String(200))
+    params = db.Column(db.Text)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    owner = db.Column(db.String(100))  # host:pid of the process running it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def set_params(self, params):
+        self.params = json.dumps(params)
+
+    def get_params(self):
+        return json.loads(self.params) if self.params else {}
+
+    def set_result(self, result):
+        self.result = json.dumps(result)
+
+    def get_result(self):
+        return json.loads(self.result) if self.result else None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.get_result(),
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
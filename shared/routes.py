@@ -1,8 +1,9 @@
-from flask import render_template, redirect, url_for, flash, session, request
+from flask import render_template, redirect, url_for, flash, session, request, jsonify
 from datetime import datetime, timedelta
 from . import shared_bp
 from .forms import AdminLoginForm, AdminSignupForm, DriverLoginForm, DriverSignupForm, CitizenLoginForm
 from .models import Admin, Driver, db, Citizen, WasteAvailability, DriverRoute
+from .model_registry import registry
 import pytz
 import math
 
@@ -15,6 +16,8 @@ def admin_login():
     if form.validate_on_submit():
         admin = Admin.query.filter_by(username=form.username.data).first()
         if admin and admin.check_password(form.password.data):
+            # Store the admin's username in the session
+            session['admin_username'] = admin.username
             flash('Admin Login Successful!', 'success')
             return redirect(url_for('shared.admin_options'))
         else:
@@ -176,4 +179,9 @@ def citizen_signup():
 
 @shared_bp.route('/about')
 def about():
-    return render_template('about.html')
\ No newline at end of file
+    return render_template('about.html')
+
+# API: Which ML models this process has loaded and how long each took
+@shared_bp.route('/api/models', methods=['GET'])
+def model_status():
+    return jsonify(registry.status()), 200
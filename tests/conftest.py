@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Route_Optimization_Gihanga.routing.graph import RoadGraph, haversine_km
+
+
+@pytest.fixture(scope='session')
+def grid_graph():
+    """
+    A 7x7 street grid with a few diagonals and random travel costs, so that
+    shortest paths are unique and differ from the shortest distances.
+    """
+    rng = np.random.default_rng(7)
+    size = 7
+    coords = [(6.85 + 0.002 * r, 79.86 + 0.002 * c) for r in range(size) for c in range(size)]
+    edges = []
+    for r in range(size):
+        for c in range(size):
+            node = r * size + c
+            if c + 1 < size:
+                edges.append((node, node + 1))
+            if r + 1 < size:
+                edges.append((node, node + size))
+            if r + 1 < size and c + 1 < size and rng.random() < 0.3:
+                edges.append((node, node + size + 1))
+    edge_u, edge_v = np.array(edges).T
+    coords = np.array(coords)
+    length = haversine_km(coords[edge_u, 0], coords[edge_u, 1], coords[edge_v, 0], coords[edge_v, 1])
+    weight = length * rng.uniform(0.5, 2.0, size=len(edges))
+    return RoadGraph(coords, edge_u, edge_v, length, weight, np.zeros(len(edges)), ["Grid Road"], ["residential"])
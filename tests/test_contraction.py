@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from Route_Optimization_Gihanga.routing.contraction import ContractionHierarchy
+from Route_Optimization_Gihanga.routing.distance_matrix import DistanceMatrix
+from Route_Optimization_Gihanga.routing.shortest_paths import dijkstra
+
+
+@pytest.fixture(scope='module')
+def ch(grid_graph):
+    return ContractionHierarchy.build(grid_graph)
+
+
+def path_cost(graph, path):
+    edges = graph.path_edges(path)
+    assert all(edge >= 0 for edge in edges), "consecutive path nodes must share a road"
+    return float(graph.edge_weight[edges].sum())
+
+
+def test_query_matches_dijkstra(grid_graph, ch):
+    rng = np.random.default_rng(3)
+    for source, target in rng.integers(0, grid_graph.num_nodes, size=(40, 2)).tolist():
+        dist, _, _ = dijkstra(grid_graph, source)
+        cost, path = ch.query(source, target)
+        assert cost == pytest.approx(dist[target])
+        assert path[0] == source and path[-1] == target
+        assert path_cost(grid_graph, path) == pytest.approx(cost)
+
+
+def test_many_to_many_matches_dijkstra_matrix(grid_graph, ch):
+    nodes = [0, 5, 12, 24, 30, 41, 48]
+    with_ch = DistanceMatrix.build(grid_graph, nodes, ch)
+    without = DistanceMatrix.build(grid_graph, nodes)
+    np.testing.assert_allclose(with_ch.cost, without.cost)
+    np.testing.assert_allclose(with_ch.length, without.length)
+    for i in range(len(nodes)):
+        for j in range(len(nodes)):
+            if i != j:
+                assert path_cost(grid_graph, with_ch.path(i, j)) == pytest.approx(with_ch.cost[i, j])
+
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from Route_Optimization_Gihanga.routing.contraction import ContractionHierarchy
+from Route_Optimization_Gihanga.routing.distance_matrix import DistanceMatrix
+
+NODES = [0, 5, 12, 24, 30, 41, 48]
+
+
+@pytest.fixture(scope='module')
+def edge_minutes(grid_graph):
+    # Learned minutes that disagree with the static weights on the best paths
+    return np.random.default_rng(11).uniform(0.2, 3.0, size=len(grid_graph.edge_weight))
+
+
+def path_minutes(graph, path, edge_minutes):
+    edges = graph.path_edges(path)
+    assert all(edge >= 0 for edge in edges), "consecutive path nodes must share a road"
+    return float(edge_minutes[edges].sum())
+
+
+def test_dijkstra_matrix_searches_on_travel_minutes(grid_graph, edge_minutes):
+    matrix = DistanceMatrix.build(grid_graph, NODES, edge_minutes=edge_minutes)
+    static = DistanceMatrix.build(grid_graph, NODES)
+    np.testing.assert_array_equal(matrix.minutes, matrix.cost)
+    assert static.minutes is None
+    for i in range(len(NODES)):
+        for j in range(len(NODES)):
+            if i != j:
+                path = matrix.path(i, j)
+                assert path_minutes(grid_graph, path, edge_minutes) == pytest.approx(matrix.cost[i, j])
+                # No path is faster than the one found
+                assert matrix.cost[i, j] <= path_minutes(grid_graph, static.path(i, j), edge_minutes) + 1e-9
+
+
+def test_ch_built_on_travel_minutes_matches_dijkstra(grid_graph, edge_minutes):
+    ch = ContractionHierarchy.build(grid_graph, weights=edge_minutes, weights_id='test')
+    assert ch.weights_id == 'test'
+    with_ch = DistanceMatrix.build(grid_graph, NODES, ch, edge_minutes=edge_minutes)
+    without = DistanceMatrix.build(grid_graph, NODES, edge_minutes=edge_minutes)
+    np.testing.assert_allclose(with_ch.minutes, without.minutes)
+    np.testing.assert_allclose(with_ch.length, without.length)
+    for i in range(len(NODES)):
+        for j in range(len(NODES)):
+            if i != j:
+                assert path_minutes(grid_graph, with_ch.path(i, j), edge_minutes) == pytest.approx(with_ch.cost[i, j])
+
+
+def test_timing_length(grid_graph, edge_minutes):
+    static = DistanceMatrix.build(grid_graph, NODES)
+    assert static.timing_length(30) is static.length
+    matrix = DistanceMatrix.build(grid_graph, NODES, edge_minutes=edge_minutes)
+    np.testing.assert_allclose(matrix.timing_length(30), matrix.minutes / 2)
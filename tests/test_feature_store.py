@@ -0,0 +1,95 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The household package loads its prediction routes (and their joblib models) on import
+pytest.importorskip('joblib')
+
+from HouseHold_Waste_Prediction_Chirath.feature_store import FEATURES, compute_features, record_dump, route_features
+
+AMOUNT = 'MSW Wastage Amount (Kg)'
+
+
+def pandas_features(amounts):
+    """The lag and rolling features as the prediction endpoint used to compute them."""
+    waste = pd.Series(amounts, dtype='float64')
+    features = {
+        'Lag_1': waste.iloc[-1] if not waste.empty else np.nan,
+        'Lag_7': waste.iloc[-7] if len(waste) >= 7 else np.nan,
+    }
+    for window in (7, 14, 30):
+        rolling = waste.rolling(window=window, min_periods=1)
+        features[f'rolling_mean_{window}'] = rolling.mean().iloc[-1] if not waste.empty else np.nan
+        features[f'rolling_min_{window}'] = rolling.min().iloc[-1] if not waste.empty else np.nan
+        features[f'rolling_max_{window}'] = rolling.max().iloc[-1] if not waste.empty else np.nan
+    return np.array([features[name] for name in FEATURES])
+
+
+@pytest.mark.parametrize('count', [0, 1, 6, 7, 13, 31, 45])
+def test_compute_features_matches_pandas(count):
+    amounts = np.random.default_rng(count).uniform(100, 2000, count).round(1).tolist()
+    features = compute_features(amounts)
+    np.testing.assert_allclose([features[name] for name in FEATURES], pandas_features(amounts), equal_nan=True)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f"CREATE TABLE WasteData ([Dump Date] TIMESTAMP, [Route] TEXT, [{AMOUNT}] REAL)")
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2024-01-01', periods=40).strftime('%Y-%m-%d').tolist()
+    for route in ('R1', 'R2'):
+        # Stored out of date order, as imports leave them
+        for day in rng.permutation(days).tolist():
+            insert(conn, day, route, round(float(rng.uniform(100, 2000)), 1))
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def history_features(conn, route):
+    history = pd.read_sql_query("SELECT * FROM WasteData WHERE [Route] = ?", conn, params=[route])
+    history['Dump Date'] = pd.to_datetime(history['Dump Date'], format='ISO8601')
+    return pandas_features(history.sort_values(by='Dump Date', kind='stable')[AMOUNT].tolist())
+
+
+def insert(conn, day, route, amount):
+    conn.execute("INSERT INTO WasteData VALUES (?, ?, ?)", (day, route, amount))
+
+
+def test_store_follows_entered_and_imported_records(conn):
+    for route in ('R1', 'R2'):
+        np.testing.assert_allclose(route_features(conn, 'MSW', [route]).loc[route], history_features(conn, route))
+
+    # Entered through the waste entry page, one in the past
+    for day, amount in (('2024-02-10', 950.0), ('2024-02-11', 120.5), ('2024-01-05', 700.0)):
+        insert(conn, day, 'R1', amount)
+        record_dump(conn, 'MSW', 'R1', day, amount)
+    conn.commit()
+    np.testing.assert_allclose(route_features(conn, 'MSW', ['R1']).loc['R1'], history_features(conn, 'R1'))
+
+    # Imported without going through the store
+    insert(conn, '2024-02-12', 'R2', 1999.0)
+    conn.commit()
+    np.testing.assert_allclose(route_features(conn, 'MSW', ['R2']).loc['R2'], history_features(conn, 'R2'))
+
+    # Edited and deleted in place
+    conn.execute(f"UPDATE WasteData SET [{AMOUNT}] = 5.0 WHERE [Route] = 'R1' AND [Dump Date] = '2024-02-11'")
+    conn.execute("DELETE FROM WasteData WHERE [Route] = 'R2' AND [Dump Date] = '2024-02-12'")
+    conn.commit()
+    for route in ('R1', 'R2'):
+        np.testing.assert_allclose(route_features(conn, 'MSW', [route]).loc[route], history_features(conn, route))
+
+
+def test_unchanged_history_is_not_read(conn):
+    route_features(conn, 'MSW', ['R1', 'R2'])
+    statements = []
+    conn.set_trace_callback(statements.append)
+    route_features(conn, 'MSW', ['R1', 'R2'])
+    assert statements and not any('FROM WasteData' in statement for statement in statements)
+
+
+def test_route_without_history_is_nan(conn):
+    assert route_features(conn, 'MSW', ['R9']).loc['R9'].isna().all()
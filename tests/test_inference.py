@@ -0,0 +1,56 @@
+import threading
+
+import numpy as np
+import pytest
+
+from shared.inference import MicroBatcher
+
+
+def run_concurrently(batcher, requests):
+    results = [None] * len(requests)
+    start = threading.Barrier(len(requests))
+
+    def call(k):
+        start.wait()
+        results[k] = batcher.submit(*requests[k])
+
+    threads = [threading.Thread(target=call, args=(k,)) for k in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+
+def test_outputs_go_back_to_their_callers():
+    calls = []
+
+    def run(ids, values):
+        calls.append(len(ids))
+        return np.column_stack([ids, values.sum(axis=1)])
+
+    batcher = MicroBatcher(run, max_batch_size=8, max_wait_ms=20, name='test')
+    # Caller k sends k + 1 rows tagged with its own id
+    requests = [(np.full(k + 1, k), np.ones((k + 1, 3)) * k) for k in range(6)]
+    results = run_concurrently(batcher, requests)
+
+    for k, result in enumerate(results):
+        assert result.shape == (k + 1, 2)
+        assert (result[:, 0] == k).all()
+        assert (result[:, 1] == 3 * k).all()
+    # 21 rows in batches of at most 8, a request never split between batches
+    assert max(calls) <= 8
+    assert sum(calls) == batcher.rows == 21
+    assert batcher.batches == len(calls)
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    def run(values):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(run, max_wait_ms=20, name='failing')
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.submit(np.ones((2, 3)))
+    # The worker keeps serving after a failed batch
+    batcher.run = lambda values: values * 2
+    np.testing.assert_array_equal(batcher.submit(np.ones((1, 3))), np.full((1, 3), 2.0))
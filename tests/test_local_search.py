@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from Route_Optimization_Gihanga.routing.local_search import improve_routes, improve_tour, or_opt, tour_cost, two_opt
+from Route_Optimization_Gihanga.routing.vrp import FleetRules
+
+
+def euclidean_cost(num_points, seed):
+    points = np.random.default_rng(seed).uniform(0, 10, size=(num_points, 2))
+    return np.linalg.norm(points[:, None] - points[None, :], axis=-1)
+
+
+def random_tour(num_points, seed):
+    stops = np.random.default_rng(seed).permutation(np.arange(1, num_points)).tolist()
+    return [0] + stops + [0]
+
+
+@pytest.mark.parametrize('move', [two_opt, or_opt, improve_tour])
+@pytest.mark.parametrize('seed', range(5))
+def test_tour_moves_never_worsen(move, seed):
+    cost = euclidean_cost(25, seed)
+    tour = random_tour(25, seed)
+    improved = move(cost, tour)
+    assert improved[0] == improved[-1] == 0
+    assert sorted(improved[1:-1]) == sorted(tour[1:-1])
+    assert tour_cost(cost, improved) <= tour_cost(cost, tour) + 1e-9
+
+
+def test_improve_tour_keeps_feasible_tours_only():
+    cost = euclidean_cost(12, 0)
+    tour = random_tour(12, 0)
+    # Stop 3 has to stay before stop 5
+    feasible = lambda t: t.index(3) < t.index(5)
+    if not feasible(tour):
+        tour[tour.index(3)], tour[tour.index(5)] = 5, 3
+    improved = improve_tour(cost, tour, feasible=feasible)
+    assert feasible(improved)
+    assert tour_cost(cost, improved) <= tour_cost(cost, tour) + 1e-9
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_route_moves_never_worsen(seed):
+    cost = euclidean_cost(30, seed)
+    stops = random_tour(30, seed)[1:-1]
+    routes = [[0] + stops[k::3] + [0] for k in range(3)]
+    rules = FleetRules(cost, np.ones(30), [100.0] * 3, 10000, 30, 2)
+    improved = improve_routes(cost, routes, rule=rules)
+    assert sorted(s for r in improved for s in r[1:-1]) == sorted(stops)
+    before = sum(tour_cost(cost, r) for r in routes)
+    assert sum(tour_cost(cost, r) for r in improved) <= before + 1e-9
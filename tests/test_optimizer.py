@@ -0,0 +1,38 @@
+import pytest
+
+from Route_Optimization_Gihanga.routing.optimizer import RouteOptimizer
+from Route_Optimization_Gihanga.routing.parallel import ParallelSolver
+from Route_Optimization_Gihanga.routing.spatial_index import SpatialIndex
+
+
+@pytest.fixture(scope='module')
+def optimizer(grid_graph):
+    return RouteOptimizer(SpatialIndex(grid_graph), depot=tuple(grid_graph.coords[0]), time_budget=0.2,
+                          parallel=ParallelSolver(workers=1, restarts=1, seed=0))
+
+
+def waste_points(graph, nodes):
+    return [{"lat": float(graph.coords[n, 0]), "lon": float(graph.coords[n, 1]), "username": f"c{n}"}
+            for n in nodes]
+
+
+@pytest.mark.parametrize('solver', ['vrp', 'split'])
+def test_every_point_is_routed_or_unassigned(grid_graph, optimizer, solver):
+    optimizer.solver = solver
+    # Node 0 is the depot
+    points = waste_points(grid_graph, [0, 3, 10, 17, 25, 33, 40, 46])
+    result = optimizer.optimize(points, ['V1', 'V2'])
+
+    routed = [stop["username"] for driver in result["drivers"] for stop in driver["stops"]]
+    unassigned = [point["username"] for point in result["unassigned"]]
+    assert sorted(routed + unassigned) == sorted(point["username"] for point in points)
+    assert "c0" in unassigned
+
+
+def test_reoptimize_reports_points_at_the_depot(grid_graph, optimizer):
+    optimizer.solver = 'vrp'
+    points = waste_points(grid_graph, [0, 3, 10])
+    routes = {"V1": [grid_graph.node_key(0), grid_graph.node_key(3), grid_graph.node_key(10),
+                     grid_graph.node_key(0)]}
+    result = optimizer.reoptimize(routes, points)
+    assert [point["username"] for point in result["unassigned"]] == ["c0"]
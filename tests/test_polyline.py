@@ -0,0 +1,23 @@
+import numpy as np
+
+from Route_Optimization_Gihanga.routing import polyline
+
+
+def test_encode_matches_reference_example():
+    # Example from the encoded polyline format documentation
+    coords = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert polyline.encode(coords) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_round_trip():
+    rng = np.random.default_rng(1)
+    coords = np.column_stack([rng.uniform(-90, 90, 200), rng.uniform(-180, 180, 200)])
+    for precision in (5, 6):
+        decoded = np.array(polyline.decode(polyline.encode(coords, precision), precision))
+        assert decoded.shape == coords.shape
+        assert np.abs(decoded - coords).max() <= 0.5 * 10 ** -precision + 1e-12
+
+
+def test_empty():
+    assert polyline.encode([]) == ""
+    assert polyline.decode("") == []
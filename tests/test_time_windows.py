@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pytest
+
+from Route_Optimization_Gihanga.routing.time_windows import TimeWindowRules
+
+SPEED_KMH = 30
+STOP_MINUTES = 2
+
+
+def make_rules(num_points, seed, shift_start=480.0, shift_end=1080.0):
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 5, size=(num_points, 2))
+    length = np.linalg.norm(points[:, None] - points[None, :], axis=-1)
+    opens = rng.uniform(480, 600, num_points)
+    earliest = np.where(rng.random(num_points) < 0.5, opens, 0.0)
+    latest = np.where(rng.random(num_points) < 0.5, opens + rng.uniform(10, 90, num_points), math.inf)
+    earliest[0], latest[0] = 0.0, math.inf
+    return TimeWindowRules(length, np.ones(num_points), [100.0], 600, SPEED_KMH, STOP_MINUTES,
+                           earliest=earliest, latest=latest, shift_start=[shift_start], shift_end=[shift_end])
+
+
+def simulate(rules, route, delay_at=None, delay=0.0):
+    """Service start per route position, driving and waiting one stop at a time."""
+    begin = [rules.shift_start[0]]
+    for k in range(1, len(route)):
+        start = begin[-1] + (rules.stop_time if k > 1 else 0.0) + rules.travel(route[k - 1], route[k])
+        if k < len(route) - 1:
+            start = max(start, rules.earliest[route[k]])
+        if k == delay_at:
+            start += delay
+        begin.append(start)
+    return np.array(begin)
+
+
+def on_time(rules, route, begin):
+    latest = rules.latest[route].copy()
+    latest[0], latest[-1] = rules.shift_start[0], rules.shift_end[0]
+    return bool(np.all(begin <= latest + 1e-6))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_schedule_matches_simulation(seed):
+    rules = make_rules(10, seed)
+    route = [0] + np.random.default_rng(seed).permutation(np.arange(1, 10)).tolist() + [0]
+    begin, _ = rules.schedule(0, route)
+    np.testing.assert_allclose(begin, simulate(rules, route))
+    assert (rules.first_late(0, route) is None) == on_time(rules, route, begin)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_slack_is_the_largest_delay_that_stays_on_time(seed):
+    rules = make_rules(8, seed, shift_end=math.inf)
+    route = [0] + np.random.default_rng(seed).permutation(np.arange(1, 8)).tolist() + [0]
+    begin, slack = rules.schedule(0, route)
+    if not on_time(rules, route, begin):
+        return
+    for k in range(1, len(route)):
+        if math.isinf(slack[k]):
+            continue
+        assert slack[k] >= -1e-6
+        assert on_time(rules, route, simulate(rules, route, k, slack[k]))
+        assert not on_time(rules, route, simulate(rules, route, k, slack[k] + 0.01))
+
+
+def test_late_stop_is_reported():
+    rules = make_rules(4, 0)
+    rules.earliest[:] = 0.0
+    rules.latest[:] = math.inf
+    rules.latest[2] = rules.shift_start[0]  # closes before the truck can get there
+    assert rules.first_late(0, [0, 1, 2, 3, 0]) == 2
+    assert rules.first_late(0, [0, 1, 3, 0]) is None